@@ -1,16 +1,21 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException
 from app.infra.file_storage.instances_file_storage_wrapper import get_file_storage_wrapper, FileStorageWrapper
 from app.infra.file_storage.requests import FileStorageRequest
+from app.core.storage.object_stream import RangeNotSatisfiable
 from app.models.files import FSFile, LocalFile
-from fastapi.responses import FileResponse, Response
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+from typing import Optional
 from fastapi import status
 
 import json
 
 router = APIRouter()
+# Read-only routes; the app mounts only these, the upload, upsert and delete routes stay unexposed
+read_router = APIRouter()
 
 @router.post("/upload")
-def route_upload_file(req: FileStorageRequest.Upload):
+async def route_upload_file(req: FileStorageRequest.Upload):
     try:
         file_manager = get_file_storage_wrapper()
         target_file = LocalFile(
@@ -20,13 +25,13 @@ def route_upload_file(req: FileStorageRequest.Upload):
             local_path=req.local_file_path,
             document_subtype="raw" # TODO: Change this
         )
-        file_url = file_manager.upload_file(local_file=target_file)
+        file_url = await file_manager.upload_file(local_file=target_file)
         return Response(status_code=status.HTTP_201_CREATED, content=json.dumps({"file_url": file_url}))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
     
 @router.post("/upsert")
-def route_upsert_file(req: FileStorageRequest.Upsert):
+async def route_upsert_file(req: FileStorageRequest.Upsert):
     try:
         file_manager = get_file_storage_wrapper()
 
@@ -37,7 +42,7 @@ def route_upsert_file(req: FileStorageRequest.Upsert):
             document_category=req.document_category,
             local_path=req.local_file_path
         )
-        file_url = file_manager.upsert_file(
+        file_url = await file_manager.upsert_file(
             target_file=target_file
         )
         return Response(status_code=status.HTTP_201_CREATED,
@@ -49,7 +54,7 @@ def route_upsert_file(req: FileStorageRequest.Upsert):
 
     
 @router.post("/delete")
-def route_delete_file(req: FileStorageRequest.Delete):
+async def route_delete_file(req: FileStorageRequest.Delete):
     try:
         file_manager = get_file_storage_wrapper()
         target_file = FSFile(
@@ -57,15 +62,15 @@ def route_delete_file(req: FileStorageRequest.Delete):
             project_id=req.project_id,
             document_category=req.document_category
         )
-        file_manager.delete_file(target_file=target_file)
+        await file_manager.delete_file(target_file=target_file)
         return Response(
             status_code=status.HTTP_200_OK
         )
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
     
-@router.get("/read/{company_id}/{project_id}/{document_category}/{document_type}")
-def route_read_file(company_id: str, project_id: str, document_category: str, document_type: str):
+@read_router.get("/read/{company_id}/{project_id}/{document_category}/{document_type}")
+async def route_read_file(company_id: str, project_id: str, document_category: str, document_type: str, range: Optional[str] = Header(default=None), if_none_match: Optional[str] = Header(default=None)):
     try:
         file_manager = get_file_storage_wrapper()
         target_file = FSFile(
@@ -74,10 +79,19 @@ def route_read_file(company_id: str, project_id: str, document_category: str, do
             document_category=document_category,
             document_type=document_type
         )        
-        target_file, temp_path = file_manager.read_file(target_file=target_file)
-        if not temp_path:
-            raise f"Failed to read from file: {target_file.remote_file_path}"
-        response = FileResponse(path=temp_path, filename=target_file.file_name)
-        return response
+        stream = await file_manager.open_file(target_file=target_file, range_header=range, if_none_match=if_none_match)
+        if stream.status_code == status.HTTP_304_NOT_MODIFIED:
+            return Response(status_code=stream.status_code, headers=stream.headers)
+        return StreamingResponse(
+            stream.iter_bytes(),
+            status_code=stream.status_code,
+            headers=stream.headers,
+            media_type=stream.media_type,
+            background=BackgroundTask(stream.aclose)
+        )
+    except RangeNotSatisfiable as e:
+        return Response(status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE, headers=e.headers)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
\ No newline at end of file
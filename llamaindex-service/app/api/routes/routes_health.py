@@ -1,10 +1,22 @@
 from fastapi import APIRouter, status
 from fastapi.responses import Response
 
+from app.core.settings import get_settings
+from app.infra.instances_llamaindex import get_answer_cache, get_embedding_cache, get_extraction_cache
+
 router = APIRouter()
 
 @router.get("")
 def route_get_health():
     return Response(
         status_code=status.HTTP_200_OK
-    )
\ No newline at end of file
+    )
+
+@router.get("/caches")
+def route_get_cache_stats():
+    settings = get_settings()
+    return {
+        "embeddings": get_embedding_cache().stats() if settings.EMBEDDING_CACHE_ENABLED else None,
+        "answers": get_answer_cache().stats() if settings.ANSWER_CACHE_ENABLED else None,
+        "extractions": get_extraction_cache().stats() if settings.EXTRACTION_CACHE_ENABLED else None
+    }
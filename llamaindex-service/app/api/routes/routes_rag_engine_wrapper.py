@@ -1,52 +1,106 @@
-from fastapi import APIRouter, HTTPException, status
-from fastapi.responses import FileResponse, Response
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from typing import Optional
 
 from app.infra.rag_engine.instances_rag_engine_wrapper import RagEngineWrapper, get_rag_engine_wrapper
 from app.infra.rag_engine.requests import RagEngineRequest
+from app.core.storage.object_stream import RangeNotSatisfiable
 from app.models.files import LocalFile, FSFile
+from app.models.ingestion_job import IngestionJobPayload
+from app.api.services.ingestion_job_service import InvalidIngestionInput, build_local_file, get_ingestion_job_service
+
+import json
+import os
 
 router = APIRouter()
 
 @router.post("/upload_document")
 async def route_upload_document(req: RagEngineRequest.UploadDocument):
     try:
-        rag_engine_wrapper = get_rag_engine_wrapper()
-        file = LocalFile(
+        job_service = get_ingestion_job_service()
+        payload = IngestionJobPayload(
+            local_file_path=req.local_file_path,
             company_id=req.company_id,
             project_id=req.project_id,
-            document_category=req.document_category,
-            local_path=req.local_file_path
+            document_category=req.document_category
         )
-        
-        await rag_engine_wrapper.upload_document(file=file)
+        # Rejected here rather than queued as a job that would fail on every attempt
+        build_local_file(payload)
+        job = await job_service.submit(operation="upload", payload=payload)
         return Response(
-            status_code=status.HTTP_201_CREATED,
+            status_code=status.HTTP_202_ACCEPTED,
+            content=json.dumps({"job_id": job.job_id, "status_url": f"/rag_engine/jobs/{job.job_id}"}),
+            media_type="application/json"
         )
         
+    except InvalidIngestionInput as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 @router.post("/upsert_document")
 async def route_upsert_document(req: RagEngineRequest.UpsertDocument):
     try:
-        rag_engine_wrapper = get_rag_engine_wrapper()
-        file = LocalFile(
+        job_service = get_ingestion_job_service()
+        payload = IngestionJobPayload(
+            local_file_path=req.local_file_path,
             company_id=req.company_id,
             project_id=req.project_id,
-            document_category=req.document_category,
-            local_path=req.local_file_path
+            document_category=req.document_category
+        )
+        # Rejected here rather than queued as a job that would fail on every attempt
+        build_local_file(payload)
+        job = await job_service.submit(operation="upsert", payload=payload)
+        return Response(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=json.dumps({"job_id": job.job_id, "status_url": f"/rag_engine/jobs/{job.job_id}"}),
+            media_type="application/json"
+        )
+        
+    except InvalidIngestionInput as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    
+@router.get("/jobs/{job_id}")
+async def route_get_job(job_id: str):
+    try:
+        job_service = get_ingestion_job_service()
+        job = await job_service.get_job(job_id=job_id)
+        if not job:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} not found.")
+        return Response(
+            status_code=status.HTTP_200_OK,
+            content=job.model_dump_json(),
+            media_type="application/json"
         )
         
-        await rag_engine_wrapper.upsert_document(file=file)
+    except Exception as e:
+        if isinstance(e, HTTPException):
+            raise e
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    
+@router.post("/jobs/{job_id}/retry")
+async def route_retry_job(job_id: str):
+    try:
+        job_service = get_ingestion_job_service()
+        job = await job_service.retry_job(job_id=job_id)
+        if not job:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Job {job_id} does not exist or has not failed.")
         return Response(
-            status_code=status.HTTP_201_CREATED,
+            status_code=status.HTTP_202_ACCEPTED,
+            content=job.model_dump_json(),
+            media_type="application/json"
         )
         
     except Exception as e:
+        if isinstance(e, HTTPException):
+            raise e
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
     
 @router.get("/read_document/{company_id}/{project_id}/{document_category}/{document_type}")
-def route_read_document(company_id: str, project_id: str, document_category: str, document_type: str):
+async def route_read_document(company_id: str, project_id: str, document_category: str, document_type: str, range: Optional[str] = Header(default=None), if_none_match: Optional[str] = Header(default=None)):
     try:
         rag_engine_wrapper = get_rag_engine_wrapper()
         file = FSFile(
@@ -56,12 +110,22 @@ def route_read_document(company_id: str, project_id: str, document_category: str
             document_type=document_type
         )
         
-        file, tmp_file_path = rag_engine_wrapper.read_document(file=file)
-        if not tmp_file_path:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Failed to read from file: {file.remote_file_path}")
-        response = FileResponse(path=tmp_file_path, filename=file.file_name)
-        return response
+        # Streamed from object storage chunk by chunk; supports resumed (Range) and conditional (If-None-Match) requests
+        stream = await rag_engine_wrapper.open_document(file=file, range_header=range, if_none_match=if_none_match)
+        if stream.status_code == status.HTTP_304_NOT_MODIFIED:
+            return Response(status_code=stream.status_code, headers=stream.headers)
+        return StreamingResponse(
+            stream.iter_bytes(),
+            status_code=stream.status_code,
+            headers=stream.headers,
+            media_type=stream.media_type,
+            background=BackgroundTask(stream.aclose)
+        )
         
+    except RangeNotSatisfiable as e:
+        return Response(status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE, headers=e.headers)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except Exception as e:
         if isinstance(e, HTTPException):
             raise e
@@ -116,15 +180,59 @@ async def route_query(req: RagEngineRequest.QueryKnowledgeBase):
 #     except Exception as e:
 #         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
         
+@router.post("/regenerate_document")
+async def route_regenerate_document(req: RagEngineRequest.RegenerateDocument):
+    try:
+        rag_engine_wrapper = get_rag_engine_wrapper()
+        regenerated_file: LocalFile = await rag_engine_wrapper.regenerate_document(
+            document_type=req.document_category,
+            company_id=req.company_id,
+            project_id=req.project_id,
+            changed_file_ids=req.changed_file_ids
+        )
+        # The filled document is a temporary file: removed once it has been sent
+        return FileResponse(
+            status_code=200,
+            path=regenerated_file.local_path,
+            filename=regenerated_file.file_name,
+            background=BackgroundTask(os.remove, regenerated_file.local_path)
+        )
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+        
 @router.post("/generate_docx")
 async def route_generate_docx(req: RagEngineRequest.GenerateDocx):
     try:
         rag_engine_wrapper = get_rag_engine_wrapper()
         generated_file: str = await rag_engine_wrapper.generate_docx(
             bucket=req.bucket,
-            file_url=req.file_url
+            file_url=req.file_url,
+            force_refresh=req.force_refresh,
+            reuse_previous=req.reuse_previous
         )
         from pathlib import Path
         return FileResponse(status_code=200, path=generated_file, filename=Path(generated_file).name)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+@router.post("/diff_docx_schema")
+async def route_diff_docx_schema(req: RagEngineRequest.DiffDocxSchema):
+    try:
+        rag_engine_wrapper = get_rag_engine_wrapper()
+        diff = await rag_engine_wrapper.diff_docx_schema(bucket=req.bucket, file_url=req.file_url)
+        return Response(status_code=200, content=diff.model_dump_json(), media_type="application/json")
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+@router.post("/diff_document_schema")
+async def route_diff_document_schema(req: RagEngineRequest.DiffDocumentSchema):
+    try:
+        rag_engine_wrapper = get_rag_engine_wrapper()
+        diff = await rag_engine_wrapper.diff_document_schema(
+            document_type=req.document_category,
+            company_id=req.company_id,
+            project_id=req.project_id
+        )
+        return Response(status_code=200, content=diff.model_dump_json(), media_type="application/json")
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -0,0 +1,190 @@
+import os
+import tempfile
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import Optional, Tuple
+
+from app.core.caching.object_metadata_cache import ObjectMetadataCache
+from app.core.logger import get_logger
+from app.core.storage.object_stream import ObjectBody
+from app.core.storage.s3_client import AsyncS3Client, S3Error, S3Object
+from app.models.files import LocalFile, FSFile
+
+
+class AsyncFileStorageService:
+    """
+    Async counterpart of `FileStorageService`, with the same object layout and semantics.
+
+    All calls go through one `AsyncS3Client`, whose pooled, kept-alive connections are shared by
+    every request of the process instead of blocking an executor thread per MinIO call.
+    Existence checks are HEAD requests, answered from `metadata_cache` while fresh.
+    """
+    def __init__(
+        self,
+        url: str,
+        access_key: str,
+        secret_key: str,
+        region: str = "us-east-1",
+        pool_size: int = 32,
+        keepalive_expiry: float = 30.0,
+        max_concurrency: int = 16,
+        timeout: float = 30.0,
+        metadata_cache: Optional[ObjectMetadataCache] = None
+    ):
+        self.url = url
+        self.client = AsyncS3Client(
+            endpoint_url=url if "://" in url else f"http://{url}",
+            access_key=access_key,
+            secret_key=secret_key,
+            region=region,
+            pool_size=pool_size,
+            keepalive_expiry=keepalive_expiry,
+            max_concurrency=max_concurrency,
+            timeout=timeout
+        )
+        self.metadata_cache = metadata_cache or ObjectMetadataCache(ttl_seconds=0)
+        self.logger = get_logger(self.__class__.__name__)
+        # Buckets known to exist, so uploads skip the bucket check
+        self._buckets: set[str] = set()
+
+    ########
+    # CRUD #
+    ########
+    async def upload_file(self, local_file: LocalFile) -> str:
+        """
+        Uploads a local file to the specified bucket in the object storage.
+        If the target bucket does not exist, it will be created. If an object with the same
+        remote file path already exists in the bucket, an exception is raised to prevent overwriting.
+        Args:
+            local_file (LocalFile): The local file to be uploaded, including bucket, local path, and remote file path.
+        Returns:
+            str: The path to the file in S3 (object name).
+        Raises:
+            Exception: If the object already exists in the bucket.
+        """
+        await self.__ensure_bucket(bucket=local_file.bucket)
+
+        if await self.check_object_exists(local_file=local_file):
+            raise Exception(f"Cannot create object. '{local_file.remote_file_path}' already exists. Did you mean to use upsert?")
+
+        await self.client.put_file(
+            bucket=local_file.bucket,
+            key=local_file.remote_file_path,
+            path=local_file.local_path
+        )
+        self.metadata_cache.invalidate(bucket=local_file.bucket, key=local_file.remote_file_path)
+        self.logger.info(f"{local_file.local_path} successfully uploaded as object {local_file.remote_file_path}")
+        return local_file.remote_file_path
+
+    async def read_file(self, target_file: FSFile) -> Tuple[FSFile, Optional[str]]:
+        target_file = await self.find_file(target_file=target_file)
+        if not await self.check_object_exists(remote_file=target_file):
+            raise Exception(f"Object {target_file.remote_file_path} was not found.")
+        tmp_file_path = await self.__download(bucket=target_file.bucket, object_name=target_file.remote_file_path)
+        return target_file, tmp_file_path
+
+    async def read_file_from_url(self, bucket: str, file_url: str) -> str:
+        return await self.__download(bucket=bucket, object_name=file_url)
+
+    async def find_file(self, target_file: FSFile) -> FSFile:
+        """Fills in the file name of a file given by its directory (document type) only."""
+        if not target_file.file_name:
+            self.logger.info("No file name specified, fetching by type...")
+            target_file = await self.__fetch_document_from_directory(target_file=target_file)
+        return target_file
+
+    async def open_object(self, bucket: str, object_name: str, byte_range: Optional[tuple[int, int]] = None, etag: Optional[str] = None) -> Optional[ObjectBody]:
+        """
+        Opens a streamed download of the object, or of its inclusive `byte_range`.
+
+        With `etag`, the object must still have that ETag; None is returned if it has changed or
+        is gone since its metadata was read.
+        """
+        headers = {}
+        if byte_range:
+            headers["Range"] = f"bytes={byte_range[0]}-{byte_range[1]}"
+        if etag:
+            headers["If-Match"] = etag
+        stack = AsyncExitStack()
+        try:
+            response = await stack.enter_async_context(self.client.get_object(bucket=bucket, key=object_name, headers=headers))
+        except S3Error as e:
+            await stack.aclose()
+            if e.code not in ("PreconditionFailed", "NoSuchKey"):
+                raise e
+            self.metadata_cache.invalidate(bucket=bucket, key=object_name)
+            return None
+        return ObjectBody(chunks=response.aiter_bytes(self.client.chunk_size), close=stack.aclose)
+
+    async def upsert_file(self, target_file: LocalFile) -> str:
+        self.logger.info(f"Upserting file {target_file.remote_file_path}...")
+        await self.delete_file(target_file=target_file)
+        file_url = await self.upload_file(local_file=target_file)
+        self.logger.info(f"Upsert of file {target_file.remote_file_path} successful.")
+        return file_url
+
+    async def delete_file(self, target_file: FSFile) -> None:
+        path = self.__construct_file_path(target_file=target_file)
+        try:
+            objects = await self.client.list_objects(bucket=target_file.bucket, prefix=path)
+            await self.client.delete_objects(bucket=target_file.bucket, keys=[obj.key for obj in objects])
+            self.logger.info(f"The files under {path} have been removed.")
+        except Exception as e:
+            self.logger.error(f"Failed to remove object {target_file.remote_file_path}: {str(e)}")
+            raise e
+        finally:
+            # Also after a partial failure: some of the objects may be gone
+            self.metadata_cache.invalidate_prefix(bucket=target_file.bucket, prefix=path)
+
+    async def check_object_exists(self, local_file: Optional[LocalFile] = None, remote_file: Optional[FSFile] = None) -> bool:
+        return await self.stat_file(local_file=local_file, remote_file=remote_file) is not None
+
+    async def stat_file(self, local_file: Optional[LocalFile] = None, remote_file: Optional[FSFile] = None) -> Optional[S3Object]:
+        """Metadata of the remote object (HEAD, never the body), or None if it does not exist."""
+        assert local_file or remote_file, "Either local or remote file has to be provided"
+        file = local_file or remote_file
+        found, metadata = self.metadata_cache.get(bucket=file.bucket, key=file.remote_file_path)
+        if found:
+            return metadata
+        generation = self.metadata_cache.generation()
+        metadata = await self.client.head_object(bucket=file.bucket, key=file.remote_file_path)
+        self.metadata_cache.put(bucket=file.bucket, key=file.remote_file_path, metadata=metadata, generation=generation)
+        return metadata
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    async def __ensure_bucket(self, bucket: str) -> None:
+        if bucket in self._buckets:
+            return
+        if not await self.client.bucket_exists(bucket=bucket):
+            self.logger.warning(f"Bucket not found: {bucket}. Creating...")
+            await self.client.make_bucket(bucket=bucket)
+        self._buckets.add(bucket)
+
+    async def __download(self, bucket: str, object_name: str) -> str:
+        fd, tmp_file_path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            await self.client.download_file(bucket=bucket, key=object_name, path=tmp_file_path)
+        except BaseException:
+            os.remove(tmp_file_path)
+            raise
+        self.logger.info(f"File downloaded to temporary location: {tmp_file_path}")
+        return tmp_file_path
+
+    async def __fetch_document_from_directory(self, target_file: FSFile) -> FSFile:
+        path = self.__construct_file_path(target_file=target_file)
+        objects = await self.client.list_objects(bucket=target_file.bucket, prefix=path)
+        if not objects:
+            raise FileNotFoundError(f"No objects for {path}")
+        target_file.file_name = Path(objects[0].key).name
+        return target_file
+
+    def __construct_file_path(self, target_file: FSFile) -> str:
+        path = f"{target_file.project}/{target_file.document_category}"
+        if target_file.document_type:
+            path += f"/{target_file.document_type}"
+        if target_file.file_name:
+            path += f"/{target_file.file_name}"
+        return path
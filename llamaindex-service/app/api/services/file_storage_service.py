@@ -4,18 +4,21 @@ from minio import Minio
 from typing import Optional
 from app.core.logger import get_logger
 
-import io
 from minio.helpers import ObjectWriteResult
 from minio.error import S3Error
+from urllib3 import BaseHTTPResponse
 import tempfile
 import shutil
 from typing import Tuple
 
 from app.models.files import LocalFile, FSFile
+from app.core.caching.object_metadata_cache import ObjectMetadataCache
+from app.core.storage.object_stream import CHUNK_SIZE
+from app.core.storage.s3_client import S3Object
 
 
 class FileStorageService:
-    def __init__(self, url: str, access_key: str, secret_key: str):
+    def __init__(self, url: str, access_key: str, secret_key: str, metadata_cache: Optional[ObjectMetadataCache] = None):
         self.url = url
         self.access_key = access_key
         self.secret_key = secret_key
@@ -25,6 +28,7 @@ class FileStorageService:
             secret_key=secret_key,
             secure=False
         )
+        self.metadata_cache = metadata_cache or ObjectMetadataCache(ttl_seconds=0)
         self.logger = get_logger(self.__class__.__name__)        
 
     ########
@@ -56,43 +60,75 @@ class FileStorageService:
             object_name=local_file.remote_file_path,
             file_path=local_file.local_path
         )
+        self.metadata_cache.invalidate(bucket=local_file.bucket, key=local_file.remote_file_path)
             
         self.logger.info(f"{local_file.local_path} successfully uploaded as object {local_file.remote_file_path}")
         return result.object_name
     
     def read_file(self, target_file: FSFile) -> Tuple[FSFile, Optional[str]]:
         result = None
+        response = None
         try:
-            if not target_file.file_name:
-                self.logger.info("No file name specified, fetching by type...")
-                target_file = self.__fetch_document_from_directory(target_file=target_file)
+            target_file = self.find_file(target_file=target_file)
             if not self.check_object_exists(remote_file=target_file):
-                raise f"Object {target_file.remote_file_path} was not found."
+                raise Exception(f"Object {target_file.remote_file_path} was not found.")
             response = self.client.get_object(bucket_name=target_file.bucket, object_name=target_file.remote_file_path)
             with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-                shutil.copyfileobj(io.BytesIO(response.data), tmp_file)
+                shutil.copyfileobj(response, tmp_file, CHUNK_SIZE)
                 tmp_file_path = tmp_file.name
             self.logger.info(f"File downloaded to temporary location: {tmp_file_path}")
             result = tmp_file_path
         finally:
-            response.close()
-            response.release_conn()
+            if response is not None:
+                response.close()
+                response.release_conn()
         return target_file, result
     
     def read_file_from_url(self, bucket: str, file_url: str) -> str:
         result = None
+        response = None
         try:
             response = self.client.get_object(bucket_name=bucket, object_name=file_url)
             with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-                shutil.copyfileobj(io.BytesIO(response.data), tmp_file)
+                shutil.copyfileobj(response, tmp_file, CHUNK_SIZE)
                 tmp_file_path = tmp_file.name
             self.logger.info(f"File downloaded to temporary location: {tmp_file_path}")
             result = tmp_file_path
         finally:
-            response.close()
-            response.release_conn()
+            if response is not None:
+                response.close()
+                response.release_conn()
         return result
 
+    def find_file(self, target_file: FSFile) -> FSFile:
+        """Fills in the file name of a file given by its directory (document type) only."""
+        if not target_file.file_name:
+            self.logger.info("No file name specified, fetching by type...")
+            target_file = self.__fetch_document_from_directory(target_file=target_file)
+        return target_file
+
+    def open_object(self, bucket: str, object_name: str, byte_range: Optional[tuple[int, int]] = None, etag: Optional[str] = None) -> Optional[BaseHTTPResponse]:
+        """
+        Opens a streamed download of the object, or of its inclusive `byte_range`.
+
+        With `etag`, the object must still have that ETag; None is returned if it has changed or
+        is gone since its metadata was read. The caller closes and releases the response.
+        """
+        offset, length = (byte_range[0], byte_range[1] - byte_range[0] + 1) if byte_range else (0, 0)
+        try:
+            return self.client.get_object(
+                bucket_name=bucket,
+                object_name=object_name,
+                offset=offset,
+                length=length,
+                request_headers={"If-Match": etag} if etag else None
+            )
+        except S3Error as e:
+            if e.code not in ("PreconditionFailed", "NoSuchKey"):
+                raise e
+            self.metadata_cache.invalidate(bucket=bucket, key=object_name)
+            return None
+
     def upsert_file(self, target_file: LocalFile):
         self.logger.info(f"Upserting file {target_file.remote_file_path}...")
         self.delete_file(target_file=target_file)
@@ -107,6 +143,8 @@ class FileStorageService:
         except Exception as e:
             self.logger.error(f"Failed to remove object {target_file.remote_file_path}: {str(e)}")
             raise e
+        finally:
+            self.metadata_cache.invalidate_prefix(bucket=target_file.bucket, prefix=self.__construct_file_path(target_file=target_file))
         
     def __fetch_document_from_directory(self, target_file: FSFile) -> FSFile:
         path = self.__construct_file_path(target_file=target_file)
@@ -118,7 +156,7 @@ class FileStorageService:
         for obj in objects_from_dir:
             target_file.file_name = Path(obj.object_name).name
             return target_file
-        raise ValueError(f"No objects for {path}")
+        raise FileNotFoundError(f"No objects for {path}")
         
     def __delete_directory(self, target_file: FSFile):
         objects_to_delete = self.client.list_objects(target_file.bucket, prefix=self.__construct_file_path(target_file=target_file), recursive=True)
@@ -134,21 +172,28 @@ class FileStorageService:
         return path
         
     def check_object_exists(self, local_file: Optional[LocalFile] = None, remote_file: Optional[LocalFile] = None) -> bool:
+        return self.stat_file(local_file=local_file, remote_file=remote_file) is not None
+
+    def stat_file(self, local_file: Optional[LocalFile] = None, remote_file: Optional[FSFile] = None) -> Optional[S3Object]:
+        """Metadata of the remote object (`stat_object`, never the body), or None if it does not exist."""
+        assert local_file or remote_file, "Either local or remote file has to be provided"
+        file = local_file or remote_file
+        bucket = file.bucket
+        remote_file_path = file.remote_file_path
+
+        found, metadata = self.metadata_cache.get(bucket=bucket, key=remote_file_path)
+        if found:
+            return metadata
+        generation = self.metadata_cache.generation()
         try:
-            assert local_file or remote_file, "Either local or remote file has to be provided"
-            if local_file:
-                bucket = local_file.bucket
-                remote_file_path = local_file.remote_file_path
-            else:
-                bucket = remote_file.bucket
-                remote_file_path = remote_file.remote_file_path
-                
-            current = self.client.get_object(bucket_name=bucket, object_name=remote_file_path)
-            return current.url is not None
-        except Exception as e:
-            if isinstance(e, S3Error) and e.code == 'NoSuchKey':
-                return False
-            raise e
+            stat = self.client.stat_object(bucket_name=bucket, object_name=remote_file_path)
+            metadata = S3Object(key=remote_file_path, size=stat.size, etag=f'"{stat.etag}"', last_modified=stat.last_modified)
+        except S3Error as e:
+            if e.code not in ("NoSuchKey", "NoSuchBucket", "ResourceNotFound"):
+                raise e
+            metadata = None
+        self.metadata_cache.put(bucket=bucket, key=remote_file_path, metadata=metadata, generation=generation)
+        return metadata
 
 
 
@@ -0,0 +1,175 @@
+import asyncio
+import os
+from functools import lru_cache
+from typing import Literal, Optional
+
+from app.core.jobs.job_store import JobStore
+from app.core.logger import get_logger
+from app.core.settings import get_settings
+from app.infra.rag_engine.instances_rag_engine_wrapper import get_rag_engine_wrapper
+from app.models.files import LocalFile
+from app.models.ingestion_job import IngestionJob, IngestionJobPayload
+
+
+class IngestionJobService:
+    """
+    Runs document uploads and upserts in the background.
+
+    Jobs are persisted in a `JobStore` and processed by a pool of worker tasks, which keep the
+    lease of the job they run alive. Each job goes through `IngestionJob.STAGES`; completed stages
+    are recorded, so a retried job skips them. The knowledge base stage itself resumes from the
+    nodes already written. Failed jobs are retried automatically up to `max_attempts` times, unless
+    their input is invalid, and can be re-queued manually.
+    """
+    def __init__(self, store: JobStore, workers: int, max_attempts: int, poll_interval: float):
+        self.store = store
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.poll_interval = poll_interval
+        self.logger = get_logger(self.__class__.__name__)
+
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker_tasks: list[asyncio.Task] = []
+
+    async def start(self) -> None:
+        await self.store.open()
+        self._wakeup = asyncio.Event()
+        self._worker_tasks = [asyncio.create_task(self.__worker(index)) for index in range(self.workers)]
+        self.logger.info(f"Started {self.workers} ingestion workers.")
+
+    async def stop(self) -> None:
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        released = await self.store.release()
+        if released:
+            self.logger.info(f"Re-queued {released} interrupted ingestion jobs.")
+        await self.store.close()
+
+    async def submit(self, operation: Literal["upload", "upsert"], payload: IngestionJobPayload) -> IngestionJob:
+        job = await self.store.create(operation=operation, payload=payload)
+        self.logger.info(f"Queued {operation} job {job.job_id} for {payload.local_file_path}.")
+        self.__wake_workers()
+        return job
+
+    async def get_job(self, job_id: str) -> Optional[IngestionJob]:
+        return await self.store.get(job_id)
+
+    async def retry_job(self, job_id: str) -> Optional[IngestionJob]:
+        """Re-queues a failed job. Returns None if the job does not exist or has not failed."""
+        if not await self.store.requeue(job_id):
+            return None
+        self.__wake_workers()
+        return await self.store.get(job_id)
+
+    def __wake_workers(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def __worker(self, index: int) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                job = await self.store.claim_next()
+            except Exception as e:
+                self.logger.error(f"Ingestion worker {index} failed to claim a job: {str(e)}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.__run(job)
+
+    async def __run(self, job: IngestionJob) -> None:
+        rag_engine_wrapper = get_rag_engine_wrapper()
+        progress = job.progress
+
+        async def report(stage: str, counters: dict) -> None:
+            for key, value in counters.items():
+                setattr(progress, key, value)
+            job.stage = stage
+            await self.store.update_progress(job_id=job.job_id, stage=stage, progress=progress)
+
+        self.logger.info(f"Running {job.operation} job {job.job_id} (attempt {job.attempts}).")
+        heartbeat = asyncio.create_task(self.__heartbeat(job))
+        try:
+            # Invalid input fails the same way on every attempt, so it is not retried
+            file = build_local_file(job.payload)
+            for stage in IngestionJob.STAGES:
+                if stage in job.completed_stages:
+                    continue
+                if stage == "file_storage":
+                    await report("file_storage", {})
+                    await rag_engine_wrapper.store_document(file=file, operation=job.operation)
+                elif stage == "knowledge_base":
+                    await rag_engine_wrapper.index_document(
+                        file=file,
+                        operation=job.operation,
+                        progress=report,
+                        resume=job.attempts > 1
+                    )
+                await self.store.complete_stage(job=job, stage=stage)
+
+            await self.store.finish(job_id=job.job_id, status="succeeded")
+            self.logger.info(f"Job {job.job_id} succeeded.")
+        except asyncio.CancelledError:
+            # Left as `running`; released by `stop`, or claimed again once its lease expires
+            raise
+        except InvalidIngestionInput as e:
+            self.logger.error(f"Job {job.job_id} has invalid input: {str(e)}")
+            await self.store.finish(job_id=job.job_id, status="failed", error=str(e))
+        except Exception as e:
+            status = "queued" if job.attempts < self.max_attempts else "failed"
+            self.logger.error(f"Job {job.job_id} failed at stage `{job.stage}` (attempt {job.attempts}): {str(e)}")
+            await self.store.finish(job_id=job.job_id, status=status, error=str(e))
+        finally:
+            heartbeat.cancel()
+
+    async def __heartbeat(self, job: IngestionJob) -> None:
+        while True:
+            await asyncio.sleep(self.store.lease_seconds / 3)
+            try:
+                if not await self.store.renew_lease(job_id=job.job_id):
+                    self.logger.warning(f"Lost the lease of job {job.job_id}; its results will not be recorded.")
+                    return
+            except Exception as e:
+                self.logger.error(f"Failed to renew the lease of job {job.job_id}: {str(e)}")
+
+
+class InvalidIngestionInput(ValueError):
+    pass
+
+
+def build_local_file(payload: IngestionJobPayload) -> LocalFile:
+    """
+    The local file an ingestion job stores and indexes.
+
+    Raises:
+        InvalidIngestionInput: If the document category is unknown or the file does not exist.
+    """
+    try:
+        file = LocalFile(
+            company_id=payload.company_id,
+            project_id=payload.project_id,
+            document_category=payload.document_category,
+            local_path=payload.local_file_path
+        )
+    except (KeyError, ValueError) as e:
+        raise InvalidIngestionInput(f"Unknown document category {payload.document_category}.") from e
+    if not os.path.isfile(file.local_path):
+        raise InvalidIngestionInput(f"File {file.local_path} does not exist.")
+    return file
+
+
+@lru_cache()
+def get_ingestion_job_service() -> IngestionJobService:
+    settings = get_settings()
+    return IngestionJobService(
+        store=JobStore(path=settings.JOBS_DB_PATH, lease_seconds=settings.JOBS_LEASE_SECONDS),
+        workers=settings.JOBS_WORKERS,
+        max_attempts=settings.JOBS_MAX_ATTEMPTS,
+        poll_interval=settings.JOBS_POLL_INTERVAL
+    )
@@ -1,64 +1,136 @@
+import asyncio
+import functools
+import uuid
+from collections import OrderedDict
 from functools import lru_cache
 
-from app.infra.clients.instances_qdrant import get_qdrant_aclient, get_qdrant_client
+from app.infra.clients.instances_qdrant import get_qdrant_aclient, get_qdrant_client, get_collection_layout, get_document_points
+from qdrant_client import models as qmodels
 from app.core.settings import get_settings
-from llama_index.vector_stores.qdrant import QdrantVectorStore
+from app.infra.instances_llamaindex import get_llamaindex_contexts, get_corpus_versions, get_answer_cache
+from app.core.qdrant.collection_layout import PREFILTER_VECTOR_NAME, SPARSE_VECTOR_NAME, is_collection_missing
+from app.core.qdrant.prefilter_vector_store import PrefilterQdrantVectorStore
 from llama_index.core.storage import StorageContext
 from llama_index.core import VectorStoreIndex, Document
-from llama_index.core.readers import SimpleDirectoryReader
-from llama_index.readers.file import PyMuPDFReader
 from llama_index.core.vector_stores import MetadataFilters, ExactMatchFilter
-from llama_index.core.schema import BaseNode
+from llama_index.core.schema import BaseNode, NodeWithScore, QueryBundle
 
-from llama_index.postprocessor.sbert_rerank import SentenceTransformerRerank
+from app.core.rerank.batch_reranker import BatchRerankPostprocessor
+from app.infra.clients.instances_reranker import get_batch_reranker
+from app.infra.parsing.instances_pdf_parser import get_pdf_parsing_engine
+from app.infra.instances_executors import get_executors
 from llama_index.core.query_engine import RetrieverQueryEngine
 
 from app.models.files import KBFile
 
 from llama_index.core.node_parser import SentenceWindowNodeParser
 from llama_index.core.postprocessor import MetadataReplacementPostProcessor
-from app.models.field_extraction import FieldExtraction
+from app.models.field_extraction import FieldExtraction, FieldExtractionBatch, FieldExtractionTask, FieldProvenance
+from app.models.ingestion_job import IngestionProgressCallback
+from llama_index.core.indices.utils import async_embed_nodes
 from llama_index.core.program import LLMTextCompletionProgram
 
 from app.core.logger import get_logger
-from typing import Optional
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
 
 SENTENCE_WINDOW_PARSER = SentenceWindowNodeParser.from_defaults(window_size=3)
+NODE_ID_NAMESPACE = uuid.UUID("6f1f4a4e-2c1b-4d9a-9a57-3c1b6f0e8d21")
 WINDOW_POST = MetadataReplacementPostProcessor(target_metadata_key="window")
 
+@dataclass
+class _IngestionResult:
+    node_ids: set[str]
+    nodes_written: int
+
+def _recover_missing_collection(method):
+    # The collection state is cached; if Qdrant says the collection is gone (e.g. dropped by hand),
+    # forget the state and run the call once more, which re-creates the collection
+    @functools.wraps(method)
+    async def wrapper(self: "KnowledgeBaseService", *args, **kwargs):
+        try:
+            return await method(self, *args, **kwargs)
+        except Exception as e:
+            if not is_collection_missing(e):
+                raise
+            self.logger.warning(f"Collection `{self.layout.collection_name}` is missing, re-creating it: {e}")
+            self.layout.invalidate()
+            self.vector_store.reset_collection_state()
+            return await method(self, *args, **kwargs)
+    return wrapper
+
 class KnowledgeBaseService:
     TOP_K = 6
+    RETRIEVAL_TOP_K = 10
+    WRITE_BATCH_SIZE = 256
+    PIPELINE_QUEUE_SIZE = 2
     
     def __init__(self):
         self.async_client = get_qdrant_aclient()
         self.client = get_qdrant_client()
         self.base_settings = get_settings()
-        self.vector_store = QdrantVectorStore(
+        self.layout = get_collection_layout()
+        self.points = get_document_points()
+        sharding = {}
+        if self.layout.shard_by_company:
+            # The store only uses `shard_keys` when it creates the collection itself, which never
+            # happens here: the layout creates the collection and one shard key per company on demand
+            sharding = {
+                "sharding_method": qmodels.ShardingMethod.CUSTOM,
+                "shard_key_selector_fn": self.layout.shard_key_selector,
+                "shard_keys": ["unused"],
+            }
+        self.vector_store = PrefilterQdrantVectorStore(
+            prefilter_vector_name=PREFILTER_VECTOR_NAME,
+            prefilter_dimension=self.layout.prefilter_dimension,
+            prefilter_limit=self.base_settings.QDRANT_PREFILTER_LIMIT,
+            search_params=self.layout.search_params(),
+            sparse_encoder=self.layout.sparse_encoder,
+            sparse_vector_name=SPARSE_VECTOR_NAME,
+            hybrid_limit=self.base_settings.QDRANT_HYBRID_PREFETCH_LIMIT,
             collection_name=self.base_settings.QDRANT_COLLECTION,
             client=self.client,
-            aclient=self.async_client
+            aclient=self.async_client,
+            **sharding
         )
         self.storage_context = StorageContext.from_defaults(vector_store=self.vector_store)
         
+        self.embed_model = get_llamaindex_contexts()["embed_model"]
         self.index = VectorStoreIndex.from_vector_store(
             vector_store=self.vector_store,
+            embed_model=self.embed_model,
         )
                 
-        self.reranker = SentenceTransformerRerank(
-            model="cross-encoder/ms-marco-MiniLM-L-6-v2",
-            top_n=6,
+        self.reranker = BatchRerankPostprocessor(
+            reranker=get_batch_reranker(),
+            top_n=self.base_settings.RERANK_TOP_N,
         )
+        self.pdf_parser = get_pdf_parsing_engine()
+        self.executors = get_executors()
+        self.corpus_versions = get_corpus_versions()
+        self.answer_cache = get_answer_cache() if self.base_settings.ANSWER_CACHE_ENABLED else None
+
+        # Query engines keyed by (filter tuple, k), least recently used first
+        self.__query_engines: OrderedDict[tuple, RetrieverQueryEngine] = OrderedDict()
+        self.__extraction_program: Optional[LLMTextCompletionProgram] = None
+        self.__batch_extraction_program: Optional[LLMTextCompletionProgram] = None
                 
         self.logger = get_logger(self.__class__.__name__)
                     
-    async def upload_document(self, file: KBFile):
+    @_recover_missing_collection
+    async def upload_document(self, file: KBFile, progress: Optional[IngestionProgressCallback] = None, resume: bool = False):
         """
         Asynchronously adds a document to the knowledge base.
         This method checks if the default collection exists and creates it if necessary.
         It then verifies that nodes for the given file do not already exist to prevent duplicates.
-        The document is loaded and parsed into nodes, which are then inserted into the index.
+        The document is streamed page by page into nodes, which are embedded and inserted into the
+        index in batches while the rest of the file is still being parsed.
         Args:
             file (KBFile): The file object containing document data to be added.
+            progress (Optional[IngestionProgressCallback]): Awaited with the current stage and counters
+                (pages parsed, nodes embedded, nodes written) as ingestion advances.
+            resume (bool): Continue an interrupted upload of the same file - skips the duplicate check
+                and inserts only nodes that are not stored yet.
         Raises:
             Exception: If nodes already exist for the given file ID.
             ValueError: If no documents are extracted from the provided file.
@@ -68,19 +140,24 @@ class KnowledgeBaseService:
             Use `upsert_document` if you intend to update an existing document.
         """
         # Adds a new document to the knowledge base after performing necessary checks.
-        await self.__check_create_default_collection()
+        await self.layout.ensure_collection(company_id=file.company_id)
             
-        if await self.check_nodes_exist(file=file):
+        if not resume and await self.check_nodes_exist(file=file):
             raise Exception("Nodes already exist for given `file_id`. Did you mean to use `upsert_document`?")
         
-        docs = self.__load_documents(file=file)
-        if not docs:
-            raise ValueError(f"No docs extracted from file: {file.local_path}")
-        
-        nodes = await SENTENCE_WINDOW_PARSER.aget_nodes_from_documents(documents=docs)
-        await self.index.ainsert_nodes(nodes)
-        self.logger.info(f"Document {file.file_id} has been added to the knowledge base. Nodes count: {len(nodes)}.")
+        existing_ids = set()
+        if resume:
+            existing_ids = await self.points.ids(
+                company_id=file.company_id,
+                project_id=file.project_id,
+                document_category=file.document_category,
+                document_type=file.document_type,
+                file_name=file.file_name
+            )
+        result = await self.__ingest(file=file, progress=progress, skip_ids=existing_ids)
+        self.logger.info(f"Document {file.file_id} has been added to the knowledge base. Nodes count: {result.nodes_written}.")
         
+    @_recover_missing_collection
     async def query(self, question: str, company_id: str, project_id: str, document_type: Optional[str] = None, document_category: Optional[str] = None, file_name: Optional[str] = None, k: int = 5) -> str:
         """
         Asynchronously queries the knowledge base for relevant information based on the provided question and metadata filters.
@@ -96,16 +173,38 @@ class KnowledgeBaseService:
             Any: The response from the query engine containing relevant information.
         Note:
             This method constructs metadata filters based on the provided arguments and queries the index asynchronously.
+            Answers are served from the answer cache when the same (or, by embedding similarity, an equivalent)
+            question was answered for the same filters since the project last changed.
         """
+        scope = (company_id, project_id, document_type, document_category, file_name, k)
+        version = self.corpus_versions.get(company_id, project_id)
+        embedding = None
+        if self.answer_cache:
+            if self.answer_cache.uses_embeddings:
+                embedding = await self.embed_model.aget_query_embedding(question)
+            answer = self.answer_cache.get(scope, question, embedding=embedding)
+            if answer is not None:
+                return answer
+
         query_engine = await self.__build_query_engine(
             company_id=company_id, project_id=project_id, document_type=document_type, document_category=document_category, file_name=file_name, k=k
         )
 
-        response = await query_engine.aquery(question)
+        # The embedding computed for the cache lookup is reused for retrieval
+        response = await query_engine.aquery(QueryBundle(query_str=question, embedding=embedding))
+        if self.answer_cache and response.response is not None:
+            self.answer_cache.put(scope, question, response.response, version=version, embedding=embedding)
         return response.response
     
     async def __build_query_engine(self, company_id: str, project_id: str, document_type: Optional[str] = None, document_category: Optional[str] = None, file_name: Optional[str] = None, k: int = 5) -> RetrieverQueryEngine:
-        await self.__check_create_default_collection()
+        await self.layout.ensure_collection(company_id=company_id)
+
+        # Engines hold no per-query state, so one per filter combination is reused across requests
+        key = (company_id, project_id, document_type, document_category, file_name, k)
+        query_engine = self.__query_engines.get(key)
+        if query_engine is not None:
+            self.__query_engines.move_to_end(key)
+            return query_engine
         
         # Query the knowledge base with metadata filters and return the response
         filters = MetadataFilters(
@@ -122,24 +221,28 @@ class KnowledgeBaseService:
         if file_name:
             filters.filters.append(ExactMatchFilter(key="file_name", value=file_name))
 
+        # On hybrid collections the vector store fuses dense and BM25 results (RRF) under this retriever
         retriever = self.index.as_retriever(
-            similarity_top_k=10,
-            filters=filters
+            similarity_top_k=KnowledgeBaseService.RETRIEVAL_TOP_K,
+            filters=filters,
+            vector_store_kwargs=self.__shard_kwargs(company_id=company_id)
         )
         
-        # 3. Create a FRESH Fusion Retriever
-        from llama_index.core.response_synthesizers.type import ResponseMode
         query_engine = RetrieverQueryEngine.from_args(
             retriever=retriever,
             node_postprocessors=[self.reranker]
         )
-        
+
+        self.__query_engines[key] = query_engine
+        while len(self.__query_engines) > self.base_settings.QUERY_ENGINE_CACHE_SIZE:
+            self.__query_engines.popitem(last=False)
         return query_engine
     
     async def fill_a_field(self, company_id: str, project_id: str, system_prompt: str, user_prompt: str) -> str:
         full_prompt = system_prompt + "\n" + user_prompt
         return await self.query(question=full_prompt, company_id=company_id, project_id=project_id)
     
+    @_recover_missing_collection
     async def delete_document(self, company_id: str, project_id: str, document_category: str, document_type: str):
         # Deletes all nodes and associated data for a specific document in the knowledge base.
         """
@@ -158,19 +261,19 @@ class KnowledgeBaseService:
         Returns:
             None
         """
-        await self.__check_create_default_collection()
+        await self.layout.ensure_collection(company_id=company_id)
         
-        nodes = await self.__get_nodes_for_document(
-            company_id=company_id,
-            project_id=project_id,
-            document_category=document_category,
-            document_type=document_type
-        )
-        if len(nodes) == 0:
+        conditions = {
+            "company_id": company_id,
+            "project_id": project_id,
+            "document_category": document_category,
+            "document_type": document_type
+        }
+        if not await self.points.exists(**conditions):
             self.logger.info("No nodes matching given parameters were found. Nothing to delete.")
             return
-        node_ids = [node.node_id for node in nodes]
-        await self.index.vector_store.adelete_nodes(node_ids=node_ids)
+        await self.points.delete(**conditions)
+        self.corpus_versions.bump(company_id, project_id)
         file_path = self.__construct_file_id_from_data(
             company_id,
             project_id,
@@ -179,17 +282,21 @@ class KnowledgeBaseService:
         )
         self.logger.info(f"Deleted nodes with path: {file_path}.")
         
-    async def upsert_document(self, file: KBFile):
+    @_recover_missing_collection
+    async def upsert_document(self, file: KBFile, progress: Optional[IngestionProgressCallback] = None):
         """
         Upserts a document in the knowledge base.
 
-        This method first deletes any existing document matching the provided file's
-        company ID, project ID, document category, and document type. It then adds
-        the new document to the knowledge base.
+        The new file is parsed into nodes with stable, content-derived ids. These are compared
+        with the ids already stored for the provided file's company ID, project ID, document
+        category, and document type: only nodes that are new get embedded and inserted, and
+        only nodes that no longer exist get deleted. Unchanged nodes are left untouched.
 
         Args:
             file (KBFile): The document file to upsert, containing metadata such as
                 company_id, project_id, document_category, and document_type.
+            progress (Optional[IngestionProgressCallback]): Awaited with the current stage and counters
+                as ingestion advances.
 
         Returns:
             None
@@ -197,74 +304,148 @@ class KnowledgeBaseService:
         Note:
             This operation is asynchronous.
         """
-        await self.__check_create_default_collection()
+        await self.layout.ensure_collection(company_id=file.company_id)
         
-        # Deletes existing document and adds the new one to ensure up-to-date content.
-        await self.delete_document(
+        existing_ids = await self.points.ids(
             company_id=file.company_id,
             project_id=file.project_id,
             document_category=file.document_category,
             document_type=file.document_type
-       )
-        await self.upload_document(file=file)
+        )
         
-    def __load_documents(self, file: KBFile) -> list[Document]:
-        reader = SimpleDirectoryReader(
-            input_files=[file.local_path],
-            filename_as_id=False,
-            file_extractor={".pdf": PyMuPDFReader()}
+        # Insert before deleting, so the document never disappears from search mid-upsert
+        result = await self.__ingest(file=file, progress=progress, skip_ids=existing_ids)
+        removed_ids = existing_ids - result.node_ids
+        if removed_ids:
+            await self.vector_store.adelete_nodes(node_ids=list(removed_ids), **self.__shard_kwargs(company_id=file.company_id))
+            self.corpus_versions.bump(file.company_id, file.project_id)
+        self.logger.info(
+            f"Document {file.file_id} has been upserted. Nodes inserted: {result.nodes_written}, "
+            f"deleted: {len(removed_ids)}, unchanged: {len(result.node_ids) - result.nodes_written}."
         )
         
-        docs = reader.load_data()
-        for d in docs:
-            d.metadata.setdefault("page_label", d.metadata.get("source", None))
-            d.metadata.setdefault("company_id", file.company_id)
-            d.metadata.setdefault("project_id", file.project_id)
-            d.metadata.setdefault("document_category", file.document_category)
-            d.metadata.setdefault("document_type", file.document_type)
-            d.metadata.setdefault("file_name", file.file_name)
-            d.metadata.setdefault("file_id", file.file_id)
-            d.metadata.setdefault("doc_id", file.file_id)
-        return docs
+    async def __ingest(self, file: KBFile, progress: Optional[IngestionProgressCallback] = None, skip_ids: set[str] = frozenset()) -> _IngestionResult:
+        # Streams pages -> sentence-window nodes -> embedding batches -> Qdrant writes. The stages run
+        # concurrently and are connected by bounded queues, so memory does not grow with the file
+        # and the first batches are searchable while the rest of the file is still being parsed.
+        batch_size = KnowledgeBaseService.WRITE_BATCH_SIZE
+        to_embed = asyncio.Queue(maxsize=KnowledgeBaseService.PIPELINE_QUEUE_SIZE)
+        to_write = asyncio.Queue(maxsize=KnowledgeBaseService.PIPELINE_QUEUE_SIZE)
+        counters = {"pages_parsed": 0, "nodes_total": 0, "nodes_embedded": 0, "nodes_written": 0}
+        node_ids = set()
         
-    async def __get_nodes_for_document(self, company_id: str, project_id: str, document_category: str, document_type: Optional[str] = None, file_name: Optional[str] = None) -> list[BaseNode]:
-        await self.__check_create_default_collection()
+        async def report(stage: str) -> None:
+            if progress:
+                await progress(stage, dict(counters))
         
-        filters = MetadataFilters(
-                filters=[
-                    ExactMatchFilter(key="company_id", value=company_id),
-                    ExactMatchFilter(key="project_id", value=project_id),
-                    ExactMatchFilter(key="document_category", value=document_category)
-                ]
-        )
+        async def parse() -> None:
+            pending = []
+            async for docs in self.__iter_documents(file=file):
+                # Sentence splitting (nltk) is CPU-bound and synchronous even behind the async API
+                nodes = await self.executors.run_cpu(self.__parse_nodes, docs=docs, file=file)
+                for node in nodes:
+                    if node.node_id in node_ids:
+                        continue
+                    node_ids.add(node.node_id)
+                    if node.node_id in skip_ids:
+                        continue
+                    pending.append(node)
+                    if len(pending) >= batch_size:
+                        await to_embed.put(pending)
+                        pending = []
+                counters["pages_parsed"] += len(docs)
+                counters["nodes_total"] = len(node_ids)
+                await report("parsing")
+            if not counters["pages_parsed"]:
+                raise ValueError(f"No docs extracted from file: {file.local_path}")
+            if pending:
+                await to_embed.put(pending)
+            await to_embed.put(None)
         
-        if document_type:
-            filters.filters.append(ExactMatchFilter(key="document_type", value=document_type))
-        if file_name:
-            filters.filters.append(ExactMatchFilter(key="file_name", value=file_name))
-            
-        nodes = await self.index.vector_store.aget_nodes(filters=filters)
-        return nodes
+        async def embed() -> None:
+            while (batch := await to_embed.get()) is not None:
+                embeddings = await async_embed_nodes(nodes=batch, embed_model=self.embed_model)
+                for node in batch:
+                    node.embedding = embeddings[node.node_id]
+                counters["nodes_embedded"] += len(batch)
+                await report("embedding")
+                await to_write.put(batch)
+            await to_write.put(None)
+        
+        async def write() -> None:
+            while (batch := await to_write.get()) is not None:
+                await self.index.ainsert_nodes(batch, **self.__shard_kwargs(company_id=file.company_id))
+                counters["nodes_written"] += len(batch)
+                await report("writing")
+        
+        try:
+            async with asyncio.TaskGroup() as group:
+                group.create_task(parse())
+                group.create_task(embed())
+                group.create_task(write())
+        except ExceptionGroup as e:
+            raise e.exceptions[0] from e
+        finally:
+            # Written batches are searchable right away, also when ingestion fails midway
+            if counters["nodes_written"]:
+                self.corpus_versions.bump(file.company_id, file.project_id)
+        return _IngestionResult(node_ids=node_ids, nodes_written=counters["nodes_written"])
     
-    async def check_nodes_exist(self, file: KBFile) -> bool:
-        await self.__check_create_default_collection()
-        nodes = await self.__get_nodes_for_document(
-                                                    company_id=file.company_id,
-                                                    project_id=file.project_id,
-                                                    document_category=file.document_category,
-                                                    document_type=file.document_type,
-                                                    file_name=file.file_name
-                                                    )
-        return len(nodes) > 0
-
-    async def __check_default_collection_exists(self) -> bool:
-        return await self.async_client.collection_exists(collection_name=self.base_settings.QDRANT_COLLECTION)
+    def __parse_nodes(self, docs: list[Document], file: KBFile) -> list[BaseNode]:
+        nodes = SENTENCE_WINDOW_PARSER.get_nodes_from_documents(documents=docs)
+        return self.__assign_stable_node_ids(nodes=nodes, file=file)
     
-    async def __create_default_collection(self):
-        await self.async_client.create_collection(
-                collection_name=self.base_settings.QDRANT_COLLECTION,
-                vectors_config={"size": self.base_settings.EMBEDDING_DIMENSION, "distance": "Cosine"}
-            )
+    def __assign_stable_node_ids(self, nodes: list[BaseNode], file: KBFile) -> list[BaseNode]:
+        # Node ids derived from content, so re-parsing an unchanged page yields the same ids
+        id_map = {}
+        unique_nodes = {}
+        for node in nodes:
+            fingerprint = "\x1f".join([
+                file.file_id,
+                str(node.metadata.get("page_label")),
+                node.metadata.get("window") or "",
+                node.get_content()
+            ])
+            node_id = str(uuid.uuid5(NODE_ID_NAMESPACE, fingerprint))
+            id_map[node.node_id] = node_id
+            node.id_ = node_id
+            unique_nodes.setdefault(node_id, node)
+        
+        for node in unique_nodes.values():
+            for relationship in node.relationships.values():
+                if hasattr(relationship, "node_id") and relationship.node_id in id_map:
+                    relationship.node_id = id_map[relationship.node_id]
+        return list(unique_nodes.values())
+        
+    async def __iter_documents(self, file: KBFile) -> AsyncIterator[list[Document]]:
+        async for docs in self.pdf_parser.iter_pages(path=file.local_path):
+            for d in docs:
+                d.metadata.setdefault("page_label", d.metadata.get("source", None))
+                d.metadata.setdefault("company_id", file.company_id)
+                d.metadata.setdefault("project_id", file.project_id)
+                d.metadata.setdefault("document_category", file.document_category)
+                d.metadata.setdefault("document_type", file.document_type)
+                d.metadata.setdefault("file_name", file.file_name)
+                d.metadata.setdefault("file_id", file.file_id)
+                d.metadata.setdefault("doc_id", file.file_id)
+            yield docs
+        
+    @_recover_missing_collection
+    async def check_nodes_exist(self, file: KBFile) -> bool:
+        await self.layout.ensure_collection(company_id=file.company_id)
+        return await self.points.exists(
+            company_id=file.company_id,
+            project_id=file.project_id,
+            document_category=file.document_category,
+            document_type=file.document_type,
+            file_name=file.file_name
+        )
+
+    def __shard_kwargs(self, company_id: str) -> dict:
+        # Routes LlamaIndex vector store calls to the company's shard when sharding by company
+        if not self.layout.shard_by_company:
+            return {}
+        return {"shard_identifier": company_id}
         
     def __construct_file_id_from_data(self, company_id: str, project_id: str, document_category: str, document_type: str, file_name: Optional[str] = None) -> str:
         if file_name:
@@ -308,17 +489,83 @@ class KnowledgeBaseService:
                     extracted_value = unique_values[0]
         return extracted_value
     
-    async def __retrieve_context_for_field(self, company_id: str, project_id: str, instruction: str) -> str:
-        query_engine = await self.__build_query_engine(company_id=company_id, project_id=project_id)
-        from llama_index.core.schema import QueryBundle
+    async def __retrieve_nodes_for_field(self, company_id: str, project_id: str, instruction: str) -> list[NodeWithScore]:
+        nodes_per_field = await self.retrieve_nodes_for_fields(company_id=company_id, project_id=project_id, instructions=[instruction])
+        return nodes_per_field[0]
+    
+    @_recover_missing_collection
+    async def retrieve_nodes_for_fields(self, company_id: str, project_id: str, instructions: list[str]) -> list[list[NodeWithScore]]:
+        """
+        Retrieves context nodes for many field instructions at once.
+
+        All instructions are embedded in a single embedding batch and searched with a single
+        Qdrant batch query sharing the company/project filter. Candidates of every field are
+        then reranked and window-expanded exactly like in single-field retrieval.
+
+        Args:
+            company_id (str): The company identifier to filter documents.
+            project_id (str): The project identifier to filter documents.
+            instructions (list[str]): Field instructions, one per field.
+
+        Returns:
+            list[list[NodeWithScore]]: Top nodes for each instruction, in input order.
+        """
+        if not instructions:
+            return []
+        await self.layout.ensure_collection(company_id=company_id)
+        
+        embeddings = await self.embed_model.aget_text_embedding_batch(instructions)
+        query_filter = self.points.build_filter(company_id=company_id, project_id=project_id)
+        requests = [
+            await self.vector_store.build_query_request(
+                embedding=embedding,
+                query_filter=query_filter,
+                limit=KnowledgeBaseService.RETRIEVAL_TOP_K,
+                shard_key=self.layout.shard_key_selector(company_id),
+                query_text=instruction
+            )
+            for instruction, embedding in zip(instructions, embeddings)
+        ]
+        responses = await self.async_client.query_batch_points(
+            collection_name=self.base_settings.QDRANT_COLLECTION,
+            requests=requests
+        )
+        
+        async def postprocess(instruction: str, points: list) -> list[NodeWithScore]:
+            result = self.vector_store.parse_to_query_result(points)
+            nodes = [NodeWithScore(node=node, score=score) for node, score in zip(result.nodes, result.similarities)]
+            nodes = await self.reranker.apostprocess_nodes(nodes, query_str=instruction)
+            windowed_nodes = WINDOW_POST.postprocess_nodes(nodes, query_str=instruction)
+            return windowed_nodes[:KnowledgeBaseService.TOP_K]
         
-        query = QueryBundle(query_str=instruction)
-        nodes = await query_engine.aretrieve(query_bundle=query)
-        windowed_nodes = WINDOW_POST.postprocess_nodes(nodes, query_str=instruction)
-        top_nodes = windowed_nodes[:KnowledgeBaseService.TOP_K]
-        context = self.__build_context_snippets(top_nodes, max_chars_per_snip=1500)
-        return context
+        return list(await asyncio.gather(*(
+            postprocess(instruction, response.points) for instruction, response in zip(instructions, responses)
+        )))
+    
+    def __merge_nodes_for_fields(self, nodes_per_field: list[list[NodeWithScore]], max_nodes: int) -> list[NodeWithScore]:
+        # Round-robin over the per-field rankings so every field keeps its best nodes in the shared context
+        merged = []
+        seen = set()
+        for rank in range(max((len(nodes) for nodes in nodes_per_field), default=0)):
+            for nodes in nodes_per_field:
+                if rank >= len(nodes) or nodes[rank].node.node_id in seen:
+                    continue
+                seen.add(nodes[rank].node.node_id)
+                merged.append(nodes[rank])
+                if len(merged) >= max_nodes:
+                    return merged
+        return merged
     
+    def __get_extraction_program(self) -> LLMTextCompletionProgram:
+        if self.__extraction_program is None:
+            self.__extraction_program = self.__make_extraction_program()
+        return self.__extraction_program
+
+    def __get_batch_extraction_program(self) -> LLMTextCompletionProgram:
+        if self.__batch_extraction_program is None:
+            self.__batch_extraction_program = self.__make_batch_extraction_program()
+        return self.__batch_extraction_program
+
     def __make_extraction_program(self):
         from llama_index.core.output_parsers.pydantic import PydanticOutputParser
         from llama_index.core.settings import Settings
@@ -344,25 +591,109 @@ class KnowledgeBaseService:
 
         return program
     
-    async def extract_field(self, company_id: str, project_id: str, field_prompt: str, field_type: str) -> FieldExtraction:
+    def __make_batch_extraction_program(self):
+        from llama_index.core.output_parsers.pydantic import PydanticOutputParser
+        from llama_index.core.settings import Settings
+        parser = PydanticOutputParser(output_cls=FieldExtractionBatch)
+        template = (
+            "Jesteś asystentem do ekstrakcji danych. Używaj wyłącznie Kontekstu do odpowiedzi.\n"
+            "Zadanie: wyodrębnij wartości dla KAŻDEGO z poniższych pól.\n\n"
+            "Pola:\n{fields}\n\n"
+            "WAŻNE ZASADY:\n"
+            "- Zwróć dokładnie jeden wpis na każde pole, z field_id skopiowanym z listy pól\n"
+            "- Jeśli pole pojawia się z TĄ SAMĄ wartością wielokrotnie, zwróć tę pojedynczą wartość jako string\n"
+            "- Jeśli pole pojawia się z RÓŻNYMI wartościami, zwróć je jako listę\n"
+            "- Jeśli pole nie zostało znalezione lub masz wątpliwości, ustaw value=null i confidence=0\n"
+            "- Ustaw confidence w zakresie od 0.0 (niepewne) do 1.0 (pewne)\n"
+            "- Podaj krótkie uzasadnienie każdej ekstrakcji\n\n"
+            "Zwróć ściśle JSON zgodny ze schematem: FieldExtractionBatch(extractions=[KeyedFieldExtraction(field_id, value, confidence, reasoning)]).\n\n"
+            "Kontekst:\n{context}\n"
+        )
+
+        program = LLMTextCompletionProgram.from_defaults(
+            output_parser=parser,
+            prompt_template_str=template,
+            llm=Settings.llm
+        )
+
+        return program
+    
+    async def extract_fields(self, company_id: str, project_id: str, tasks: list[FieldExtractionTask], nodes_per_field: Optional[list[list[NodeWithScore]]] = None) -> dict[str, FieldExtraction]:
+        """
+        Extracts several related fields with a single LLM call.
+
+        Context is retrieved for every field separately, merged into one shared, deduplicated
+        context (at most `EXTRACTION_BATCH_MAX_SNIPPETS` snippets) and sent together with the
+        list of field instructions. Fields missing from the model's answer are left out of the result.
+
+        Args:
+            company_id (str): The company identifier to filter documents.
+            project_id (str): The project identifier to filter documents.
+            tasks (list[FieldExtractionTask]): The fields to extract.
+            nodes_per_field (Optional[list[list[NodeWithScore]]]): Context nodes already retrieved for each task
+                (see `retrieve_nodes_for_fields`). Retrieved per field when not provided.
+
+        Returns:
+            dict[str, FieldExtraction]: Extractions keyed by `field_id`, for the fields the model answered.
+        """
+        if nodes_per_field is None:
+            nodes_per_field = await asyncio.gather(*(
+                self.__retrieve_nodes_for_field(company_id=company_id, project_id=project_id, instruction=task.prompt)
+                for task in tasks
+            ))
+        nodes = self.__merge_nodes_for_fields(
+            nodes_per_field=nodes_per_field,
+            max_nodes=self.base_settings.EXTRACTION_BATCH_MAX_SNIPPETS
+        )
+        context = self.__build_context_snippets(nodes, max_chars_per_snip=1500)
+        fields = "\n".join(
+            f"- field_id={task.field_id} (typ: {task.field_type}): {task.prompt.strip()}" for task in tasks
+        )
+        
+        program: LLMTextCompletionProgram = self.__get_batch_extraction_program()
+        batch: FieldExtractionBatch = await program.acall(fields=fields, context=context)
+        
+        returned = {extraction.field_id: extraction for extraction in batch.extractions}
+        results = {}
+        for task, field_nodes in zip(tasks, nodes_per_field):
+            extraction = returned.get(task.field_id)
+            if extraction is None:
+                self.logger.warning(f"Field `{task.field_id}` missing from batch extraction response.")
+                continue
+            results[task.field_id] = FieldExtraction(
+                value=self.__transform_retrieved_value(extracted_value=extraction.value, field_type=task.field_type),
+                confidence=extraction.confidence,
+                reasoning=extraction.reasoning,
+                provenance=self.__build_provenance(retrieved=field_nodes, context=nodes)
+            )
+        return results
+    
+    async def extract_field(self, company_id: str, project_id: str, field_prompt: str, field_type: str, nodes: Optional[list[NodeWithScore]] = None) -> FieldExtraction:
         if field_type == "array":
             print(field_type)
-        context = await self.__retrieve_context_for_field(
-            company_id=company_id,
-            project_id=project_id,
-            instruction=field_prompt
-        )
-        program: LLMTextCompletionProgram = self.__make_extraction_program()
+        if nodes is None:
+            nodes = await self.__retrieve_nodes_for_field(
+                company_id=company_id,
+                project_id=project_id,
+                instruction=field_prompt
+            )
+        context = self.__build_context_snippets(nodes, max_chars_per_snip=1500)
+        program: LLMTextCompletionProgram = self.__get_extraction_program()
         result: FieldExtraction = await program.acall(
             instruction=field_prompt, context=context
         )
         
         extracted_value = self.__transform_retrieved_value(extracted_value=result.value, field_type=field_type)
         result.value = extracted_value
+        result.provenance = self.__build_provenance(retrieved=nodes, context=nodes)
         return result
-    
-    async def __check_create_default_collection(self) -> None:
-        if not (await self.__check_default_collection_exists()):
-            self.logger.info(f"Default collection `{self.base_settings.QDRANT_COLLECTION}` does not exist. Creating...")
-            await self.__create_default_collection()
-            self.logger.info(f"Default collection created.")
+
+    def __build_provenance(self, retrieved: list[NodeWithScore], context: list[NodeWithScore]) -> FieldProvenance:
+        # `retrieved` are the field's own top nodes (compared on regeneration), `context` is everything
+        # the LLM saw - in batched extraction that includes the other fields' nodes
+        file_ids = []
+        for node in context:
+            file_id = node.node.metadata.get("file_id")
+            if file_id and file_id not in file_ids:
+                file_ids.append(file_id)
+        return FieldProvenance(node_ids=[node.node.node_id for node in retrieved], file_ids=file_ids)
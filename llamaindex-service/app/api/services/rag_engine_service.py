@@ -1,16 +1,22 @@
 from app.infra.file_storage.instances_file_storage_wrapper import get_file_storage_wrapper
 from app.infra.knowledge_base.instances_knowledge_base import get_knowledge_base_wrapper
 from app.infra.instances_llamaindex import get_llamaindex_contexts
+from app.infra.instances_executors import get_executors
 from app.core.logger import get_logger
 
 from llama_index.core.storage import StorageContext
 from app.models.files import FSFile, LocalFile, KBFile
-from typing import Optional, Tuple
+from app.models.ingestion_job import IngestionProgressCallback
+from typing import Literal, Optional
+from app.models.schema.diff import SchemaDiff
+from app.core.storage.object_stream import ObjectStream
 
 class RagEngineService:
     def __init__(self):
         self.file_storage_wrapper = get_file_storage_wrapper()
         self.knowledge_base_wrapper = get_knowledge_base_wrapper()
+        # Local file and docx work is blocking: it runs on the executor pools
+        self.executors = get_executors()
         
         self.llamaindex_contexts = get_llamaindex_contexts()
         self.llamaindex_storage_context: StorageContext = self.llamaindex_contexts["storage_context"]
@@ -18,26 +24,36 @@ class RagEngineService:
         self.logger = get_logger(self.__class__.__name__)
         
     async def upload_document(self, file: LocalFile):
-        if not self.file_storage_wrapper.check_object_exists(local_file=file):
-            self.file_storage_wrapper.upload_file(local_file=file)
+        await self.store_document(file=file, operation="upload")
+        await self.index_document(file=file, operation="upload")
+        self.logger.info(f"Document {file.file_id} has been uploaded.")
+                
+    async def upsert_document(self, file: LocalFile):
+        await self.store_document(file=file, operation="upsert")
+        await self.index_document(file=file, operation="upsert")
+        self.logger.info(f"Document {file.file_id} has been upserted.")
+        
+    async def store_document(self, file: LocalFile, operation: Literal["upload", "upsert"]):
+        if operation == "upsert":
+            await self.file_storage_wrapper.upsert_file(target_file=file)
+            return
+        if not await self.file_storage_wrapper.check_object_exists(local_file=file):
+            await self.file_storage_wrapper.upload_file(local_file=file)
         else:
             self.logger.info(f"Document {file.file_id} already exists in file storage. Skipping...")
-        
+            
+    async def index_document(self, file: LocalFile, operation: Literal["upload", "upsert"], progress: Optional[IngestionProgressCallback] = None, resume: bool = False):
         kb_file = KBFile.fromLocalFile(file=file)
-        if not await self.knowledge_base_wrapper.check_nodes_exist(file=kb_file):
-            await self.knowledge_base_wrapper.upload_document(file=kb_file)
+        if operation == "upsert":
+            await self.knowledge_base_wrapper.upsert_document(file=kb_file, progress=progress)
+            return
+        if resume or not await self.knowledge_base_wrapper.check_nodes_exist(file=kb_file):
+            await self.knowledge_base_wrapper.upload_document(file=kb_file, progress=progress, resume=resume)
         else:
             self.logger.info(f"Document {file.file_id} already exists in knowledge base. Skipping...")
-        self.logger.info(f"Document {file.file_id} has been uploaded.")
-                
-    async def upsert_document(self, file: LocalFile):
-        self.file_storage_wrapper.upsert_file(target_file=file)
-        await self.knowledge_base_wrapper.upsert_document(file=KBFile.fromLocalFile(file=file))
-        self.logger.info(f"Document {file.file_id} has been upserted.")
         
-    def read_document(self, file: FSFile) -> Tuple[FSFile, str]:
-        target_file, temp_path = self.file_storage_wrapper.read_file(target_file=file)
-        return target_file, temp_path 
+    async def open_document(self, file: FSFile, range_header: Optional[str] = None, if_none_match: Optional[str] = None) -> ObjectStream:
+        return await self.file_storage_wrapper.open_file(target_file=file, range_header=range_header, if_none_match=if_none_match)
     
     async def query(self, question: str, company_id: str, project_id: str, document_type: Optional[str] = None, document_category: Optional[str] = None, file_name: Optional[str] = None, k: int = 5) -> str:
         response = await self.knowledge_base_wrapper.query(
@@ -51,7 +67,7 @@ class RagEngineService:
         return response
     
     async def delete_document(self, file: FSFile):
-        self.file_storage_wrapper.delete_file(target_file=file)
+        await self.file_storage_wrapper.delete_file(target_file=file)
         await self.knowledge_base_wrapper.delete_document(
             company_id=file.company_id, 
             project_id=file.project_id,
@@ -60,31 +76,141 @@ class RagEngineService:
         )
         self.logger.info(f"Document {file.file_id} has been deleted.")
                 
-    async def generate_document(self, document_type: str, author: str, company_id: str, project_id: str) -> LocalFile:
+    async def generate_document(self, document_type: str, author: str, company_id: str, project_id: str, force_refresh: bool = False, reuse_previous: bool = False) -> LocalFile:
         from app.models.document import SchemaDocument, DocumentType
-        document = SchemaDocument(document_type=DocumentType(type=document_type), author=author, company_id=company_id, project_id=project_id)
+        document = await self.executors.run_io(
+            SchemaDocument, document_type=DocumentType(type=document_type), author=author, company_id=company_id, project_id=project_id
+        )
         self.logger.info(f"Identified document as {document.__class__.__name__.upper()}")
-        await document.fill()
+        previous = None
+        if reuse_previous:
+            previous = await self.__read_filled_document(document_type=document_type, company_id=company_id, project_id=project_id)
+        await document.fill(force_refresh=force_refresh, previous=previous)
         await document.save()
         local_file = document.get_local_file()
-        self.file_storage_wrapper.upsert_file(target_file=document.get_local_file())
+        await self.file_storage_wrapper.upsert_file(target_file=local_file)
         return local_file
         
-    async def generate_docx(self, bucket: str, file_url: str) -> str:
+    async def regenerate_document(self, document_type: str, company_id: str, project_id: str, changed_file_ids: Optional[list[str]] = None) -> LocalFile:
+        """
+        Re-extracts the fields of the stored filled document that are affected by knowledge base changes.
+
+        The returned file is a temporary copy; the caller removes it once it has been sent.
+        """
+        import os
+        document = await self.__read_filled_document(document_type=document_type, company_id=company_id, project_id=project_id)
+        await document.regenerate(changed_file_ids=changed_file_ids or [])
+        await document.save()
+        local_file = document.get_local_file()
+        try:
+            await self.file_storage_wrapper.upsert_file(target_file=local_file)
+        except BaseException:
+            await self.executors.run_io(os.remove, local_file.local_path)
+            raise
+        return local_file
+    
+    async def diff_document_schema(self, document_type: str, company_id: str, project_id: str) -> SchemaDiff:
+        """Fields of the current schema that `generate_document(reuse_previous=True)` would extract."""
+        from app.models.document import SchemaDocument, DocumentType
+        previous = await self.__read_filled_document(document_type=document_type, company_id=company_id, project_id=project_id)
+        document = await self.executors.run_io(
+            SchemaDocument, document_type=DocumentType(type=document_type), author=previous.meta.author, company_id=company_id, project_id=project_id
+        )
+        return document.diff(previous)
+        
+    async def generate_docx(self, bucket: str, file_url: str, force_refresh: bool = False, reuse_previous: bool = False) -> str:
+        from app.core.docx.generator import DocxGenerator
+        
+        doc = await self.__read_docx_schema(bucket=bucket, file_url=file_url)
+        output_path = self.__docx_output_path(file_url=file_url)
+        previous_fields = await self.executors.run_io(self.__read_docx_filled_fields, bucket=bucket, file_url=file_url, doc=doc) if reuse_previous else None
+        gen = DocxGenerator()
+        await gen.preprocess_schema(schema=doc, force_refresh=force_refresh, previous_fields=previous_fields)
+        await self.executors.run_cpu(gen.generate, schema=doc, output_path=output_path)
+        await self.executors.run_io(self.__write_docx_filled_fields, bucket=bucket, file_url=file_url, doc=doc)
+        return output_path
+    
+    async def diff_docx_schema(self, bucket: str, file_url: str) -> SchemaDiff:
+        """Fields of the schema that `generate_docx(reuse_previous=True)` would extract."""
+        from app.core.schema.diff import SchemaDiffer
+        doc = await self.__read_docx_schema(bucket=bucket, file_url=file_url)
+        previous_fields = await self.executors.run_io(self.__read_docx_filled_fields, bucket=bucket, file_url=file_url, doc=doc) or {}
+        return SchemaDiffer.diff(
+            previous=SchemaDiffer.field_fingerprints(previous_fields),
+            current=SchemaDiffer.field_fingerprints(doc.fields)
+        )
+    
+    async def __read_filled_document(self, document_type: str, company_id: str, project_id: str):
+        from app.models.document import SchemaDocument
+        stored = FSFile(
+            company_id=company_id,
+            project_id=project_id,
+            document_category=document_type,
+            document_type="filled_schema",
+            file_name=f"filled_{document_type}.json"
+        )
+        _, temp_path = await self.file_storage_wrapper.read_file(target_file=stored)
+        data = await self.executors.run_io(self.__load_temp_json, path=temp_path)
+        # Loads the schema files of the document type
+        return await self.executors.run_io(SchemaDocument.from_data, data)
+    
+    async def __read_docx_schema(self, bucket: str, file_url: str):
         from app.models.schema.basic import SchemaDocument
         from app.core.schema.mapper import SchemaMapper
+        
+        file_path = await self.file_storage_wrapper.read_file_from_url(bucket=bucket, file_url=file_url)
+        schema_dict = await self.executors.run_io(self.__load_temp_json, path=file_path)
+        doc: SchemaDocument = SchemaMapper.parse_schema(data=schema_dict)
+        return doc
+    
+    def __load_temp_json(self, path: str):
+        # Reads and removes a temporary download
         import json
+        import os
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        finally:
+            os.remove(path)
+    
+    def __docx_output_path(self, file_url: str) -> str:
         from pathlib import Path
-        
-        file_path = self.file_storage_wrapper.read_file_from_url(bucket=bucket, file_url=file_url)
-        
-        with open(file_path, "r") as f:
-            schema_dict = json.load(f)
-            doc: SchemaDocument = SchemaMapper.parse_schema(data=schema_dict)
-        from app.core.docx.generator import DocxGenerator
-        gen = DocxGenerator()
-        await gen.preprocess_schema(schema=doc)
-        file_name = "/app/generated/generated_" + Path(file_url).name.split(".")[0] + ".docx"
-        gen.generate(schema=doc, output_path=file_name)
-        return file_name
-    
\ No newline at end of file
+        return "/app/generated/generated_" + Path(file_url).name.split(".")[0] + ".docx"
+    
+    def __docx_fields_path(self, bucket: str, file_url: str) -> str:
+        # One file per stored schema (bucket and full object path), so equally named schemas of
+        # other companies or projects never share extractions
+        import hashlib
+        digest = hashlib.sha256(f"{bucket}/{file_url}".encode("utf-8")).hexdigest()
+        return f"/app/generated/fields/{digest}.fields.json"
+    
+    def __read_docx_filled_fields(self, bucket: str, file_url: str, doc) -> Optional[dict]:
+        # Fields (with their extractions) of the last docx generated from the same schema file
+        from app.models.schema.basic import SchemaField
+        import json
+        import os
+        path = self.__docx_fields_path(bucket=bucket, file_url=file_url)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        owner = (stored.get("bucket"), stored.get("file_url"), stored.get("company_id"), stored.get("project_id"))
+        if owner != (bucket, file_url, doc.meta.get("company_id"), doc.meta.get("project_id")):
+            self.logger.warning(f"Stored fields for {bucket}/{file_url} belong to another schema or project. Not reusing them.")
+            return None
+        return {key: SchemaField.model_validate(value) for key, value in stored["fields"].items()}
+    
+    def __write_docx_filled_fields(self, bucket: str, file_url: str, doc) -> None:
+        import json
+        import os
+        path = self.__docx_fields_path(bucket=bucket, file_url=file_url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        stored = {
+            "bucket": bucket,
+            "file_url": file_url,
+            "company_id": doc.meta.get("company_id"),
+            "project_id": doc.meta.get("project_id"),
+            "fields": {key: field.model_dump(mode="json") for key, field in doc.fields.items()}
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(stored, f, ensure_ascii=False)
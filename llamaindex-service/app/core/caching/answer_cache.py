@@ -0,0 +1,155 @@
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from app.core.caching.corpus_versions import CorpusVersions
+
+
+@dataclass
+class _CachedAnswer:
+    answer: str
+    embedding: Optional[np.ndarray]
+    identifiers: frozenset[str]
+    version: int
+    expires_at: float
+
+
+class AnswerCache:
+    """
+    Bounded cache of knowledge base answers.
+
+    Answers are keyed by a scope (company, project, filters, k) and the normalized question.
+    A question is answered from the cache when the same normalized question was asked in the
+    same scope, or - with `similarity_threshold` < 1 - when the cosine similarity of its
+    embedding to a cached question of the same scope reaches the threshold and both questions
+    mention the same identifiers (tokens with digits: slabs, plots, norms, e.g. "S1", "PN-EN 1992-1-1"),
+    which embeddings barely tell apart.
+
+    Entries remember the project's corpus version (see `CorpusVersions`) and are dropped as soon
+    as the project changes. Entries also expire after `ttl_seconds`, and the least recently used
+    ones are evicted beyond `max_entries`.
+    """
+    def __init__(self, versions: CorpusVersions, max_entries: int, ttl_seconds: float, similarity_threshold: float = 1.0):
+        self.versions = versions
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+        self._entries: OrderedDict[tuple, _CachedAnswer] = OrderedDict()
+        self._scopes: dict[tuple, set[tuple]] = {}
+        versions.subscribe(self.__drop_project)
+
+    @property
+    def uses_embeddings(self) -> bool:
+        return self.similarity_threshold < 1.0
+
+    @staticmethod
+    def normalize_question(question: str) -> str:
+        question = unicodedata.normalize("NFKC", question).casefold()
+        question = re.sub(r"\s+", " ", question).strip()
+        return question.rstrip("?!. ")
+
+    @staticmethod
+    def identifiers(normalized_question: str) -> frozenset[str]:
+        """Tokens of a normalized question that contain a digit."""
+        tokens = (token.strip("./-") for token in re.findall(r"[\w./-]+", normalized_question))
+        return frozenset(token for token in tokens if any(char.isdigit() for char in token))
+
+    def get(self, scope: tuple, question: str, embedding: Optional[list[float]] = None) -> Optional[str]:
+        """
+        Returns a cached answer for the question, or None.
+
+        Args:
+            scope (tuple): (company_id, project_id, *filters); the first two items select the corpus version.
+            question (str): The question as asked.
+            embedding (Optional[list[float]]): Query embedding of the question, for the similarity lookup.
+        """
+        key = (scope, self.normalize_question(question))
+        entry = self._entries.get(key)
+        if entry is not None and self.__is_valid(scope, entry):
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return entry.answer
+        if entry is not None:
+            self.__remove(key)
+
+        if embedding is not None and self.uses_embeddings:
+            key = self.__find_similar(scope, np.asarray(embedding, dtype=np.float32), self.identifiers(key[1]))
+            if key is not None:
+                self._entries.move_to_end(key)
+                self.similar_hits += 1
+                return self._entries[key].answer
+        self.misses += 1
+        return None
+
+    def put(self, scope: tuple, question: str, answer: str, version: int, embedding: Optional[list[float]] = None) -> None:
+        """Caches an answer computed at corpus `version`; ignored if the project changed in the meantime."""
+        if version != self.versions.get(scope[0], scope[1]):
+            return
+        key = (scope, self.normalize_question(question))
+        vector = None
+        if embedding is not None and self.uses_embeddings:
+            vector = np.asarray(embedding, dtype=np.float32)
+            vector /= np.linalg.norm(vector) or 1.0
+        self._entries[key] = _CachedAnswer(
+            answer=answer,
+            embedding=vector,
+            identifiers=self.identifiers(key[1]),
+            version=version,
+            expires_at=time.monotonic() + self.ttl_seconds
+        )
+        self._entries.move_to_end(key)
+        self._scopes.setdefault(scope, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self.__remove(next(iter(self._entries)))
+
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.similar_hits
+        total = hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "hit_rate": (hits / total) if total else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries
+        }
+
+    def __find_similar(self, scope: tuple, embedding: np.ndarray, identifiers: frozenset[str]) -> Optional[tuple]:
+        embedding = embedding / (np.linalg.norm(embedding) or 1.0)
+        best_key, best_score = None, self.similarity_threshold
+        for key in list(self._scopes.get(scope, ())):
+            entry = self._entries[key]
+            if not self.__is_valid(scope, entry):
+                self.__remove(key)
+                continue
+            if entry.embedding is None or entry.identifiers != identifiers:
+                continue
+            score = float(np.dot(entry.embedding, embedding))
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+    def __is_valid(self, scope: tuple, entry: _CachedAnswer) -> bool:
+        return entry.expires_at > time.monotonic() and entry.version == self.versions.get(scope[0], scope[1])
+
+    def __remove(self, key: tuple) -> None:
+        self._entries.pop(key, None)
+        scope_keys = self._scopes.get(key[0])
+        if scope_keys is not None:
+            scope_keys.discard(key)
+            if not scope_keys:
+                del self._scopes[key[0]]
+
+    def __drop_project(self, company_id: str, project_id: str) -> None:
+        for scope in [scope for scope in self._scopes if scope[:2] == (company_id, project_id)]:
+            for key in list(self._scopes.get(scope, ())):
+                self.__remove(key)
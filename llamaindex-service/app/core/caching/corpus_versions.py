@@ -0,0 +1,28 @@
+from collections import defaultdict
+
+
+class CorpusVersions:
+    """
+    Per-project version counters of the knowledge base contents.
+
+    Every write to a project (upload, upsert, delete) bumps its version. Caches store the version
+    an entry was computed at and treat entries of an older version as stale, so nothing derived
+    from the previous contents is served after a write. Counters live in process memory: they
+    cover writes made by this service instance (API requests and its ingestion workers).
+    """
+    def __init__(self):
+        self._versions: defaultdict[tuple[str, str], int] = defaultdict(int)
+        self._listeners = []
+
+    def get(self, company_id: str, project_id: str) -> int:
+        return self._versions[(company_id, project_id)]
+
+    def bump(self, company_id: str, project_id: str) -> int:
+        self._versions[(company_id, project_id)] += 1
+        for listener in self._listeners:
+            listener(company_id, project_id)
+        return self._versions[(company_id, project_id)]
+
+    def subscribe(self, listener) -> None:
+        """Registers `listener(company_id, project_id)`, called after every bump (e.g. to drop stale entries eagerly)."""
+        self._listeners.append(listener)
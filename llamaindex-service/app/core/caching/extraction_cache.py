@@ -0,0 +1,64 @@
+import hashlib
+from collections import OrderedDict
+from typing import Optional
+
+from app.core.caching.corpus_versions import CorpusVersions
+from app.models.field_extraction import FieldExtraction
+
+
+class ExtractionCache:
+    """
+    Bounded LRU cache of field extraction results.
+
+    Entries are keyed by (company, project, corpus version, sha256(field prompt), field type,
+    model), so a field is re-extracted only when its prompt, type or model changes, or when the
+    project's knowledge base changed since the result was stored.
+    """
+    def __init__(self, versions: CorpusVersions, max_entries: int):
+        self.versions = versions
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: OrderedDict[tuple, FieldExtraction] = OrderedDict()
+        versions.subscribe(self.__drop_project)
+
+    @staticmethod
+    def make_key(company_id: str, project_id: str, version: int, prompt: str, field_type: str, model: str) -> tuple:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return (company_id, project_id, version, digest, field_type, model)
+
+    def get(self, company_id: str, project_id: str, prompt: str, field_type: str, model: str) -> Optional[FieldExtraction]:
+        version = self.versions.get(company_id, project_id)
+        key = self.make_key(company_id, project_id, version, prompt, field_type, model)
+        extraction = self._entries.get(key)
+        if extraction is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return extraction.model_copy(deep=True)
+
+    def put(self, company_id: str, project_id: str, prompt: str, field_type: str, model: str, extraction: FieldExtraction, version: int) -> None:
+        """Caches a result extracted at corpus `version`; ignored if the project changed in the meantime."""
+        if version != self.versions.get(company_id, project_id):
+            return
+        key = self.make_key(company_id, project_id, version, prompt, field_type, model)
+        self._entries[key] = extraction.model_copy(deep=True)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries
+        }
+
+    def __drop_project(self, company_id: str, project_id: str) -> None:
+        for key in [key for key in self._entries if key[:2] == (company_id, project_id)]:
+            del self._entries[key]
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.storage.s3_client import S3Object
+
+
+@dataclass
+class _CachedMetadata:
+    metadata: Optional[S3Object]
+    expires_at: float
+
+
+class ObjectMetadataCache:
+    """
+    Short-lived cache of object metadata (etag, size, last_modified), keyed by bucket and key.
+
+    Also remembers objects found missing (`None`), so an upload's existence checks cost one
+    HEAD. Writers invalidate what they change; entries expire after `ttl_seconds` in any case,
+    which bounds staleness from changes made by other processes. The least recently used
+    entries are evicted beyond `max_entries`. Thread-safe, for the executor-backed client.
+
+    A lookup that races a write takes a `generation()` before its HEAD and passes it to `put`,
+    which drops the result if the key was invalidated in the meantime, so an upload finishing
+    mid-HEAD is not cached as missing.
+    """
+    def __init__(self, max_entries: int = 10_000, ttl_seconds: float = 10.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: OrderedDict[tuple[str, str], _CachedMetadata] = OrderedDict()
+        self._lock = threading.Lock()
+        # Generation of the latest invalidation of each key and prefix, oldest first. Older
+        # records are forgotten beyond `max_entries`; `_floor` is the newest forgotten one.
+        self._generation = 0
+        self._floor = 0
+        self._invalidated: OrderedDict[tuple[str, str], int] = OrderedDict()
+        self._invalidated_prefixes: OrderedDict[tuple[str, str], int] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def get(self, bucket: str, key: str) -> tuple[bool, Optional[S3Object]]:
+        """Returns (found, metadata); metadata is None for an object cached as missing."""
+        with self._lock:
+            entry = self._entries.get((bucket, key))
+            if entry is not None and entry.expires_at > time.monotonic():
+                self._entries.move_to_end((bucket, key))
+                self.hits += 1
+                return True, entry.metadata
+            if entry is not None:
+                del self._entries[(bucket, key)]
+            self.misses += 1
+            return False, None
+
+    def generation(self) -> int:
+        """Token to pass to `put` for metadata read from now on."""
+        with self._lock:
+            return self._generation
+
+    def put(self, bucket: str, key: str, metadata: Optional[S3Object], generation: Optional[int] = None) -> None:
+        """
+        Caches the metadata of an object, None for a missing one.
+
+        With `generation`, nothing is cached if the key was invalidated since it was taken.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation is not None and self.__invalidated_since(bucket, key, generation):
+                return
+            self._entries[(bucket, key)] = _CachedMetadata(metadata=metadata, expires_at=time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end((bucket, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, bucket: str, key: str) -> None:
+        with self._lock:
+            self._entries.pop((bucket, key), None)
+            self.__record(self._invalidated, (bucket, key))
+
+    def invalidate_prefix(self, bucket: str, prefix: str) -> None:
+        with self._lock:
+            for cached in [cached for cached in self._entries if cached[0] == bucket and cached[1].startswith(prefix)]:
+                del self._entries[cached]
+            self.__record(self._invalidated_prefixes, (bucket, prefix))
+
+    def __record(self, invalidated: OrderedDict[tuple[str, str], int], target: tuple[str, str]) -> None:
+        self._generation += 1
+        invalidated[target] = self._generation
+        invalidated.move_to_end(target)
+        while len(invalidated) > max(1, self.max_entries):
+            _, forgotten = invalidated.popitem(last=False)
+            self._floor = max(self._floor, forgotten)
+
+    def __invalidated_since(self, bucket: str, key: str, generation: int) -> bool:
+        if generation < self._floor or self._invalidated.get((bucket, key), 0) > generation:
+            return True
+        # Newest first: only the prefixes invalidated after `generation` are looked at
+        for (prefix_bucket, prefix), invalidated_at in reversed(self._invalidated_prefixes.items()):
+            if invalidated_at <= generation:
+                return False
+            if prefix_bucket == bucket and key.startswith(prefix):
+                return True
+        return False
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries
+        }
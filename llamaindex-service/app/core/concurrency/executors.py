@@ -0,0 +1,82 @@
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from app.core.logger import get_logger
+
+T = TypeVar("T")
+
+
+class Executors:
+    """
+    Bounded pools for the blocking work of the async request paths.
+
+    - `run_io`: blocking I/O (MinIO, local files) on up to `io_workers` threads.
+    - `run_cpu`: CPU-bound work on objects of this process (sentence splitting, docx rendering)
+      on up to `cpu_workers` threads, kept apart so it cannot occupy the threads I/O waits on.
+    - `run_process`: heavy, picklable work (PDF parsing) on a pool of `process_workers` spawned
+      processes, which also takes it off the GIL.
+
+    Thread pools propagate context variables, like `asyncio.to_thread`. Pools are created on
+    first use.
+    """
+    def __init__(self, io_workers: int = 32, cpu_workers: Optional[int] = None, process_workers: Optional[int] = None):
+        cpu_count = os.cpu_count() or 1
+        self.io_workers = max(1, io_workers)
+        self.cpu_workers = max(1, cpu_workers or cpu_count)
+        self.process_workers = max(1, process_workers or cpu_count)
+        self.logger = get_logger(self.__class__.__name__)
+
+        self._io: Optional[ThreadPoolExecutor] = None
+        self._cpu: Optional[ThreadPoolExecutor] = None
+        self._process: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def io(self) -> ThreadPoolExecutor:
+        if self._io is None:
+            self._io = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="io")
+        return self._io
+
+    @property
+    def cpu(self) -> ThreadPoolExecutor:
+        if self._cpu is None:
+            self._cpu = ThreadPoolExecutor(max_workers=self.cpu_workers, thread_name_prefix="cpu")
+        return self._cpu
+
+    @property
+    def process(self) -> ProcessPoolExecutor:
+        # Spawned (not forked) workers: the parent runs the event loop and client threads
+        if self._process is None:
+            self._process = ProcessPoolExecutor(
+                max_workers=self.process_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._process
+
+    async def run_io(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await self.__run_in_thread(self.io, fn, *args, **kwargs)
+
+    async def run_cpu(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await self.__run_in_thread(self.cpu, fn, *args, **kwargs)
+
+    async def run_process(self, fn: Callable[..., T], *args: Any) -> T:
+        """Runs a picklable, module-level `fn` in the process pool."""
+        return await asyncio.get_running_loop().run_in_executor(self.process, fn, *args)
+
+    def shutdown(self) -> None:
+        for executor in (self._io, self._cpu):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        if self._process is not None:
+            # Waits for running chunks only; workers left behind break the interpreter's exit handler
+            self._process.shutdown(wait=True, cancel_futures=True)
+        self._io = self._cpu = self._process = None
+
+    async def __run_in_thread(self, executor: Executor, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, fn, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(executor, call)
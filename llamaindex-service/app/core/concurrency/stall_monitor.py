@@ -0,0 +1,65 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from app.core.logger import get_logger
+
+
+class EventLoopStallMonitor:
+    """
+    Debug aid that reports every stall of the event loop longer than `threshold_ms`.
+
+    A heartbeat task on the loop records when it last ran. A watchdog thread notices a missed
+    heartbeat while the loop is still blocked and logs the loop thread's current stack, i.e.
+    the code that blocks it. When the loop resumes, the heartbeat logs the total stall time.
+    """
+    def __init__(self, threshold_ms: float = 100.0):
+        self.threshold = threshold_ms / 1000
+        self.interval = self.threshold / 4
+        self.logger = get_logger(self.__class__.__name__)
+
+        self._last_beat = 0.0
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        """Starts monitoring the running event loop."""
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._heartbeat = asyncio.get_running_loop().create_task(self.__beat())
+        self._watchdog = threading.Thread(target=self.__watch, name="loop-stall-monitor", daemon=True)
+        self._watchdog.start()
+        self.logger.info(f"Monitoring event loop stalls over {self.threshold * 1000:.0f} ms.")
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+
+    async def __beat(self) -> None:
+        while True:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            stalled = time.monotonic() - self._last_beat - self.interval
+            if stalled > self.threshold:
+                self.logger.warning(f"Event loop was blocked for {stalled * 1000:.0f} ms.")
+
+    def __watch(self) -> None:
+        reported_beat = None
+        while not self._stopped.wait(self.interval):
+            beat = self._last_beat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled <= self.threshold or beat == reported_beat:
+                continue
+            # One stack per stall, taken while the loop is still blocked
+            reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "<stack unavailable>\n"
+            self.logger.warning(f"Event loop blocked for over {stalled * 1000:.0f} ms, at:\n{stack}")
@@ -1,9 +1,13 @@
 from docx import Document
 from docx.shared import Cm, Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-from typing import Literal, Dict
+from typing import Literal, Dict, Optional
 
 from app.infra.knowledge_base.instances_knowledge_base import get_knowledge_base_wrapper
+from app.core.extraction.engine import ExtractionEngine
+from app.core.logger import get_logger
+from app.core.schema.diff import SchemaDiffer
+from app.models.field_extraction import FieldExtractionTask
 
 from app.models.schema.base_node import SchemaBaseNode
 from app.models.schema.basic import (
@@ -23,6 +27,8 @@ class DocxGenerator:
         self.document = Document()
         self._configure_page()
         self.kbw = get_knowledge_base_wrapper()
+        self.extraction_engine = ExtractionEngine()
+        self.logger = get_logger(self.__class__.__name__)
 
     # -------------------------
     # Public API
@@ -32,21 +38,68 @@ class DocxGenerator:
             self._render_node(child)
         self.document.save(output_path)
         
-    async def preprocess_schema(self, schema: SchemaDocument):
-        for field in schema.fields.values():
+    async def preprocess_schema(self, schema: SchemaDocument, force_refresh: bool = False, previous_fields: Optional[Dict[str, SchemaField]] = None):
+        field_sections = self._map_fields_to_sections(schema=schema)
+        to_extract = None
+        if previous_fields is not None and not force_refresh:
+            # Reuse the extractions of fields unchanged since the previous schema version
+            diff = SchemaDiffer.diff(
+                previous=SchemaDiffer.field_fingerprints(previous_fields),
+                current=SchemaDiffer.field_fingerprints(schema.fields)
+            )
+            to_extract = set(diff.to_extract)
+            for key in diff.unchanged:
+                if previous_fields[key].extraction is None:
+                    to_extract.add(key)
+                else:
+                    schema.fields[key].extraction = previous_fields[key].extraction
+            self.logger.info(
+                f"Schema diff: {len(diff.added)} added, {len(diff.changed)} changed, "
+                f"{len(diff.removed)} removed, {len(diff.unchanged)} reused."
+            )
+        tasks = []
+        for key, field in schema.fields.items():
             if field.source == "ai":
-                field.extraction = await self.kbw.extract_field(
-                    company_id=schema.company_id,
-                    project_id=schema.project_id,
-                    field_prompt=field.prompt,
-                    field_type=field.data_type
-                )
+                if to_extract is not None and key not in to_extract and not field.force_refresh:
+                    continue
+                tasks.append(FieldExtractionTask(
+                    field_id=key,
+                    prompt=field.prompt,
+                    field_type=field.data_type,
+                    group=field_sections.get(key),
+                    force_refresh=bool(field.force_refresh)
+                ))
             else:
                 field.value = "USER INPUT REQUIRED !"
+                
+        results = await self.extraction_engine.extract(
+            company_id=schema.company_id,
+            project_id=schema.project_id,
+            tasks=tasks,
+            force_refresh=force_refresh
+        )
+        for result in results:
+            schema.fields[result.field_id].extraction = result.extraction
             
         for child in schema.children:
             self._preprocess_field(fields=schema.fields, node=child)
 
+    def _map_fields_to_sections(self, schema: SchemaDocument) -> Dict[str, str]:
+        # Field key -> id of the top-level section whose paragraphs reference it
+        mapping = {}
+
+        def walk(node: SchemaBaseNode, section_id: str):
+            if isinstance(node, SchemaParagraph):
+                if node.field:
+                    mapping.setdefault(node.field, section_id)
+                return
+            for child in getattr(node, "children", []):
+                walk(child, section_id)
+
+        for child in schema.children:
+            walk(child, child.id)
+        return mapping
+
     # -------------------------
     # Page setup
     # ------------------------
@@ -0,0 +1,137 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Optional
+
+from app.core.logger import get_logger
+
+
+class EmbeddingCache:
+    """
+    Persistent, size-bounded embedding cache backed by SQLite.
+
+    Entries are keyed by (model, dimension, sha256(text)). Reads refresh the entry's
+    last access time and the least recently used entries are evicted once the cache
+    grows past `max_entries`. Access times are collected in memory and written in one
+    transaction with the next insert, or once `TOUCH_FLUSH_SIZE` of them or
+    `TOUCH_FLUSH_INTERVAL` seconds have accumulated, so cache hits do not commit.
+    Safe to share between threads.
+    """
+    # Evict in chunks instead of after every insert
+    EVICTION_SLACK = 0.05
+    TOUCH_FLUSH_SIZE = 1000
+    TOUCH_FLUSH_INTERVAL = 60.0
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.logger = get_logger(self.__class__.__name__)
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._touched: dict[str, float] = {}
+        self._last_flush = time.monotonic()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, dimension INTEGER NOT NULL, "
+            "vector BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)")
+        self._connection.commit()
+        self._size = self._connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def make_key(model: str, dimension: Optional[int], text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{model}:{dimension}:{digest}"
+
+    def get_many(self, model: str, dimension: Optional[int], texts: list[str]) -> dict[str, list[float]]:
+        """Returns cached embeddings keyed by text. Texts that are not cached are missing from the result."""
+        keys = {self.make_key(model, dimension, text): text for text in texts}
+        found = {}
+        with self._lock:
+            key_list = list(keys)
+            for i in range(0, len(key_list), 500):
+                chunk = key_list[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[keys[key]] = array("f", blob).tolist()
+            if found:
+                now = time.time()
+                self._touched.update((key, now) for key, text in keys.items() if text in found)
+                if len(self._touched) >= EmbeddingCache.TOUCH_FLUSH_SIZE or time.monotonic() - self._last_flush >= EmbeddingCache.TOUCH_FLUSH_INTERVAL:
+                    self.__flush_touches()
+                    self._connection.commit()
+            self.hits += len(found)
+            self.misses += len(set(texts)) - len(found)
+        return found
+
+    def put_many(self, model: str, dimension: Optional[int], items: dict[str, list[float]]) -> None:
+        if not items:
+            return
+        now = time.time()
+        rows = [
+            (self.make_key(model, dimension, text), model, dimension or len(vector), array("f", vector).tobytes(), now)
+            for text, vector in items.items()
+        ]
+        with self._lock:
+            self.__flush_touches()
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, dimension, vector, last_access) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._size += len(rows)
+            if self._size > self.max_entries * (1 + EmbeddingCache.EVICTION_SLACK):
+                self.__evict()
+            self._connection.commit()
+
+    def flush(self) -> None:
+        """Writes the pending access times."""
+        with self._lock:
+            self.__flush_touches()
+            self._connection.commit()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "entries": self._size,
+            "max_entries": self.max_entries
+        }
+
+    def __flush_touches(self) -> None:
+        if self._touched:
+            self._connection.executemany(
+                "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._touched.items()]
+            )
+            self._touched.clear()
+        self._last_flush = time.monotonic()
+
+    def __evict(self) -> None:
+        # `_size` may overcount replaced keys, so re-count before evicting
+        self._size = self._connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        overflow = self._size - self.max_entries
+        if overflow <= 0:
+            return
+        self._connection.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+            (overflow,)
+        )
+        self._size -= overflow
+        self.logger.info(f"Evicted {overflow} least recently used embeddings.")
@@ -0,0 +1,80 @@
+from typing import Any, Optional
+
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+
+from app.core.embeddings.cache import EmbeddingCache
+from app.core.logger import get_logger
+from app.infra.instances_executors import get_executors
+
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    Embedding model wrapper that consults an `EmbeddingCache` before calling the wrapped model.
+
+    Query and text embeddings share cache entries, which is correct for symmetric models
+    such as OpenAI's `text-embedding-3-*`. Only cache misses are sent to the wrapped model.
+    """
+    _embed_model: BaseEmbedding = PrivateAttr()
+    _cache: EmbeddingCache = PrivateAttr()
+    _dimension: Optional[int] = PrivateAttr()
+    _logger: Any = PrivateAttr()
+
+    def __init__(self, embed_model: BaseEmbedding, cache: EmbeddingCache, dimension: Optional[int] = None):
+        super().__init__(
+            model_name=embed_model.model_name,
+            embed_batch_size=embed_model.embed_batch_size,
+            num_workers=embed_model.num_workers
+        )
+        self._embed_model = embed_model
+        self._cache = cache
+        self._dimension = dimension
+        self._logger = get_logger(self.__class__.__name__)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def cache(self) -> EmbeddingCache:
+        return self._cache
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._get_text_embeddings([query])[0]
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return (await self._aget_text_embeddings([query]))[0]
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _get_text_embeddings(self, texts: list[str]) -> list[Embedding]:
+        cached, missing = self.__lookup(texts)
+        if missing:
+            computed = self._embed_model._get_text_embeddings(missing)
+            self.__store(cached, missing, computed)
+        return [cached[text] for text in texts]
+
+    async def _aget_text_embeddings(self, texts: list[str]) -> list[Embedding]:
+        # SQLite reads and writes stay off the event loop
+        executors = get_executors()
+        cached, missing = await executors.run_io(self.__lookup, texts)
+        if missing:
+            computed = await self._embed_model._aget_text_embeddings(missing)
+            await executors.run_io(self.__store, cached, missing, computed)
+        return [cached[text] for text in texts]
+
+    def __lookup(self, texts: list[str]) -> tuple[dict[str, Embedding], list[str]]:
+        cached = self._cache.get_many(model=self.model_name, dimension=self._dimension, texts=texts)
+        missing = list(dict.fromkeys(text for text in texts if text not in cached))
+        if len(texts) > 1:
+            self._logger.info(f"Embedding batch of {len(texts)}: {len(texts) - len(missing)} cached, {len(missing)} to embed.")
+        return cached, missing
+
+    def __store(self, cached: dict[str, Embedding], missing: list[str], computed: list[Embedding]) -> None:
+        new_items = dict(zip(missing, computed))
+        self._cache.put_many(model=self.model_name, dimension=self._dimension, items=new_items)
+        cached.update(new_items)
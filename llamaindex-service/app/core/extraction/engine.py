@@ -0,0 +1,250 @@
+import asyncio
+import time
+from typing import Iterable, Optional
+
+from llama_index.core.schema import NodeWithScore
+
+from app.core.logger import get_logger
+from app.core.settings import get_settings
+from app.infra.instances_llamaindex import get_extraction_cache, get_corpus_versions
+from app.infra.knowledge_base.instances_knowledge_base import get_knowledge_base_wrapper
+from app.models.field_extraction import FieldExtraction, FieldExtractionTask, FieldExtractionResult
+
+
+class ExtractionEngine:
+    """
+    Runs field extractions against the knowledge base concurrently.
+
+    At most `max_concurrency` extractions are in flight at the same time. Results are returned
+    in the same order as the input tasks. A failing (or timed out) field does not abort
+    the whole document - it yields an empty `FieldExtraction` with confidence 0 and the
+    error recorded on its `FieldExtractionResult`.
+
+    In `batched` mode, tasks sharing a `group` are sent to the LLM together, up to `batch_size`
+    fields per call. If a batch call fails, its fields are retried one by one.
+
+    With `prefetch_context` enabled, context for all fields is retrieved up front in one
+    embedding batch and one Qdrant batch search before any extraction starts.
+
+    Results are looked up in the extraction cache first (keyed by the project's corpus version,
+    prompt, field type and model), so regenerating a document for an unchanged knowledge base
+    costs no LLM calls. `force_refresh` on `extract` or on a task bypasses the cache.
+
+    `regenerate` refreshes a previously extracted document: fields are re-extracted only if their
+    provenance touches a changed file, or if retrieval now returns different nodes than the ones
+    the previous extraction used. All other fields keep their previous extraction.
+    """
+    def __init__(self, max_concurrency: Optional[int] = None, field_timeout: Optional[float] = None, mode: Optional[str] = None, batch_size: Optional[int] = None, prefetch_context: Optional[bool] = None):
+        settings = get_settings()
+        self.max_concurrency = max(1, max_concurrency or settings.EXTRACTION_MAX_CONCURRENCY)
+        self.field_timeout = field_timeout or settings.EXTRACTION_FIELD_TIMEOUT
+        self.mode = mode or settings.EXTRACTION_MODE
+        self.batch_size = max(1, batch_size or settings.EXTRACTION_BATCH_SIZE)
+        self.prefetch_context = settings.EXTRACTION_PREFETCH_CONTEXT if prefetch_context is None else prefetch_context
+        self.model = settings.OPENAI_MODEL
+        self.cache = get_extraction_cache() if settings.EXTRACTION_CACHE_ENABLED else None
+        self.corpus_versions = get_corpus_versions()
+        self.knowledge_base = get_knowledge_base_wrapper()
+        self.logger = get_logger(self.__class__.__name__)
+
+    async def extract(self, company_id: str, project_id: str, tasks: list[FieldExtractionTask], force_refresh: bool = False) -> list[FieldExtractionResult]:
+        started = time.perf_counter()
+        version = self.corpus_versions.get(company_id, project_id)
+        cached = self.__get_cached(company_id=company_id, project_id=project_id, tasks=tasks, force_refresh=force_refresh)
+        pending = [task for task in tasks if task.field_id not in cached]
+        nodes_by_field = {}
+        if self.prefetch_context:
+            nodes_by_field = await self.__retrieve_nodes(company_id=company_id, project_id=project_id, tasks=pending)
+
+        by_field_id, calls = await self.__run(company_id=company_id, project_id=project_id, tasks=pending, nodes_by_field=nodes_by_field, version=version)
+        by_field_id.update(cached)
+        results = [by_field_id[task.field_id] for task in tasks]
+        self.__log_summary(results=results, calls=calls, started=started, detail=f"cached={len(cached)}")
+        return results
+
+    async def regenerate(self, company_id: str, project_id: str, tasks: list[FieldExtractionTask], previous: dict[str, FieldExtraction], changed_file_ids: Iterable[str] = ()) -> list[FieldExtractionResult]:
+        """
+        Re-extracts only the fields whose context changed since the previous extraction.
+
+        A field is re-extracted when it has no previous extraction with provenance, when it is
+        marked `force_refresh`, when its previous context came from one of `changed_file_ids`,
+        or when retrieval now returns a different set of nodes. Other fields keep their
+        previous extraction (`reused=True`).
+
+        Args:
+            company_id (str): The company identifier to filter documents.
+            project_id (str): The project identifier to filter documents.
+            tasks (list[FieldExtractionTask]): All fields of the document.
+            previous (dict[str, FieldExtraction]): Previous extractions keyed by `field_id`.
+            changed_file_ids (Iterable[str]): Knowledge base file ids known to have changed.
+
+        Returns:
+            list[FieldExtractionResult]: Results in the same order as `tasks`.
+        """
+        started = time.perf_counter()
+        version = self.corpus_versions.get(company_id, project_id)
+        changed_file_ids = set(changed_file_ids)
+        # Retrieval is needed for every field: to compare with the previous context, or as prefetched context
+        nodes_by_field = await self.__retrieve_nodes(company_id=company_id, project_id=project_id, tasks=tasks)
+
+        reused = {}
+        reasons = {"new": 0, "changed files": 0, "new context": 0}
+        for task in tasks:
+            extraction = previous.get(task.field_id)
+            provenance = extraction.provenance if extraction else None
+            if task.force_refresh or provenance is None:
+                reasons["new"] += 1
+            elif changed_file_ids & set(provenance.file_ids):
+                reasons["changed files"] += 1
+            elif task.field_id not in nodes_by_field or {n.node.node_id for n in nodes_by_field[task.field_id]} != set(provenance.node_ids):
+                reasons["new context"] += 1
+            else:
+                reused[task.field_id] = FieldExtractionResult(field_id=task.field_id, extraction=extraction.model_copy(deep=True), reused=True)
+        pending = [task for task in tasks if task.field_id not in reused]
+
+        by_field_id, calls = await self.__run(company_id=company_id, project_id=project_id, tasks=pending, nodes_by_field=nodes_by_field, version=version)
+        by_field_id.update(reused)
+        results = [by_field_id[task.field_id] for task in tasks]
+        detail = f"reused={len(reused)}, " + ", ".join(f"{reason}={count}" for reason, count in reasons.items())
+        self.__log_summary(results=results, calls=calls, started=started, detail=detail)
+        return results
+
+    async def __run(self, company_id: str, project_id: str, tasks: list[FieldExtractionTask], nodes_by_field: dict[str, list[NodeWithScore]], version: int) -> tuple[dict[str, FieldExtractionResult], int]:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self.mode == "batched":
+            batches = self.__group_tasks(tasks)
+        else:
+            batches = [[task] for task in tasks]
+
+        async def run(batch: list[FieldExtractionTask]) -> list[FieldExtractionResult]:
+            async with semaphore:
+                return await self.__extract_batch(company_id=company_id, project_id=project_id, batch=batch, nodes_by_field=nodes_by_field)
+
+        batch_results = await asyncio.gather(*(run(batch) for batch in batches))
+        by_field_id = {result.field_id: result for results in batch_results for result in results}
+        self.__put_cached(company_id=company_id, project_id=project_id, tasks=tasks, results=by_field_id, version=version)
+        return by_field_id, len(batches)
+
+    def __log_summary(self, results: list[FieldExtractionResult], calls: int, started: float, detail: str) -> None:
+        failed = [r for r in results if r.failed]
+        total_ms = (time.perf_counter() - started) * 1000
+        self.logger.info(
+            f"Extracted {len(results)} fields in {calls} calls, {total_ms:.0f} ms "
+            f"(mode={self.mode}, concurrency={self.max_concurrency}, {detail}, failed={len(failed)})."
+        )
+        slowest = sorted(results, key=lambda r: r.duration_ms, reverse=True)[:5]
+        if slowest:
+            self.logger.info("Slowest fields: " + ", ".join(f"`{r.field_id}` ({r.duration_ms:.0f} ms)" for r in slowest))
+
+    def __get_cached(self, company_id: str, project_id: str, tasks: list[FieldExtractionTask], force_refresh: bool) -> dict[str, FieldExtractionResult]:
+        if not self.cache or force_refresh:
+            return {}
+        cached = {}
+        for task in tasks:
+            if task.force_refresh:
+                continue
+            extraction = self.cache.get(company_id=company_id, project_id=project_id, prompt=task.prompt, field_type=task.field_type, model=self.model)
+            if extraction is not None:
+                cached[task.field_id] = FieldExtractionResult(field_id=task.field_id, extraction=extraction, cached=True)
+        return cached
+
+    def __put_cached(self, company_id: str, project_id: str, tasks: list[FieldExtractionTask], results: dict[str, FieldExtractionResult], version: int) -> None:
+        if not self.cache:
+            return
+        for task in tasks:
+            result = results[task.field_id]
+            if not result.failed:
+                self.cache.put(
+                    company_id=company_id, project_id=project_id, prompt=task.prompt, field_type=task.field_type,
+                    model=self.model, extraction=result.extraction, version=version
+                )
+
+    async def __retrieve_nodes(self, company_id: str, project_id: str, tasks: list[FieldExtractionTask]) -> dict[str, list[NodeWithScore]]:
+        if not tasks:
+            return {}
+        started = time.perf_counter()
+        try:
+            nodes_per_field = await self.knowledge_base.retrieve_nodes_for_fields(
+                company_id=company_id,
+                project_id=project_id,
+                instructions=[task.prompt for task in tasks]
+            )
+        except Exception as e:
+            self.logger.warning(f"Batched context retrieval failed ({str(e) or e.__class__.__name__}). Retrieving per field.")
+            return {}
+        self.logger.info(f"Retrieved context for {len(tasks)} fields in {(time.perf_counter() - started) * 1000:.0f} ms.")
+        return {task.field_id: nodes for task, nodes in zip(tasks, nodes_per_field)}
+
+    def __group_tasks(self, tasks: list[FieldExtractionTask]) -> list[list[FieldExtractionTask]]:
+        groups: dict[Optional[str], list[FieldExtractionTask]] = {}
+        for task in tasks:
+            groups.setdefault(task.group, []).append(task)
+
+        batches = []
+        for group_tasks in groups.values():
+            for i in range(0, len(group_tasks), self.batch_size):
+                batches.append(group_tasks[i:i + self.batch_size])
+        return batches
+
+    async def __extract_batch(self, company_id: str, project_id: str, batch: list[FieldExtractionTask], nodes_by_field: dict[str, list[NodeWithScore]]) -> list[FieldExtractionResult]:
+        if len(batch) == 1:
+            return [await self.__extract_task(company_id=company_id, project_id=project_id, task=batch[0], nodes=nodes_by_field.get(batch[0].field_id))]
+
+        nodes_per_field = None
+        if all(task.field_id in nodes_by_field for task in batch):
+            nodes_per_field = [nodes_by_field[task.field_id] for task in batch]
+
+        started = time.perf_counter()
+        try:
+            extractions = await asyncio.wait_for(
+                self.knowledge_base.extract_fields(company_id=company_id, project_id=project_id, tasks=batch, nodes_per_field=nodes_per_field),
+                timeout=self.field_timeout
+            )
+        except Exception as e:
+            self.logger.warning(
+                f"Batch extraction of {len(batch)} fields failed ({str(e) or e.__class__.__name__}). "
+                f"Falling back to single-field extraction."
+            )
+            return [
+                await self.__extract_task(company_id=company_id, project_id=project_id, task=task, nodes=nodes_by_field.get(task.field_id))
+                for task in batch
+            ]
+
+        duration_ms = (time.perf_counter() - started) * 1000
+        self.logger.debug(f"Batch of {len(batch)} fields extracted in {duration_ms:.0f} ms")
+        results = []
+        for task in batch:
+            if task.field_id in extractions:
+                results.append(FieldExtractionResult(field_id=task.field_id, extraction=extractions[task.field_id], duration_ms=duration_ms))
+            else:
+                # Left out of the model's answer: extracted on its own rather than cached as empty
+                results.append(await self.__extract_task(company_id=company_id, project_id=project_id, task=task, nodes=nodes_by_field.get(task.field_id)))
+        return results
+
+    async def __extract_task(self, company_id: str, project_id: str, task: FieldExtractionTask, nodes: Optional[list[NodeWithScore]] = None) -> FieldExtractionResult:
+        started = time.perf_counter()
+        try:
+            extraction = await asyncio.wait_for(
+                self.knowledge_base.extract_field(
+                    company_id=company_id,
+                    project_id=project_id,
+                    field_prompt=task.prompt,
+                    field_type=task.field_type,
+                    nodes=nodes
+                ),
+                timeout=self.field_timeout
+            )
+            error = None
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+            self.logger.error(f"Extraction of field `{task.field_id}` failed: {error}")
+            extraction = FieldExtraction(value=None, confidence=0.0, reasoning=f"Extraction failed: {error}")
+
+        duration_ms = (time.perf_counter() - started) * 1000
+        self.logger.debug(f"Field `{task.field_id}` extracted in {duration_ms:.0f} ms")
+        return FieldExtractionResult(
+            field_id=task.field_id,
+            extraction=extraction,
+            duration_ms=duration_ms,
+            error=error
+        )
@@ -0,0 +1,182 @@
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from datetime import datetime
+from typing import Optional
+
+import aiosqlite
+
+from app.models.ingestion_job import IngestionJob, IngestionJobPayload, IngestionJobProgress
+
+
+class JobStore:
+    """
+    Durable ingestion job queue backed by SQLite.
+
+    Claiming a job is done in an IMMEDIATE transaction and leases it to this store's `owner`
+    for `lease_seconds`; the worker renews the lease while it runs the job. Several processes
+    (replicas, a reloading server) can share the database file: a `running` job is only claimed
+    again once its lease has expired, i.e. its process crashed or hung, and a process only
+    updates the jobs it holds. Within a process the single connection is shared by all workers
+    and guarded by a lock.
+    """
+    def __init__(self, path: str, lease_seconds: float = 60.0):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._db: Optional[aiosqlite.Connection] = None
+        self._lock = asyncio.Lock()
+
+    async def open(self) -> None:
+        if self._db is not None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = await aiosqlite.connect(self.path, isolation_level=None)
+        self._db.row_factory = aiosqlite.Row
+        await self._db.execute("PRAGMA journal_mode=WAL")
+        await self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "job_id TEXT PRIMARY KEY, operation TEXT NOT NULL, payload TEXT NOT NULL, "
+            "status TEXT NOT NULL, stage TEXT NOT NULL, completed_stages TEXT NOT NULL, "
+            "progress TEXT NOT NULL, attempts INTEGER NOT NULL, error TEXT, "
+            "created_at TEXT NOT NULL, updated_at TEXT NOT NULL, owner TEXT, lease_expires_at REAL)"
+        )
+        # Databases created before leases were added
+        async with self._db.execute("PRAGMA table_info(jobs)") as cursor:
+            columns = {row["name"] for row in await cursor.fetchall()}
+        if "owner" not in columns:
+            await self._db.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        if "lease_expires_at" not in columns:
+            await self._db.execute("ALTER TABLE jobs ADD COLUMN lease_expires_at REAL")
+        await self._db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+
+    async def close(self) -> None:
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    async def create(self, operation: str, payload: IngestionJobPayload) -> IngestionJob:
+        now = datetime.now()
+        job = IngestionJob(
+            job_id=str(uuid.uuid4()),
+            operation=operation,
+            payload=payload,
+            created_at=now,
+            updated_at=now
+        )
+        async with self._lock:
+            await self._db.execute(
+                "INSERT INTO jobs (job_id, operation, payload, status, stage, completed_stages, progress, attempts, error, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job.job_id, job.operation, job.payload.model_dump_json(), job.status, job.stage,
+                    json.dumps(job.completed_stages), job.progress.model_dump_json(), job.attempts, job.error,
+                    job.created_at.isoformat(), job.updated_at.isoformat()
+                )
+            )
+        return job
+
+    async def get(self, job_id: str) -> Optional[IngestionJob]:
+        async with self._lock:
+            return await self.__fetch(job_id)
+
+    async def claim_next(self) -> Optional[IngestionJob]:
+        """Leases the oldest queued job, or a running one whose lease has expired, to this store."""
+        async with self._lock:
+            await self._db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                async with self._db.execute(
+                    "SELECT job_id FROM jobs WHERE status = 'queued' "
+                    "OR (status = 'running' AND (lease_expires_at IS NULL OR lease_expires_at < ?)) "
+                    "ORDER BY created_at LIMIT 1",
+                    (now,)
+                ) as cursor:
+                    row = await cursor.fetchone()
+                if row is not None:
+                    await self._db.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, error = NULL, owner = ?, "
+                        "lease_expires_at = ?, updated_at = ? WHERE job_id = ?",
+                        (self.owner, now + self.lease_seconds, datetime.now().isoformat(), row["job_id"])
+                    )
+                await self._db.execute("COMMIT")
+            except Exception:
+                await self._db.execute("ROLLBACK")
+                raise
+            return await self.__fetch(row["job_id"]) if row else None
+
+    async def renew_lease(self, job_id: str) -> bool:
+        """Extends this store's lease on a running job. False if the lease was lost to another process."""
+        async with self._lock:
+            cursor = await self._db.execute(
+                "UPDATE jobs SET lease_expires_at = ? WHERE job_id = ? AND status = 'running' AND owner = ?",
+                (time.time() + self.lease_seconds, job_id, self.owner)
+            )
+            return cursor.rowcount > 0
+
+    async def update_progress(self, job_id: str, stage: str, progress: IngestionJobProgress) -> None:
+        async with self._lock:
+            await self._db.execute(
+                "UPDATE jobs SET stage = ?, progress = ?, updated_at = ? WHERE job_id = ? AND owner = ?",
+                (stage, progress.model_dump_json(), datetime.now().isoformat(), job_id, self.owner)
+            )
+
+    async def complete_stage(self, job: IngestionJob, stage: str) -> None:
+        if stage not in job.completed_stages:
+            job.completed_stages.append(stage)
+        async with self._lock:
+            await self._db.execute(
+                "UPDATE jobs SET completed_stages = ?, updated_at = ? WHERE job_id = ? AND owner = ?",
+                (json.dumps(job.completed_stages), datetime.now().isoformat(), job.job_id, self.owner)
+            )
+
+    async def finish(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        stage = "done" if status == "succeeded" else None
+        async with self._lock:
+            await self._db.execute(
+                "UPDATE jobs SET status = ?, stage = COALESCE(?, stage), error = ?, owner = NULL, lease_expires_at = NULL, "
+                "updated_at = ? WHERE job_id = ? AND status = 'running' AND owner = ?",
+                (status, stage, error, datetime.now().isoformat(), job_id, self.owner)
+            )
+
+    async def requeue(self, job_id: str) -> bool:
+        async with self._lock:
+            cursor = await self._db.execute(
+                "UPDATE jobs SET status = 'queued', updated_at = ? WHERE job_id = ? AND status = 'failed'",
+                (datetime.now().isoformat(), job_id)
+            )
+            return cursor.rowcount > 0
+
+    async def release(self) -> int:
+        """Puts the jobs still leased to this store back in the queue, e.g. on shutdown."""
+        async with self._lock:
+            cursor = await self._db.execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL, lease_expires_at = NULL, updated_at = ? "
+                "WHERE status = 'running' AND owner = ?",
+                (datetime.now().isoformat(), self.owner)
+            )
+            return cursor.rowcount
+
+    async def __fetch(self, job_id: str) -> Optional[IngestionJob]:
+        async with self._db.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)) as cursor:
+            row = await cursor.fetchone()
+        if row is None:
+            return None
+        return IngestionJob(
+            job_id=row["job_id"],
+            operation=row["operation"],
+            payload=IngestionJobPayload.model_validate_json(row["payload"]),
+            status=row["status"],
+            stage=row["stage"],
+            completed_stages=json.loads(row["completed_stages"]),
+            progress=IngestionJobProgress.model_validate_json(row["progress"]),
+            attempts=row["attempts"],
+            error=row["error"],
+            created_at=datetime.fromisoformat(row["created_at"]),
+            updated_at=datetime.fromisoformat(row["updated_at"])
+        )
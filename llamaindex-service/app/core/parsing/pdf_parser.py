@@ -0,0 +1,121 @@
+import asyncio
+from collections import deque
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+from llama_index.core import Document
+from llama_index.core.readers import SimpleDirectoryReader
+from llama_index.core.readers.file.base import default_file_metadata_func
+from llama_index.readers.file import PyMuPDFReader
+
+from app.core.concurrency.executors import Executors
+from app.core.logger import get_logger
+
+
+# Same keys SimpleDirectoryReader hides from the embedding model and the LLM
+EXCLUDED_FILE_METADATA_KEYS = [
+    "file_name",
+    "file_type",
+    "file_size",
+    "creation_date",
+    "last_modified_date",
+    "last_accessed_date",
+]
+
+
+def _count_pages(path: str) -> int:
+    import fitz
+
+    with fitz.open(path) as doc:
+        return len(doc)
+
+
+def _extract_page_range(path: str, start: int, end: int) -> list[str]:
+    # Runs in a worker process: each worker opens its own handle and reads pages [start, end)
+    import fitz
+
+    with fitz.open(path) as doc:
+        return [doc[number].get_text() for number in range(start, end)]
+
+
+class PdfParsingEngine:
+    """
+    Parses PDFs page by page in the shared process pool.
+
+    A PDF is split into ranges of `pages_per_chunk` pages, up to `max_workers` ranges (by default
+    one per pool process) are extracted in parallel, and the pages are reassembled into one
+    `Document` per page with the same metadata `SimpleDirectoryReader` + `PyMuPDFReader` would
+    produce. Parsing never runs on the event loop. Other file types are read with
+    `SimpleDirectoryReader` on the CPU thread pool.
+    """
+    def __init__(self, executors: Executors, max_workers: Optional[int] = None, pages_per_chunk: int = 16):
+        self.executors = executors
+        self.max_workers = max(1, max_workers or executors.process_workers)
+        self.pages_per_chunk = max(1, pages_per_chunk)
+        self.logger = get_logger(self.__class__.__name__)
+
+    async def parse(self, path: str) -> list[Document]:
+        docs = []
+        async for chunk in self.iter_pages(path=path):
+            docs.extend(chunk)
+        return docs
+
+    async def iter_pages(self, path: str) -> AsyncIterator[list[Document]]:
+        """
+        Yields the pages of a file in order, one chunk of `Document`s at a time.
+
+        At most `max_workers` chunks are extracted ahead of the consumer, so memory stays
+        bounded by the chunk size rather than by the size of the file.
+        """
+        if Path(path).suffix.lower() != ".pdf":
+            yield await self.executors.run_cpu(self.__parse_with_reader, path)
+            return
+
+        total_pages = await self.executors.run_process(_count_pages, path)
+        ranges = [
+            (start, min(start + self.pages_per_chunk, total_pages))
+            for start in range(0, total_pages, self.pages_per_chunk)
+        ]
+        file_metadata = default_file_metadata_func(path)
+
+        in_flight = deque()
+        try:
+            for start, end in ranges:
+                in_flight.append((start, asyncio.ensure_future(self.executors.run_process(_extract_page_range, path, start, end))))
+                if len(in_flight) >= self.max_workers:
+                    yield self.__build_documents(path, file_metadata, total_pages, *await self.__pop(in_flight))
+            while in_flight:
+                yield self.__build_documents(path, file_metadata, total_pages, *await self.__pop(in_flight))
+        finally:
+            for _, future in in_flight:
+                future.cancel()
+        self.logger.info(f"Parsed {total_pages} pages of {path} in {len(ranges)} chunks.")
+
+    async def __pop(self, in_flight: deque) -> tuple[int, list[str]]:
+        start, future = in_flight.popleft()
+        return start, await future
+
+    def __build_documents(self, path: str, file_metadata: dict, total_pages: int, start: int, texts: list[str]) -> list[Document]:
+        docs = []
+        for offset, text in enumerate(texts):
+            doc = Document(
+                text=text,
+                metadata=dict(
+                    file_metadata,
+                    total_pages=total_pages,
+                    file_path=str(path),
+                    source=f"{start + offset + 1}"
+                )
+            )
+            doc.excluded_embed_metadata_keys.extend(EXCLUDED_FILE_METADATA_KEYS)
+            doc.excluded_llm_metadata_keys.extend(EXCLUDED_FILE_METADATA_KEYS)
+            docs.append(doc)
+        return docs
+
+    def __parse_with_reader(self, path: str) -> list[Document]:
+        reader = SimpleDirectoryReader(
+            input_files=[path],
+            filename_as_id=False,
+            file_extractor={".pdf": PyMuPDFReader()}
+        )
+        return reader.load_data()
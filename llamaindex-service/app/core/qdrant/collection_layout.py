@@ -0,0 +1,259 @@
+import asyncio
+from typing import Literal, Optional
+
+from qdrant_client import AsyncQdrantClient
+from qdrant_client import models as qmodels
+from qdrant_client.http.exceptions import UnexpectedResponse
+
+from app.core.logger import get_logger
+from app.core.qdrant.prefilter_vector_store import truncate_embedding
+from app.core.qdrant.sparse_encoder import Bm25SparseEncoder
+
+
+# Payload fields every query, scroll and delete in the knowledge base filters on
+TENANT_FIELDS = ("company_id", "project_id")
+KEYWORD_FIELDS = ("document_category", "document_type", "file_name", "file_id", "doc_id")
+
+# Named vectors used when the prefix vector is enabled; the full one keeps LlamaIndex's default name
+DENSE_VECTOR_NAME = "text-dense"
+PREFILTER_VECTOR_NAME = "text-dense-prefix"
+# BM25 sparse vector used for hybrid search
+SPARSE_VECTOR_NAME = "text-bm25"
+
+
+def is_collection_missing(error: BaseException) -> bool:
+    """Whether a Qdrant error means the collection does not exist (server: 404, local mode: ValueError)."""
+    if isinstance(error, UnexpectedResponse):
+        return error.status_code == 404 and "collection" in str(error).lower()
+    return isinstance(error, ValueError) and str(error).startswith("Collection ") and str(error).endswith(" not found")
+
+
+class CollectionLayout:
+    """
+    Creates the knowledge base collection and keeps its payload indexes in place.
+
+    Every filtered field gets a keyword payload index; `company_id` and `project_id` are
+    marked as tenant keys, so Qdrant co-locates each tenant's vectors and can skip
+    the global HNSW graph for small tenants.
+
+    With `shard_by_company` the collection uses custom sharding with one shard key per
+    company. Shard keys are created on demand by `ensure_tenant`, and every read and write for
+    a company should be routed with `shard_key_selector`.
+
+    `quantization` keeps a scalar (int8, 4x smaller) or binary (32x smaller) copy of the vectors
+    for the HNSW search, optionally with the original float32 vectors moved to disk
+    (`vectors_on_disk`). Searches should then pass `search_params`: candidates are oversampled
+    on the quantized vectors and rescored with the originals.
+
+    With `prefilter_dimension` > 0 the collection has two named vectors: the full embedding and
+    its first `prefilter_dimension` values, used by `PrefilterQdrantVectorStore` for a coarse
+    first search stage. Without it the collection keeps a single unnamed vector.
+
+    With `hybrid` the collection also has a BM25 sparse vector (`SPARSE_VECTOR_NAME`, IDF applied
+    by Qdrant) that `PrefilterQdrantVectorStore` fuses with the dense search.
+
+    `ensure_collection` checks (and creates) the collection once and remembers the result, so
+    request paths cost no bootstrap round trips. Call `invalidate` when Qdrant reports the
+    collection missing; the next `ensure_collection` checks again.
+    """
+    def __init__(
+        self,
+        client: AsyncQdrantClient,
+        collection_name: str,
+        vector_size: int,
+        shard_by_company: bool = False,
+        shards_per_company: int = 1,
+        quantization: Literal["none", "scalar", "binary"] = "none",
+        quantization_always_ram: bool = True,
+        vectors_on_disk: bool = False,
+        search_oversampling: float = 2.0,
+        search_rescore: bool = True,
+        prefilter_dimension: int = 0,
+        hybrid: bool = False
+    ):
+        self.client = client
+        self.collection_name = collection_name
+        self.vector_size = vector_size
+        self.shard_by_company = shard_by_company
+        self.shards_per_company = max(1, shards_per_company)
+        self.quantization = quantization
+        self.quantization_always_ram = quantization_always_ram
+        self.vectors_on_disk = vectors_on_disk
+        self.search_oversampling = search_oversampling
+        self.search_rescore = search_rescore
+        self.prefilter_dimension = prefilter_dimension
+        self.hybrid = hybrid
+        self.sparse_encoder = Bm25SparseEncoder() if hybrid else None
+        self.logger = get_logger(self.__class__.__name__)
+
+        self._known_shard_keys: set[tuple[str, str]] = set()
+        self._collection_ready = False
+        self._collection_lock = asyncio.Lock()
+
+    async def ensure_collection(self, company_id: Optional[str] = None) -> None:
+        """Creates the collection (and the company's shard key) unless already known to exist."""
+        if not self._collection_ready:
+            async with self._collection_lock:
+                if not self._collection_ready:
+                    await self.__check_create_collection()
+                    self._collection_ready = True
+        if company_id:
+            await self.ensure_tenant(company_id=company_id)
+
+    def invalidate(self) -> None:
+        self._collection_ready = False
+        self._known_shard_keys = {key for key in self._known_shard_keys if key[0] != self.collection_name}
+
+    async def create(self, collection_name: Optional[str] = None) -> None:
+        collection_name = collection_name or self.collection_name
+        await self.client.create_collection(
+            collection_name=collection_name,
+            vectors_config=self.vectors_config(),
+            sparse_vectors_config=self.sparse_vectors_config(),
+            quantization_config=self.quantization_config(),
+            sharding_method=qmodels.ShardingMethod.CUSTOM if self.shard_by_company else None
+        )
+        await self.ensure_payload_indexes(collection_name=collection_name)
+
+    async def apply_storage_config(self, collection_name: Optional[str] = None) -> None:
+        """
+        Applies the quantization and on-disk settings to an existing collection.
+
+        Qdrant rebuilds the quantized vectors in the background; the collection stays searchable.
+        """
+        collection_name = collection_name or self.collection_name
+        info = await self.client.get_collection(collection_name=collection_name)
+        vectors = info.config.params.vectors
+        dense_name = DENSE_VECTOR_NAME if isinstance(vectors, dict) and DENSE_VECTOR_NAME in vectors else ""
+        await self.client.update_collection(
+            collection_name=collection_name,
+            vectors_config={dense_name: qmodels.VectorParamsDiff(on_disk=self.vectors_on_disk)},
+            quantization_config=self.quantization_config() or qmodels.Disabled.DISABLED
+        )
+        self.logger.info(
+            f"Applied storage config to `{collection_name}`: quantization={self.quantization}, "
+            f"vectors_on_disk={self.vectors_on_disk}."
+        )
+
+    def vectors_config(self) -> qmodels.VectorParams | dict[str, qmodels.VectorParams]:
+        dense = qmodels.VectorParams(
+            size=self.vector_size,
+            distance=qmodels.Distance.COSINE,
+            on_disk=self.vectors_on_disk
+        )
+        if not self.prefilter_dimension:
+            return dense
+        return {
+            DENSE_VECTOR_NAME: dense,
+            # Small enough to always stay in RAM
+            PREFILTER_VECTOR_NAME: qmodels.VectorParams(size=self.prefilter_dimension, distance=qmodels.Distance.COSINE)
+        }
+
+    def sparse_vectors_config(self) -> Optional[dict[str, qmodels.SparseVectorParams]]:
+        if not self.hybrid:
+            return None
+        return {SPARSE_VECTOR_NAME: qmodels.SparseVectorParams(modifier=qmodels.Modifier.IDF)}
+
+    def point_vectors(self, embedding: list[float], text: Optional[str] = None) -> list[float] | dict:
+        """
+        Vectors of a point in this layout, for writes that bypass the LlamaIndex vector store.
+
+        Args:
+            embedding (list[float]): The full dense embedding.
+            text (Optional[str]): The node's embedding text, for the sparse vector of hybrid layouts.
+        """
+        if not self.prefilter_dimension and not self.hybrid:
+            return embedding
+        vectors = {DENSE_VECTOR_NAME if self.prefilter_dimension else "": embedding}
+        if self.prefilter_dimension:
+            vectors[PREFILTER_VECTOR_NAME] = truncate_embedding(embedding, self.prefilter_dimension)
+        if self.hybrid and text:
+            vectors[SPARSE_VECTOR_NAME] = self.sparse_encoder.encode_documents([text])[0]
+        return vectors
+
+    def quantization_config(self) -> Optional[qmodels.QuantizationConfig]:
+        if self.quantization == "scalar":
+            return qmodels.ScalarQuantization(
+                scalar=qmodels.ScalarQuantizationConfig(
+                    type=qmodels.ScalarType.INT8,
+                    quantile=0.99,
+                    always_ram=self.quantization_always_ram
+                )
+            )
+        if self.quantization == "binary":
+            return qmodels.BinaryQuantization(
+                binary=qmodels.BinaryQuantizationConfig(always_ram=self.quantization_always_ram)
+            )
+        return None
+
+    def search_params(self) -> Optional[qmodels.SearchParams]:
+        if self.quantization == "none":
+            return None
+        return qmodels.SearchParams(
+            quantization=qmodels.QuantizationSearchParams(
+                rescore=self.search_rescore,
+                oversampling=self.search_oversampling
+            )
+        )
+
+    async def ensure_payload_indexes(self, collection_name: Optional[str] = None) -> list[str]:
+        """
+        Creates missing payload indexes, and re-creates tenant fields indexed without `is_tenant`.
+
+        Returns:
+            list[str]: The fields that were (re)indexed.
+        """
+        collection_name = collection_name or self.collection_name
+        info = await self.client.get_collection(collection_name=collection_name)
+        existing = info.payload_schema or {}
+
+        created = []
+        for field in TENANT_FIELDS + KEYWORD_FIELDS:
+            is_tenant = field in TENANT_FIELDS
+            current = existing.get(field)
+            if current is not None and (not is_tenant or getattr(current.params, "is_tenant", False)):
+                continue
+            await self.client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field,
+                field_schema=qmodels.KeywordIndexParams(type=qmodels.KeywordIndexType.KEYWORD, is_tenant=is_tenant or None),
+                wait=True
+            )
+            created.append(field)
+        if created:
+            self.logger.info(f"Created payload indexes on `{collection_name}`: {', '.join(created)}.")
+        return created
+
+    async def ensure_tenant(self, company_id: str, collection_name: Optional[str] = None) -> None:
+        if not self.shard_by_company:
+            return
+        collection_name = collection_name or self.collection_name
+        if (collection_name, company_id) in self._known_shard_keys:
+            return
+        try:
+            await self.client.create_shard_key(
+                collection_name=collection_name,
+                shard_key=company_id,
+                shards_number=self.shards_per_company
+            )
+            self.logger.info(f"Created shard key `{company_id}` on `{collection_name}`.")
+        except UnexpectedResponse as e:
+            if "already exists" not in str(e):
+                raise
+        self._known_shard_keys.add((collection_name, company_id))
+
+    def shard_key_selector(self, company_id: str) -> Optional[str]:
+        return company_id if self.shard_by_company else None
+
+    async def __check_create_collection(self) -> None:
+        if await self.client.collection_exists(collection_name=self.collection_name):
+            return
+        self.logger.info(f"Collection `{self.collection_name}` does not exist. Creating...")
+        try:
+            await self.create()
+        except UnexpectedResponse as e:
+            # Another replica created it in the meantime
+            if "already exists" not in str(e):
+                raise
+            return
+        self.logger.info(f"Collection `{self.collection_name}` created.")
@@ -0,0 +1,78 @@
+from typing import Optional
+
+from qdrant_client import AsyncQdrantClient
+from qdrant_client import models as qmodels
+
+from app.core.qdrant.collection_layout import CollectionLayout
+
+
+class DocumentPoints:
+    """
+    Id-level access to the knowledge base points of a company, filtered by payload fields.
+
+    Nothing here transfers payloads or vectors: existence is a `limit=1` scroll, counts are
+    (approximate by default) `count` requests, ids come from paginated scrolls, and deletes
+    are a single server-side delete by filter. Requests are routed to the company's shard
+    when the collection is sharded by company.
+    """
+    SCROLL_PAGE_SIZE = 1000
+
+    def __init__(self, client: AsyncQdrantClient, layout: CollectionLayout):
+        self.client = client
+        self.layout = layout
+
+    async def exists(self, company_id: str, **conditions: Optional[str]) -> bool:
+        points, _ = await self.client.scroll(
+            collection_name=self.layout.collection_name,
+            scroll_filter=self.build_filter(company_id=company_id, **conditions),
+            shard_key_selector=self.layout.shard_key_selector(company_id),
+            limit=1,
+            with_payload=False,
+            with_vectors=False
+        )
+        return len(points) > 0
+
+    async def count(self, company_id: str, exact: bool = False, **conditions: Optional[str]) -> int:
+        result = await self.client.count(
+            collection_name=self.layout.collection_name,
+            count_filter=self.build_filter(company_id=company_id, **conditions),
+            shard_key_selector=self.layout.shard_key_selector(company_id),
+            exact=exact
+        )
+        return result.count
+
+    async def ids(self, company_id: str, **conditions: Optional[str]) -> set[str]:
+        query_filter = self.build_filter(company_id=company_id, **conditions)
+        node_ids = set()
+        offset = None
+        while True:
+            points, offset = await self.client.scroll(
+                collection_name=self.layout.collection_name,
+                scroll_filter=query_filter,
+                shard_key_selector=self.layout.shard_key_selector(company_id),
+                limit=DocumentPoints.SCROLL_PAGE_SIZE,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False
+            )
+            node_ids.update(str(point.id) for point in points)
+            if offset is None:
+                return node_ids
+
+    async def delete(self, company_id: str, **conditions: Optional[str]) -> None:
+        await self.client.delete(
+            collection_name=self.layout.collection_name,
+            points_selector=qmodels.FilterSelector(filter=self.build_filter(company_id=company_id, **conditions)),
+            shard_key_selector=self.layout.shard_key_selector(company_id),
+            wait=True
+        )
+
+    def build_filter(self, **conditions: Optional[str]) -> qmodels.Filter:
+        # Conditions set to None are left out, so optional arguments can be passed through as-is
+        return qmodels.Filter(
+            must=[
+                qmodels.FieldCondition(key=key, match=qmodels.MatchValue(value=value))
+                for key, value in conditions.items()
+                if value is not None
+            ]
+        )
@@ -0,0 +1,191 @@
+from typing import Any, List, Optional
+
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode, MetadataMode
+from llama_index.core.vector_stores.types import VectorStoreQuery, VectorStoreQueryMode, VectorStoreQueryResult
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from qdrant_client import models as qmodels
+
+from app.core.qdrant.sparse_encoder import Bm25SparseEncoder
+
+
+def truncate_embedding(embedding: list[float], dimension: int) -> list[float]:
+    # Matryoshka embeddings (text-embedding-3-*) keep their meaning when cut to a prefix.
+    # No re-normalization needed: the collection uses cosine distance.
+    return list(embedding[:dimension])
+
+
+class PrefilterQdrantVectorStore(QdrantVectorStore):
+    """
+    Qdrant vector store with a small Matryoshka prefix vector next to the full embedding.
+
+    Every point also gets a `prefilter_vector_name` vector holding the first `prefilter_dimension`
+    values of its embedding. Searches first collect `prefilter_limit` candidates on the small
+    vector, then rescore only those candidates with the full vector (Qdrant prefetch).
+
+    Collections without the prefix vector (e.g. created before it was enabled) are detected and
+    searched with the full vector only, like the plain `QdrantVectorStore`.
+
+    With a `sparse_encoder`, and if the collection has the `sparse_vector_name` sparse vector, points
+    also get a BM25 sparse vector, and searches that have the query text run the dense and the
+    sparse search side by side (`hybrid_limit` candidates each) and fuse them with reciprocal rank
+    fusion inside Qdrant.
+
+    Once the collection is known to exist, writes skip the store's `collection_exists` check;
+    `reset_collection_state` forgets it (and the detected vector format) after the collection
+    has gone missing.
+    """
+    _prefilter_vector_name: str = PrivateAttr()
+    _prefilter_dimension: int = PrivateAttr()
+    _prefilter_limit: int = PrivateAttr()
+    _search_params: Optional[qmodels.SearchParams] = PrivateAttr()
+    _has_prefilter: Optional[bool] = PrivateAttr()
+    _sparse_encoder: Optional[Bm25SparseEncoder] = PrivateAttr()
+    _hybrid_limit: int = PrivateAttr()
+    _has_sparse: bool = PrivateAttr()
+    _collection_known: bool = PrivateAttr()
+
+    def __init__(
+        self,
+        prefilter_vector_name: str,
+        prefilter_dimension: int,
+        prefilter_limit: int = 100,
+        search_params: Optional[qmodels.SearchParams] = None,
+        sparse_encoder: Optional[Bm25SparseEncoder] = None,
+        hybrid_limit: int = 50,
+        **kwargs: Any
+    ):
+        super().__init__(**kwargs)
+        self._prefilter_vector_name = prefilter_vector_name
+        self._prefilter_dimension = prefilter_dimension
+        self._prefilter_limit = prefilter_limit
+        self._search_params = search_params
+        self._sparse_encoder = sparse_encoder
+        self._hybrid_limit = hybrid_limit
+        self._has_prefilter = None
+        self._has_sparse = False
+        self._collection_known = False
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "PrefilterQdrantVectorStore"
+
+    async def build_query_request(self, embedding: list[float], query_filter: Optional[qmodels.Filter], limit: int, shard_key: Optional[Any] = None, query_text: Optional[str] = None) -> qmodels.QueryRequest:
+        """
+        Builds a search request: dense (with a prefix-vector prefetch when the collection has one),
+        or hybrid dense + BM25 with reciprocal rank fusion when `query_text` is given and the
+        collection has the sparse vector.
+        """
+        await self.__detect_vectors()
+        sparse_query = None
+        if self._has_sparse and query_text:
+            sparse_query = self._sparse_encoder.encode_query(query_text)
+        dense_limit = max(limit, self._hybrid_limit) if sparse_query else limit
+
+        prefetch = None
+        if self._has_prefilter:
+            prefetch = qmodels.Prefetch(
+                query=truncate_embedding(embedding, self._prefilter_dimension),
+                using=self._prefilter_vector_name,
+                filter=query_filter,
+                params=self._search_params,
+                limit=max(dense_limit, self._prefilter_limit)
+            )
+        if sparse_query is None:
+            return qmodels.QueryRequest(
+                prefetch=prefetch,
+                query=embedding,
+                using=self.dense_vector_name or None,
+                filter=query_filter,
+                params=self._search_params,
+                limit=limit,
+                with_payload=True,
+                shard_key=shard_key
+            )
+        return qmodels.QueryRequest(
+            prefetch=[
+                qmodels.Prefetch(
+                    prefetch=prefetch,
+                    query=embedding,
+                    using=self.dense_vector_name or None,
+                    filter=query_filter,
+                    params=self._search_params,
+                    limit=dense_limit
+                ),
+                qmodels.Prefetch(
+                    query=sparse_query,
+                    using=self.sparse_vector_name,
+                    filter=query_filter,
+                    limit=dense_limit
+                )
+            ],
+            query=qmodels.FusionQuery(fusion=qmodels.Fusion.RRF),
+            limit=limit,
+            with_payload=True,
+            shard_key=shard_key
+        )
+
+    async def aquery(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if self.enable_hybrid or query.mode != VectorStoreQueryMode.DEFAULT:
+            return await super().aquery(query, **kwargs)
+        self._ensure_async_client()
+
+        query_filter = kwargs.get("qdrant_filters")
+        if query_filter is None:
+            query_filter = self._build_query_filter(query)
+        shard_identifier = kwargs.get("shard_identifier")
+        shard_key = self._generate_shard_key_selector(shard_identifier) if shard_identifier else None
+
+        request = await self.build_query_request(
+            embedding=query.query_embedding,
+            query_filter=query_filter,
+            limit=query.similarity_top_k,
+            shard_key=shard_key,
+            query_text=query.query_str
+        )
+        responses = await self._aclient.query_batch_points(collection_name=self.collection_name, requests=[request])
+        return self.parse_to_query_result(responses[0].points)
+
+    def reset_collection_state(self) -> None:
+        self._collection_known = False
+        self._has_prefilter = None
+        self._has_sparse = False
+        self._legacy_vector_format = None
+
+    async def _acollection_exists(self, collection_name: str) -> bool:
+        if collection_name != self.collection_name:
+            return await super()._acollection_exists(collection_name)
+        if not self._collection_known:
+            self._collection_known = await super()._acollection_exists(collection_name)
+        return self._collection_known
+
+    def _build_points(self, nodes: List[BaseNode], sparse_vector_name: str) -> tuple[List[Any], List[str]]:
+        points, ids = super()._build_points(nodes, sparse_vector_name)
+        if self._has_prefilter:
+            for point in points:
+                point.vector[self._prefilter_vector_name] = truncate_embedding(
+                    point.vector[self.dense_vector_name], self._prefilter_dimension
+                )
+        if self._has_sparse:
+            # Same text the dense embedding was computed from
+            sparse_vectors = self._sparse_encoder.encode_documents([node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes])
+            for point, sparse_vector in zip(points, sparse_vectors):
+                point.vector[self.sparse_vector_name] = sparse_vector
+        return points, ids
+
+    async def _adetect_vector_format(self, collection_name: str) -> None:
+        await super()._adetect_vector_format(collection_name)
+        await self.__detect_vectors()
+
+    async def __detect_vectors(self) -> None:
+        if self._has_prefilter is not None:
+            return
+        if not await self._acollection_exists(self.collection_name):
+            return
+        if self._legacy_vector_format is None:
+            await super()._adetect_vector_format(self.collection_name)
+        info = await self._aclient.get_collection(self.collection_name)
+        vectors = info.config.params.vectors
+        sparse_vectors = info.config.params.sparse_vectors or {}
+        self._has_prefilter = self._prefilter_dimension > 0 and isinstance(vectors, dict) and self._prefilter_vector_name in vectors
+        self._has_sparse = self._sparse_encoder is not None and self.sparse_vector_name in sparse_vectors
@@ -0,0 +1,65 @@
+import re
+import unicodedata
+import zlib
+from collections import Counter
+from typing import Optional
+
+from qdrant_client import models as qmodels
+
+
+# Words and numbers, optionally joined by `-`, `/` or `.` into identifiers: PN-EN, 1992-1-1, C30/37, 15/4, B500SP
+TOKEN_PATTERN = re.compile(r"\w+(?:[-/.]\w+)*")
+
+
+class Bm25SparseEncoder:
+    """
+    Encodes texts as BM25 term-weight sparse vectors for Qdrant.
+
+    Documents get the BM25 term-frequency part, `tf * (k1 + 1) / (tf + k1 * (1 - b + b * len / avg_length))`;
+    the IDF part is applied by Qdrant at search time (`Modifier.IDF` on the sparse vector), so
+    vectors never need re-encoding when the corpus grows. Queries get weight 1 per distinct term.
+
+    Identifiers are indexed both whole (`pn-en`, `c30/37`) and by their parts (`pn`, `en`, `c30`,
+    `37`), so an exact identifier ranks highest while partial matches still count. Terms are
+    mapped to indices by CRC32 - stable across processes, with no vocabulary to maintain.
+    """
+    def __init__(self, k1: float = 1.2, b: float = 0.75, avg_length: float = 40.0):
+        self.k1 = k1
+        self.b = b
+        self.avg_length = avg_length
+
+    def tokenize(self, text: str) -> list[str]:
+        text = unicodedata.normalize("NFKC", text).casefold()
+        tokens = []
+        for match in TOKEN_PATTERN.finditer(text):
+            token = match.group()
+            tokens.append(token)
+            parts = re.split(r"[-/.]", token)
+            if len(parts) > 1:
+                tokens.extend(part for part in parts if part)
+        return tokens
+
+    def encode_documents(self, texts: list[str]) -> list[qmodels.SparseVector]:
+        return [self.__encode_document(text) for text in texts]
+
+    def encode_query(self, text: str) -> Optional[qmodels.SparseVector]:
+        """Returns None for a query without any terms."""
+        indices = sorted({self.term_index(token) for token in self.tokenize(text)})
+        if not indices:
+            return None
+        return qmodels.SparseVector(indices=indices, values=[1.0] * len(indices))
+
+    @staticmethod
+    def term_index(token: str) -> int:
+        return zlib.crc32(token.encode("utf-8"))
+
+    def __encode_document(self, text: str) -> qmodels.SparseVector:
+        tokens = self.tokenize(text)
+        length_norm = self.k1 * (1 - self.b + self.b * len(tokens) / self.avg_length)
+        weights: dict[int, float] = {}
+        for token, tf in Counter(tokens).items():
+            # Distinct terms colliding on one index add up, like repeated terms
+            index = self.term_index(token)
+            weights[index] = weights.get(index, 0.0) + tf * (self.k1 + 1) / (tf + length_norm)
+        indices = sorted(weights)
+        return qmodels.SparseVector(indices=indices, values=[weights[index] for index in indices])
@@ -0,0 +1,151 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import MetadataMode, NodeWithScore, QueryBundle
+
+from app.core.logger import get_logger
+from app.core.rerank.cross_encoders import CrossEncoderBackend
+
+
+@dataclass
+class _RerankRequest:
+    pairs: list[tuple[str, str]]
+    future: asyncio.Future
+
+
+class BatchReranker:
+    """
+    Cross-encoder reranker that merges (query, passage) pairs from many concurrent callers.
+
+    Requests arriving within `max_wait_ms` of each other (or while a forward pass is running)
+    are merged, sorted by length so that similarly sized pairs share a batch (less padding),
+    and scored in batches of `batch_size` on a dedicated worker thread by the `backend`
+    (torch or ONNX). Scores are routed back to the caller that submitted each pair. The model is
+    loaded lazily on the worker thread.
+    """
+    def __init__(self, backend: CrossEncoderBackend, batch_size: int = 64, max_wait_ms: float = 5.0):
+        self.backend = backend
+        self.batch_size = max(1, batch_size)
+        self.max_wait_ms = max_wait_ms
+        self.logger = get_logger(self.__class__.__name__)
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reranker")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def score(self, query: str, passages: list[str]) -> list[float]:
+        if not passages:
+            return []
+        self.__ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_RerankRequest(pairs=[(query, passage) for passage in passages], future=future))
+        return await future
+
+    def score_sync(self, query: str, passages: list[str]) -> list[float]:
+        # Used by synchronous callers. Still runs on the worker thread, but without micro-batching.
+        if not passages:
+            return []
+        return self._executor.submit(self.__predict, [(query, passage) for passage in passages]).result()
+
+    def __ensure_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self.__run())
+
+    async def __run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            requests = [await self._queue.get()]
+            pairs_count = len(requests[0].pairs)
+            deadline = loop.time() + self.max_wait_ms / 1000
+
+            # Micro-batching window: collect whatever arrives shortly after the first request
+            while pairs_count < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    break
+                requests.append(request)
+                pairs_count += len(request.pairs)
+            while not self._queue.empty():
+                request = self._queue.get_nowait()
+                requests.append(request)
+                pairs_count += len(request.pairs)
+
+            pairs = [pair for request in requests for pair in request.pairs]
+            try:
+                scores = await loop.run_in_executor(self._executor, self.__predict, pairs)
+            except Exception as e:
+                self.logger.error(f"Reranking {len(pairs)} pairs failed: {str(e)}")
+                for request in requests:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                continue
+
+            offset = 0
+            for request in requests:
+                if not request.future.done():
+                    request.future.set_result(scores[offset:offset + len(request.pairs)])
+                offset += len(request.pairs)
+            self.logger.debug(f"Reranked {len(pairs)} pairs for {len(requests)} requests.")
+
+    def __predict(self, pairs: list[tuple[str, str]]) -> list[float]:
+        order = sorted(range(len(pairs)), key=lambda i: len(pairs[i][0]) + len(pairs[i][1]))
+        scores = [0.0] * len(pairs)
+        for start in range(0, len(order), self.batch_size):
+            indices = order[start:start + self.batch_size]
+            batch_scores = self.backend.predict([pairs[i] for i in indices])
+            for i, score in zip(indices, batch_scores):
+                scores[i] = score
+        return scores
+
+
+class BatchRerankPostprocessor(BaseNodePostprocessor):
+    """
+    Node postprocessor that reranks nodes through a shared `BatchReranker`.
+    Drop-in replacement for `SentenceTransformerRerank`.
+    """
+    top_n: int = Field(description="Number of nodes to return sorted by score.")
+    _reranker: BatchReranker = PrivateAttr()
+
+    def __init__(self, reranker: BatchReranker, top_n: int = 6):
+        super().__init__(top_n=top_n)
+        self._reranker = reranker
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "BatchRerankPostprocessor"
+
+    def _postprocess_nodes(self, nodes: list[NodeWithScore], query_bundle: Optional[QueryBundle] = None) -> list[NodeWithScore]:
+        if query_bundle is None:
+            raise ValueError("Missing query bundle in extra info.")
+        if not nodes:
+            return []
+        scores = self._reranker.score_sync(query_bundle.query_str, self.__passages(nodes))
+        return self.__apply_scores(nodes, scores)
+
+    async def _apostprocess_nodes(self, nodes: list[NodeWithScore], query_bundle: Optional[QueryBundle] = None) -> list[NodeWithScore]:
+        if query_bundle is None:
+            raise ValueError("Missing query bundle in extra info.")
+        if not nodes:
+            return []
+        scores = await self._reranker.score(query_bundle.query_str, self.__passages(nodes))
+        return self.__apply_scores(nodes, scores)
+
+    def __passages(self, nodes: list[NodeWithScore]) -> list[str]:
+        return [node.node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+
+    def __apply_scores(self, nodes: list[NodeWithScore], scores: list[float]) -> list[NodeWithScore]:
+        for node, score in zip(nodes, scores):
+            node.score = score
+        return sorted(nodes, key=lambda x: -x.score if x.score else 0)[:self.top_n]
@@ -0,0 +1,164 @@
+import math
+import os
+from abc import ABC, abstractmethod
+from typing import Any
+
+from app.core.logger import get_logger
+
+
+class CrossEncoderBackend(ABC):
+    """
+    Scores (query, passage) pairs with a cross-encoder.
+
+    Models are loaded lazily by the first `predict` call, so construction is cheap and loading
+    happens on whichever thread scores first (the `BatchReranker` worker thread).
+    """
+    def __init__(self, model_name: str, max_length: int = 512):
+        self.model_name = model_name
+        self.max_length = max_length
+        self.logger = get_logger(self.__class__.__name__)
+
+    @abstractmethod
+    def predict(self, pairs: list[tuple[str, str]]) -> list[float]:
+        """Scores one batch of pairs, in input order."""
+
+
+class TorchCrossEncoder(CrossEncoderBackend):
+    """`sentence_transformers.CrossEncoder` running on torch."""
+    def __init__(self, model_name: str, max_length: int = 512):
+        super().__init__(model_name=model_name, max_length=max_length)
+        self._model: Any = None
+
+    def predict(self, pairs: list[tuple[str, str]]) -> list[float]:
+        scores = self.__get_model().predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+        return [float(score) for score in scores]
+
+    def __get_model(self) -> Any:
+        if self._model is None:
+            from sentence_transformers import CrossEncoder
+            self.logger.info(f"Loading cross-encoder `{self.model_name}`...")
+            self._model = CrossEncoder(self.model_name, max_length=self.max_length)
+        return self._model
+
+
+class OnnxCrossEncoder(CrossEncoderBackend):
+    """
+    The same cross-encoder exported to ONNX and run with onnxruntime on the CPU.
+
+    The model is exported once into `export_dir` (and, with `quantize`, converted to int8 with
+    dynamic quantization: int8 weights, activations quantized on the fly). Later starts load the
+    exported file. `intra_op_threads` caps the threads of a single forward pass (0 lets
+    onnxruntime use all cores). Scores use the activation `sentence_transformers` would apply,
+    so they are comparable with `TorchCrossEncoder`.
+    """
+    def __init__(self, model_name: str, max_length: int = 512, export_dir: str = "/app/cache/onnx", quantize: bool = True, intra_op_threads: int = 0):
+        super().__init__(model_name=model_name, max_length=max_length)
+        self.export_dir = os.path.join(export_dir, model_name.replace("/", "__"))
+        self.quantize = quantize
+        self.intra_op_threads = intra_op_threads
+        self._session: Any = None
+        self._tokenizer: Any = None
+        self._input_names: list[str] = []
+        self._sigmoid = True
+
+    @property
+    def model_path(self) -> str:
+        return os.path.join(self.export_dir, "model.int8.onnx" if self.quantize else "model.onnx")
+
+    def predict(self, pairs: list[tuple[str, str]]) -> list[float]:
+        session = self.__get_session()
+        features = self._tokenizer(
+            [query for query, _ in pairs],
+            [passage for _, passage in pairs],
+            padding=True,
+            truncation="longest_first",
+            max_length=self.max_length,
+            return_tensors="np"
+        )
+        logits = session.run(None, {name: features[name].astype("int64") for name in self._input_names})[0]
+        scores = [float(row[0]) for row in logits]
+        if self._sigmoid:
+            scores = [1 / (1 + math.exp(-score)) for score in scores]
+        return scores
+
+    def __get_session(self) -> Any:
+        if self._session is None:
+            import onnxruntime
+            from transformers import AutoConfig, AutoTokenizer
+
+            if not os.path.exists(self.model_path):
+                self.__export()
+            options = onnxruntime.SessionOptions()
+            options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+            options.intra_op_num_threads = max(0, self.intra_op_threads)
+            options.inter_op_num_threads = 1
+            self.logger.info(f"Loading ONNX cross-encoder `{self.model_path}`...")
+            self._session = onnxruntime.InferenceSession(self.model_path, sess_options=options, providers=["CPUExecutionProvider"])
+            self._input_names = [model_input.name for model_input in self._session.get_inputs()]
+            self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            self._sigmoid = self.__uses_sigmoid(AutoConfig.from_pretrained(self.model_name))
+        return self._session
+
+    def __export(self) -> None:
+        os.makedirs(self.export_dir, exist_ok=True)
+        fp32_path = os.path.join(self.export_dir, "model.onnx")
+        if not os.path.exists(fp32_path):
+            import torch
+            from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+            self.logger.info(f"Exporting `{self.model_name}` to ONNX...")
+            tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            model = AutoModelForSequenceClassification.from_pretrained(self.model_name, torchscript=True).eval()
+            sample = tokenizer([("query", "passage")], return_tensors="pt")
+            input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+            # Written under a temporary name first: replicas sharing the directory never load a partial file
+            tmp_path = f"{fp32_path}.{os.getpid()}.tmp"
+            with torch.no_grad():
+                torch.onnx.export(
+                    model,
+                    tuple(sample[name] for name in input_names),
+                    tmp_path,
+                    input_names=input_names,
+                    output_names=["logits"],
+                    dynamic_axes={**{name: {0: "batch", 1: "sequence"} for name in input_names}, "logits": {0: "batch"}},
+                    opset_version=17,
+                    dynamo=False
+                )
+            os.replace(tmp_path, fp32_path)
+        if self.quantize:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            self.logger.info(f"Quantizing `{self.model_name}` to int8...")
+            tmp_path = f"{self.model_path}.{os.getpid()}.tmp"
+            quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+            os.replace(tmp_path, self.model_path)
+
+    @staticmethod
+    def __uses_sigmoid(config: Any) -> bool:
+        # Mirrors `CrossEncoder.get_default_activation_fn`
+        activation = (getattr(config, "sentence_transformers", None) or {}).get("activation_fn") \
+            or getattr(config, "sbert_ce_default_activation_function", None)
+        if activation:
+            return activation.endswith("Sigmoid")
+        return config.num_labels == 1
+
+
+def create_cross_encoder(
+    backend: str,
+    model_name: str,
+    max_length: int = 512,
+    export_dir: str = "/app/cache/onnx",
+    quantize: bool = True,
+    intra_op_threads: int = 0
+) -> CrossEncoderBackend:
+    """Creates the `backend` ("torch" or "onnx") cross-encoder; the ONNX options are ignored by torch."""
+    if backend == "torch":
+        return TorchCrossEncoder(model_name=model_name, max_length=max_length)
+    if backend == "onnx":
+        return OnnxCrossEncoder(
+            model_name=model_name,
+            max_length=max_length,
+            export_dir=export_dir,
+            quantize=quantize,
+            intra_op_threads=intra_op_threads
+        )
+    raise ValueError(f"Unknown reranker backend `{backend}`.")
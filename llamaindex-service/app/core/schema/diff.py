@@ -0,0 +1,49 @@
+import hashlib
+import json
+from typing import Dict
+
+from app.models.schema.basic import SchemaField
+from app.models.schema.diff import SchemaDiff
+
+
+class SchemaDiffer:
+    """
+    Structural diff of the extracted fields of two schema versions.
+
+    Fields are matched by id and compared by a fingerprint of everything that shapes their
+    extraction (prompt, data type, example). Unchanged fields can reuse the previous extraction.
+    """
+    @staticmethod
+    def fingerprint(**parts) -> str:
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def field_fingerprints(fields: Dict[str, SchemaField]) -> Dict[str, str]:
+        """Fingerprints of the AI-filled fields of a v2 schema (user fields are never extracted)."""
+        return {
+            key: SchemaDiffer.fingerprint(prompt=field.prompt, data_type=field.data_type)
+            for key, field in fields.items()
+            if field.source == "ai"
+        }
+
+    @staticmethod
+    def diff(previous: Dict[str, str], current: Dict[str, str]) -> SchemaDiff:
+        """
+        Compares two `{field_id: fingerprint}` maps.
+
+        Args:
+            previous (Dict[str, str]): Fingerprints of the previously filled schema.
+            current (Dict[str, str]): Fingerprints of the new schema.
+
+        Returns:
+            SchemaDiff: Field ids grouped by change, in the order of the new schema.
+        """
+        diff = SchemaDiff(removed=[key for key in previous if key not in current])
+        for key, fingerprint in current.items():
+            if key not in previous:
+                diff.added.append(key)
+            elif previous[key] != fingerprint:
+                diff.changed.append(key)
+            else:
+                diff.unchanged.append(key)
+        return diff
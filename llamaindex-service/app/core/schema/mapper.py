@@ -64,6 +64,7 @@ class SchemaMapper:
                 source=v.get("source"),
                 prompt=v.get("prompt"),
                 required=v.get("required"),
+                force_refresh=v.get("force_refresh", False),
                 data_type=v.get("data_type")
             )
             
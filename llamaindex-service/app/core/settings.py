@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Literal, Optional
 import os
 
 class Settings(BaseSettings):
@@ -15,23 +16,98 @@ class Settings(BaseSettings):
     QDRANT_URL: str = os.getenv("QDRANT_URL")
     QDRANT_API_KEY: str | None = None
     QDRANT_COLLECTION: str = "documents"
+    QDRANT_SHARD_BY_COMPANY: bool = False
+    QDRANT_SHARDS_PER_COMPANY: int = 1
+    QDRANT_QUANTIZATION: Literal["none", "scalar", "binary"] = "none"
+    QDRANT_QUANTIZATION_ALWAYS_RAM: bool = True
+    QDRANT_VECTORS_ON_DISK: bool = False
+    QDRANT_SEARCH_OVERSAMPLING: float = 2.0
+    QDRANT_SEARCH_RESCORE: bool = True
+    QDRANT_PREFILTER_LIMIT: int = 100
+    QDRANT_HYBRID_SEARCH: bool = False
+    QDRANT_HYBRID_PREFETCH_LIMIT: int = 50
 
     # -- Embeddings --
     EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL") or "text-embedding-3-large"
     EMBEDDING_DIMENSION: int = os.getenv("EMBEDDING_DIMENSION") or 1536
+    EMBEDDING_PREFILTER_DIMENSION: int = 0
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = "/app/cache/embeddings.sqlite"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 200_000
 
     # -- LlamaIndex -- 
     CHUNK_SIZE: int = 2048
     CHUNK_OVERLAP: int = 200
+    QUERY_ENGINE_CACHE_SIZE: int = 256
+
+    # -- Reranker --
+    RERANK_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANK_TOP_N: int = 6
+    RERANK_BATCH_SIZE: int = 64
+    RERANK_MAX_WAIT_MS: float = 5.0
+    RERANK_MAX_LENGTH: int = 512
+    RERANK_BACKEND: Literal["torch", "onnx"] = "torch"
+    RERANK_ONNX_DIR: str = "/app/cache/onnx"
+    RERANK_ONNX_QUANTIZE: bool = True
+    RERANK_ONNX_THREADS: int = 0
+
+    # -- Extraction --
+    EXTRACTION_MAX_CONCURRENCY: int = 8
+    EXTRACTION_FIELD_TIMEOUT: float = 120.0
+    EXTRACTION_MODE: Literal["single", "batched"] = "single"
+    EXTRACTION_BATCH_SIZE: int = 6
+    EXTRACTION_BATCH_MAX_SNIPPETS: int = 12
+    EXTRACTION_PREFETCH_CONTEXT: bool = True
+    EXTRACTION_CACHE_ENABLED: bool = True
+    EXTRACTION_CACHE_MAX_ENTRIES: int = 10_000
+
+    # -- Answer cache --
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_MAX_ENTRIES: int = 2048
+    ANSWER_CACHE_TTL_SECONDS: float = 3600.0
+    # Cosine similarity at which a different wording counts as the same question; 1.0 = exact matches only.
+    # Opt-in per deployment (e.g. 0.97): a similar question is answered with another question's answer
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 1.0
 
     # -- Paths --
     TEMP_UPLOAD_DIR: str = "/tmp/uploads"
 
+    # -- PDF parsing --
+    PDF_PARSE_WORKERS: Optional[int] = None
+    PDF_PARSE_PAGES_PER_CHUNK: int = 16
+
+    # -- Executors --
+    EXECUTOR_IO_WORKERS: int = 32
+    EXECUTOR_CPU_WORKERS: Optional[int] = None
+    # Defaults to PDF_PARSE_WORKERS, then to the number of CPUs
+    EXECUTOR_PROCESS_WORKERS: Optional[int] = None
+    # Logs every event loop stall over the threshold with the blocking stack
+    LOOP_STALL_DEBUG: bool = False
+    LOOP_STALL_THRESHOLD_MS: float = 100.0
+
+    # -- Ingestion jobs --
+    JOBS_DB_PATH: str = "/app/cache/jobs.sqlite"
+    JOBS_WORKERS: int = 2
+    JOBS_MAX_ATTEMPTS: int = 3
+    JOBS_POLL_INTERVAL: float = 2.0
+    # A running job whose process stops renewing its lease for this long is claimed again
+    JOBS_LEASE_SECONDS: float = 60.0
+
     # -- MinIO --
     MINIO_URL: str = os.getenv("MINIO_URL")
     MINIO_ENDPOINT: str = os.getenv("MINIO_ENDPOINT")
     MINIO_ACCESS_KEY: str = os.getenv("MINIO_ROOT_USER")
     MINIO_SECRET_KEY: str = os.getenv("MINIO_ROOT_PASSWORD")
+    # "async" (AsyncS3Client, checked by app/test/s3_client_check.py) or the minio SDK in executor threads
+    MINIO_CLIENT: Literal["async", "minio"] = "minio"
+    MINIO_REGION: str = "us-east-1"
+    MINIO_POOL_SIZE: int = 32
+    MINIO_KEEPALIVE_SECONDS: float = 30.0
+    MINIO_MAX_CONCURRENCY: int = 16
+    MINIO_TIMEOUT: float = 30.0
+    # Object metadata (existence, etag, size) is reused for this long; 0 disables the cache
+    MINIO_METADATA_CACHE_TTL_SECONDS: float = 10.0
+    MINIO_METADATA_CACHE_MAX_ENTRIES: int = 10_000
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,137 @@
+import mimetypes
+from email.utils import format_datetime
+from typing import AsyncIterator, Awaitable, Callable, Optional
+from urllib.parse import quote
+
+from app.core.storage.s3_client import S3Object
+
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    def __init__(self, size: int):
+        super().__init__(f"Requested range is outside of the object's {size} bytes.")
+        self.size = size
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {"Content-Range": f"bytes */{self.size}"}
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[tuple[int, int]]:
+    """
+    Parses a `Range` header into an inclusive (first, last) byte range of an object of `size` bytes.
+
+    Returns None - serve the whole object - without a header, for other units, for multiple ranges
+    and for malformed values, as RFC 9110 allows.
+
+    Raises:
+        RangeNotSatisfiable: If the range starts beyond the end of the object.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, separator, last = (part.strip() for part in spec.partition("-"))
+    if not separator or (first and not first.isdigit()) or (last and not last.isdigit()) or not (first or last):
+        return None
+
+    if not first:
+        # Suffix range: the last `last` bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable(size)
+        return max(0, size - length), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(size)
+    end = min(int(last), size - 1) if last else size - 1
+    return start, end
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """Weak comparison of an `If-None-Match` header with an object's ETag."""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+class ObjectBody:
+    """Open object body: iterate it once and close it, read to the end or not."""
+    def __init__(self, chunks: AsyncIterator[bytes], close: Callable[[], Awaitable[None]]):
+        self.chunks = chunks
+        self._close: Optional[Callable[[], Awaitable[None]]] = close
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        return self.chunks.__aiter__()
+
+    async def aclose(self) -> None:
+        if self._close is not None:
+            close, self._close = self._close, None
+            await close()
+
+
+class ObjectStream:
+    """
+    A stored object (or a byte range of it) ready to be sent as an HTTP response.
+
+    Without a body the client's copy is current (304 Not Modified). `headers` carry the validators
+    (ETag, Last-Modified) and, with a body, its length, range and download file name.
+    """
+    def __init__(self, file_name: str, metadata: S3Object, byte_range: Optional[tuple[int, int]] = None, body: Optional[ObjectBody] = None):
+        self.file_name = file_name
+        self.metadata = metadata
+        self.byte_range = byte_range
+        self.body = body
+
+    @property
+    def status_code(self) -> int:
+        if self.body is None:
+            return 304
+        return 206 if self.byte_range else 200
+
+    @property
+    def media_type(self) -> str:
+        return mimetypes.guess_type(self.file_name)[0] or "application/octet-stream"
+
+    @property
+    def headers(self) -> dict[str, str]:
+        headers = {"Accept-Ranges": "bytes"}
+        if self.metadata.etag:
+            headers["ETag"] = self.metadata.etag
+        if self.metadata.last_modified:
+            headers["Last-Modified"] = format_datetime(self.metadata.last_modified, usegmt=True)
+        if self.body is None:
+            return headers
+
+        first, last = self.byte_range or (0, self.metadata.size - 1)
+        headers["Content-Length"] = str(last - first + 1)
+        if self.byte_range:
+            headers["Content-Range"] = f"bytes {first}-{last}/{self.metadata.size}"
+        # Same as starlette's FileResponse
+        quoted = quote(self.file_name)
+        if quoted != self.file_name:
+            headers["Content-Disposition"] = f"attachment; filename*=utf-8''{quoted}"
+        else:
+            headers["Content-Disposition"] = f'attachment; filename="{self.file_name}"'
+        return headers
+
+    async def iter_bytes(self) -> AsyncIterator[bytes]:
+        """Yields the body; the upstream connection is released when iteration ends or is abandoned."""
+        try:
+            if self.body is not None:
+                async for chunk in self.body:
+                    yield chunk
+        finally:
+            await self.aclose()
+
+    async def aclose(self) -> None:
+        if self.body is not None:
+            await self.body.aclose()
@@ -0,0 +1,292 @@
+import asyncio
+import base64
+import hashlib
+import os
+import xml.etree.ElementTree as ET
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Optional
+from urllib.parse import quote
+
+import httpx
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+from botocore.credentials import Credentials
+
+from app.core.logger import get_logger
+from app.infra.instances_executors import get_executors
+
+
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+S3_NAMESPACE = {"s3": "http://s3.amazonaws.com/doc/2006-03-01/"}
+# DeleteObjects accepts at most 1000 keys per request
+DELETE_BATCH_SIZE = 1000
+
+
+class S3Error(Exception):
+    def __init__(self, status_code: int, code: str, message: str):
+        super().__init__(f"{code} ({status_code}): {message}")
+        self.status_code = status_code
+        self.code = code
+        self.message = message
+
+
+class _S3SigV4Auth(SigV4Auth):
+    # Like botocore's S3 signer, the path is signed exactly as sent (already URL-encoded once);
+    # unlike it, the X-Amz-Content-SHA256 header set by the caller is kept, so streamed uploads
+    # can be UNSIGNED-PAYLOAD over plain http
+    def _normalize_url_path(self, path: str) -> str:
+        return path
+
+
+@dataclass
+class S3Object:
+    key: str
+    size: int
+    etag: Optional[str] = None
+    last_modified: Optional[datetime] = None
+
+
+class AsyncS3Client:
+    """
+    Minimal async S3 client (MinIO, AWS S3, moto) on a pooled `httpx.AsyncClient`.
+
+    Requests are signed with botocore's SigV4 signer and share one connection pool of
+    `pool_size` connections, kept alive for `keepalive_expiry` seconds between requests.
+    Object bodies are streamed in both directions (uploads are sent as UNSIGNED-PAYLOAD, so a
+    file is never read twice), and bulk deletes use DeleteObjects with up to `max_concurrency`
+    requests in flight. Pass `transport` to run against an in-process stand-in.
+    """
+    def __init__(
+        self,
+        endpoint_url: str,
+        access_key: str,
+        secret_key: str,
+        region: str = "us-east-1",
+        pool_size: int = 32,
+        keepalive_expiry: float = 30.0,
+        max_concurrency: int = 16,
+        timeout: float = 30.0,
+        chunk_size: int = 1024 * 1024,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.region = region
+        self.pool_size = max(1, pool_size)
+        self.keepalive_expiry = keepalive_expiry
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.transport = transport
+        self.logger = get_logger(self.__class__.__name__)
+
+        self._signer = _S3SigV4Auth(Credentials(access_key, secret_key), "s3", region)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def bucket_exists(self, bucket: str) -> bool:
+        response = await self.__request("HEAD", bucket, allowed=(404,))
+        return response.status_code == 200
+
+    async def make_bucket(self, bucket: str) -> None:
+        try:
+            await self.__request("PUT", bucket)
+        except S3Error as e:
+            if e.code != "BucketAlreadyOwnedByYou":
+                raise
+
+    async def head_object(self, bucket: str, key: str) -> Optional[S3Object]:
+        """Object metadata, without transferring the body; None if the object does not exist."""
+        response = await self.__request("HEAD", bucket, key, allowed=(404,))
+        if response.status_code == 404:
+            return None
+        return S3Object(
+            key=key,
+            size=int(response.headers.get("content-length", 0)),
+            etag=response.headers.get("etag"),
+            last_modified=self.__parse_http_date(response.headers.get("last-modified"))
+        )
+
+    async def put_file(self, bucket: str, key: str, path: str, content_type: str = "application/octet-stream") -> Optional[str]:
+        """Uploads a local file as one streamed PUT and returns the object's ETag."""
+        executors = get_executors()
+
+        async def body() -> AsyncIterator[bytes]:
+            # File reads run on the I/O executor, off the event loop
+            f = await executors.run_io(open, path, "rb")
+            try:
+                while chunk := await executors.run_io(f.read, self.chunk_size):
+                    yield chunk
+            finally:
+                await executors.run_io(f.close)
+
+        size = await executors.run_io(os.path.getsize, path)
+        response = await self.__request(
+            "PUT",
+            bucket,
+            key,
+            content=body(),
+            headers={"Content-Length": str(size), "Content-Type": content_type},
+            payload_hash=UNSIGNED_PAYLOAD
+        )
+        return response.headers.get("etag")
+
+    @asynccontextmanager
+    async def get_object(self, bucket: str, key: str, headers: Optional[dict[str, str]] = None) -> AsyncIterator[httpx.Response]:
+        """
+        Opens a streamed GET; read the body with `response.aiter_bytes()` inside the context.
+
+        `headers` are passed through (e.g. `Range`, `If-None-Match`); 206 and 304 responses are
+        returned like 200.
+        """
+        request = self.__build_request("GET", bucket, key, headers=headers)
+        response = await self.__get_client().send(request, stream=True)
+        try:
+            if response.status_code >= 400 and response.status_code != 416:
+                await response.aread()
+                raise self.__error(response)
+            yield response
+        finally:
+            await response.aclose()
+
+    async def download_file(self, bucket: str, key: str, path: str) -> None:
+        executors = get_executors()
+        async with self.get_object(bucket, key) as response:
+            f = await executors.run_io(open, path, "wb")
+            try:
+                async for chunk in response.aiter_bytes(self.chunk_size):
+                    await executors.run_io(f.write, chunk)
+            finally:
+                await executors.run_io(f.close)
+
+    async def list_objects(self, bucket: str, prefix: str = "") -> list[S3Object]:
+        objects = []
+        token = None
+        while True:
+            params = {"list-type": "2", "prefix": prefix}
+            if token:
+                params["continuation-token"] = token
+            response = await self.__request("GET", bucket, params=params)
+            root = ET.fromstring(response.content)
+            for item in root.findall("s3:Contents", S3_NAMESPACE):
+                objects.append(S3Object(
+                    key=item.findtext("s3:Key", namespaces=S3_NAMESPACE),
+                    size=int(item.findtext("s3:Size", default="0", namespaces=S3_NAMESPACE)),
+                    etag=item.findtext("s3:ETag", namespaces=S3_NAMESPACE),
+                    last_modified=datetime.fromisoformat(item.findtext("s3:LastModified", namespaces=S3_NAMESPACE).replace("Z", "+00:00"))
+                ))
+            token = root.findtext("s3:NextContinuationToken", namespaces=S3_NAMESPACE)
+            if root.findtext("s3:IsTruncated", namespaces=S3_NAMESPACE) != "true" or not token:
+                return objects
+
+    async def delete_object(self, bucket: str, key: str) -> None:
+        await self.__request("DELETE", bucket, key)
+
+    async def delete_objects(self, bucket: str, keys: list[str]) -> None:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def delete_batch(batch: list[str]) -> None:
+            objects = "".join(f"<Object><Key>{self.__xml_escape(key)}</Key></Object>" for key in batch)
+            body = f"<Delete><Quiet>true</Quiet>{objects}</Delete>".encode("utf-8")
+            async with semaphore:
+                response = await self.__request(
+                    "POST",
+                    bucket,
+                    params={"delete": ""},
+                    content=body,
+                    headers={"Content-MD5": base64.b64encode(hashlib.md5(body).digest()).decode()}
+                )
+            errors = ET.fromstring(response.content).findall("s3:Error", S3_NAMESPACE)
+            if errors:
+                error = errors[0]
+                raise S3Error(
+                    response.status_code,
+                    error.findtext("s3:Code", default="", namespaces=S3_NAMESPACE),
+                    f"{error.findtext('s3:Key', namespaces=S3_NAMESPACE)}: {error.findtext('s3:Message', namespaces=S3_NAMESPACE)}"
+                )
+
+        await asyncio.gather(*(
+            delete_batch(keys[start:start + DELETE_BATCH_SIZE])
+            for start in range(0, len(keys), DELETE_BATCH_SIZE)
+        ))
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def __get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size,
+                    keepalive_expiry=self.keepalive_expiry
+                ),
+                timeout=self.timeout,
+                transport=self.transport
+            )
+        return self._client
+
+    async def __request(
+        self,
+        method: str,
+        bucket: str,
+        key: Optional[str] = None,
+        params: Optional[dict[str, str]] = None,
+        content=None,
+        headers: Optional[dict[str, str]] = None,
+        payload_hash: Optional[str] = None,
+        allowed: tuple[int, ...] = ()
+    ) -> httpx.Response:
+        request = self.__build_request(method, bucket, key, params=params, content=content, headers=headers, payload_hash=payload_hash)
+        response = await self.__get_client().send(request)
+        if response.status_code >= 400 and response.status_code not in allowed:
+            raise self.__error(response)
+        return response
+
+    def __build_request(
+        self,
+        method: str,
+        bucket: str,
+        key: Optional[str] = None,
+        params: Optional[dict[str, str]] = None,
+        content=None,
+        headers: Optional[dict[str, str]] = None,
+        payload_hash: Optional[str] = None
+    ) -> httpx.Request:
+        # Path-style URL, encoded once here so the signed path is exactly the one sent
+        url = f"{self.endpoint_url}/{quote(bucket, safe='')}"
+        if key is not None:
+            url += "/" + quote(key, safe="/~")
+        if params:
+            url += "?" + "&".join(f"{quote(name, safe='~')}={quote(value, safe='~')}" for name, value in sorted(params.items()))
+        if payload_hash is None:
+            payload_hash = hashlib.sha256(content if isinstance(content, bytes) else b"").hexdigest()
+
+        signed = AWSRequest(method=method, url=url, headers={**(headers or {}), "X-Amz-Content-SHA256": payload_hash})
+        self._signer.add_auth(signed)
+        return self.__get_client().build_request(method, url, headers=dict(signed.headers.items()), content=content)
+
+    @staticmethod
+    def __error(response: httpx.Response) -> S3Error:
+        code, message = response.reason_phrase, ""
+        if response.content:
+            try:
+                root = ET.fromstring(response.content)
+                code = root.findtext("Code") or code
+                message = root.findtext("Message") or ""
+            except ET.ParseError:
+                message = response.text[:200]
+        elif response.status_code == 404:
+            code = "NoSuchKey"
+        return S3Error(response.status_code, code, message)
+
+    @staticmethod
+    def __parse_http_date(value: Optional[str]) -> Optional[datetime]:
+        return parsedate_to_datetime(value) if value else None
+
+    @staticmethod
+    def __xml_escape(value: str) -> str:
+        return value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
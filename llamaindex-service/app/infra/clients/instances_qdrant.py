@@ -1,5 +1,7 @@
 from functools import lru_cache
 from qdrant_client import QdrantClient, AsyncQdrantClient
+from app.core.qdrant.collection_layout import CollectionLayout
+from app.core.qdrant.document_points import DocumentPoints
 from app.core.settings import get_settings
 
 @lru_cache()
@@ -18,4 +20,29 @@ def get_qdrant_aclient() -> AsyncQdrantClient:
         location=settings.QDRANT_URL,
         timeout=30
     )
-    return client
\ No newline at end of file
+    return client
+
+@lru_cache()
+def get_collection_layout() -> CollectionLayout:
+    settings = get_settings()
+    return CollectionLayout(
+        client=get_qdrant_aclient(),
+        collection_name=settings.QDRANT_COLLECTION,
+        vector_size=settings.EMBEDDING_DIMENSION,
+        shard_by_company=settings.QDRANT_SHARD_BY_COMPANY,
+        shards_per_company=settings.QDRANT_SHARDS_PER_COMPANY,
+        quantization=settings.QDRANT_QUANTIZATION,
+        quantization_always_ram=settings.QDRANT_QUANTIZATION_ALWAYS_RAM,
+        vectors_on_disk=settings.QDRANT_VECTORS_ON_DISK,
+        search_oversampling=settings.QDRANT_SEARCH_OVERSAMPLING,
+        search_rescore=settings.QDRANT_SEARCH_RESCORE,
+        prefilter_dimension=settings.EMBEDDING_PREFILTER_DIMENSION,
+        hybrid=settings.QDRANT_HYBRID_SEARCH
+    )
+
+@lru_cache()
+def get_document_points() -> DocumentPoints:
+    return DocumentPoints(
+        client=get_qdrant_aclient(),
+        layout=get_collection_layout()
+    )
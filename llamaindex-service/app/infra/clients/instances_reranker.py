@@ -0,0 +1,20 @@
+from functools import lru_cache
+from app.core.rerank.batch_reranker import BatchReranker
+from app.core.rerank.cross_encoders import create_cross_encoder
+from app.core.settings import get_settings
+
+@lru_cache()
+def get_batch_reranker() -> BatchReranker:
+    settings = get_settings()
+    return BatchReranker(
+        backend=create_cross_encoder(
+            backend=settings.RERANK_BACKEND,
+            model_name=settings.RERANK_MODEL,
+            max_length=settings.RERANK_MAX_LENGTH,
+            export_dir=settings.RERANK_ONNX_DIR,
+            quantize=settings.RERANK_ONNX_QUANTIZE,
+            intra_op_threads=settings.RERANK_ONNX_THREADS
+        ),
+        batch_size=settings.RERANK_BATCH_SIZE,
+        max_wait_ms=settings.RERANK_MAX_WAIT_MS
+    )
@@ -1,22 +1,61 @@
 from functools import lru_cache
 from app.core.settings import get_settings
-from typing import Optional
+from typing import Any, Callable, Literal, Optional, Union
 
 from typing import Tuple
 
 from app.models.files import LocalFile, FSFile
 from app.api.services.file_storage_service import FileStorageService
+from app.api.services.async_file_storage_service import AsyncFileStorageService
+from app.core.caching.object_metadata_cache import ObjectMetadataCache
+from app.core.storage.object_stream import CHUNK_SIZE, ObjectBody, ObjectStream, etag_matches, parse_range
+from app.core.storage.s3_client import S3Object
+from app.infra.instances_executors import get_executors
 
 
 class FileStorageWrapper:
-    def __init__(self, url: str, access_key: str, secret_key: str):
-        self.file_storage_service = FileStorageService(
-            url=url,
-            access_key=access_key,
-            secret_key=secret_key
-        )
-
-    def upload_file(self, local_file: LocalFile) -> str:
+    """
+    Object storage behind one async interface.
+
+    With the `async` client, calls go straight to `AsyncFileStorageService` (pooled httpx
+    connections, no threads). The `minio` client keeps the synchronous `minio.Minio` service
+    and runs each call on the I/O executor.
+    """
+    def __init__(
+        self,
+        url: str,
+        access_key: str,
+        secret_key: str,
+        client: Literal["async", "minio"] = "async",
+        region: str = "us-east-1",
+        pool_size: int = 32,
+        keepalive_expiry: float = 30.0,
+        max_concurrency: int = 16,
+        timeout: float = 30.0,
+        metadata_cache: Optional[ObjectMetadataCache] = None
+    ):
+        self.file_storage_service: Union[AsyncFileStorageService, FileStorageService]
+        if client == "async":
+            self.file_storage_service = AsyncFileStorageService(
+                url=url,
+                access_key=access_key,
+                secret_key=secret_key,
+                region=region,
+                pool_size=pool_size,
+                keepalive_expiry=keepalive_expiry,
+                max_concurrency=max_concurrency,
+                timeout=timeout,
+                metadata_cache=metadata_cache
+            )
+        else:
+            self.file_storage_service = FileStorageService(
+                url=url,
+                access_key=access_key,
+                secret_key=secret_key,
+                metadata_cache=metadata_cache
+            )
+
+    async def upload_file(self, local_file: LocalFile) -> str:
         """
         Uploads a local file to the specified bucket in the object storage.
         If the target bucket does not exist, it will be created. If an object with the same
@@ -29,9 +68,9 @@ class FileStorageWrapper:
             Exception: If the object already exists in the bucket.
         # This method returns the path to the file in S3.
         """
-        return self.file_storage_service.upload_file(local_file=local_file)
+        return await self.__run(self.file_storage_service.upload_file, local_file=local_file)
     
-    def read_file(self, target_file: FSFile) -> Tuple[FSFile, Optional[str]]:
+    async def read_file(self, target_file: FSFile) -> Tuple[FSFile, Optional[str]]:
         """
         Reads a file from remote storage and saves it to a temporary local file.
 
@@ -47,12 +86,12 @@ class FileStorageWrapper:
         Note:
             The temporary file is not deleted automatically. Caller is responsible for cleanup.
         """
-        return self.file_storage_service.read_file(target_file=target_file)
+        return await self.__run(self.file_storage_service.read_file, target_file=target_file)
     
-    def read_file_from_url(self, bucket: str, file_url: str) -> str:
-        return self.file_storage_service.read_file_from_url(bucket=bucket, file_url=file_url)
+    async def read_file_from_url(self, bucket: str, file_url: str) -> str:
+        return await self.__run(self.file_storage_service.read_file_from_url, bucket=bucket, file_url=file_url)
 
-    def upsert_file(self, target_file: LocalFile):
+    async def upsert_file(self, target_file: LocalFile):
         """
         Inserts or updates a file in the storage system.
 
@@ -70,9 +109,9 @@ class FileStorageWrapper:
         Logs:
             - Information about the upsert operation's start and successful completion.
         """
-        return self.file_storage_service.upsert_file(target_file=target_file)
+        return await self.__run(self.file_storage_service.upsert_file, target_file=target_file)
     
-    def delete_file(self, target_file: FSFile):
+    async def delete_file(self, target_file: FSFile):
         """
         Deletes the specified file and its associated directory from the storage system.
 
@@ -86,7 +125,86 @@ class FileStorageWrapper:
             - Removes the directory associated with the target file.
             - Logs information about the deletion or any errors encountered.
         """
-        self.delete_file(target_file=target_file)
+        await self.__run(self.file_storage_service.delete_file, target_file=target_file)
+
+    async def check_object_exists(self, local_file: Optional[LocalFile] = None, remote_file: Optional[FSFile] = None) -> bool:
+        return await self.__run(self.file_storage_service.check_object_exists, local_file=local_file, remote_file=remote_file)
+
+    async def stat_file(self, local_file: Optional[LocalFile] = None, remote_file: Optional[FSFile] = None) -> Optional[S3Object]:
+        """
+        Returns the metadata (etag, size, last_modified) of a stored object without transferring its body.
+
+        Args:
+            local_file (Optional[LocalFile]): The local file whose remote counterpart is checked.
+            remote_file (Optional[FSFile]): The remote file to check, if no local file is given.
+
+        Returns:
+            Optional[S3Object]: The object's metadata, or None if it does not exist.
+        """
+        return await self.__run(self.file_storage_service.stat_file, local_file=local_file, remote_file=remote_file)
+
+    async def open_file(self, target_file: FSFile, range_header: Optional[str] = None, if_none_match: Optional[str] = None) -> ObjectStream:
+        """
+        Opens a stored file for streaming, without buffering it in memory or on disk.
+
+        Args:
+            target_file (FSFile): The file to open; without a file name, the first file of its document type.
+            range_header (Optional[str]): The request's `Range` header; a single byte range is served as 206.
+            if_none_match (Optional[str]): The request's `If-None-Match` header; a matching ETag gives a 304 without a body.
+
+        Returns:
+            ObjectStream: The file's metadata and, unless not modified, its open body. The caller must
+                iterate or close it.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            RangeNotSatisfiable: If the range starts beyond the end of the file.
+        """
+        target_file = await self.__run(self.file_storage_service.find_file, target_file=target_file)
+        # The body is opened against the ETag that sized the response: retried once if the object changed in between
+        for _ in range(2):
+            metadata = await self.stat_file(remote_file=target_file)
+            if metadata is None:
+                raise FileNotFoundError(f"Object {target_file.remote_file_path} was not found.")
+            if etag_matches(if_none_match, metadata.etag):
+                return ObjectStream(file_name=target_file.file_name, metadata=metadata)
+            byte_range = parse_range(range_header, metadata.size)
+            body = await self.__open_body(target_file=target_file, byte_range=byte_range, etag=metadata.etag)
+            if body is not None:
+                return ObjectStream(file_name=target_file.file_name, metadata=metadata, byte_range=byte_range, body=body)
+        raise Exception(f"Object {target_file.remote_file_path} kept changing while being opened.")
+
+    async def aclose(self) -> None:
+        """Closes the connection pool of the async client."""
+        if isinstance(self.file_storage_service, AsyncFileStorageService):
+            await self.file_storage_service.aclose()
+
+    async def __open_body(self, target_file: FSFile, byte_range: Optional[tuple[int, int]], etag: Optional[str]) -> Optional[ObjectBody]:
+        if isinstance(self.file_storage_service, AsyncFileStorageService):
+            return await self.file_storage_service.open_object(bucket=target_file.bucket, object_name=target_file.remote_file_path, byte_range=byte_range, etag=etag)
+
+        executors = get_executors()
+        response = await executors.run_io(
+            self.file_storage_service.open_object, bucket=target_file.bucket, object_name=target_file.remote_file_path, byte_range=byte_range, etag=etag
+        )
+        if response is None:
+            return None
+
+        async def chunks():
+            stream = response.stream(CHUNK_SIZE)
+            while chunk := await executors.run_io(next, stream, b""):
+                yield chunk
+
+        async def close():
+            await executors.run_io(response.close)
+            response.release_conn()
+
+        return ObjectBody(chunks=chunks(), close=close)
+
+    async def __run(self, fn: Callable[..., Any], **kwargs: Any) -> Any:
+        if isinstance(self.file_storage_service, AsyncFileStorageService):
+            return await fn(**kwargs)
+        return await get_executors().run_io(fn, **kwargs)
                 
 @lru_cache()
 def get_file_storage_wrapper() -> FileStorageWrapper:
@@ -94,6 +212,16 @@ def get_file_storage_wrapper() -> FileStorageWrapper:
     file_manager = FileStorageWrapper(
         url=settings.MINIO_ENDPOINT,
         access_key=settings.MINIO_ACCESS_KEY,
-        secret_key=settings.MINIO_SECRET_KEY
+        secret_key=settings.MINIO_SECRET_KEY,
+        client=settings.MINIO_CLIENT,
+        region=settings.MINIO_REGION,
+        pool_size=settings.MINIO_POOL_SIZE,
+        keepalive_expiry=settings.MINIO_KEEPALIVE_SECONDS,
+        max_concurrency=settings.MINIO_MAX_CONCURRENCY,
+        timeout=settings.MINIO_TIMEOUT,
+        metadata_cache=ObjectMetadataCache(
+            max_entries=settings.MINIO_METADATA_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.MINIO_METADATA_CACHE_TTL_SECONDS
+        )
     )
     return file_manager
\ No newline at end of file
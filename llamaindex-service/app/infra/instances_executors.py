@@ -0,0 +1,12 @@
+from functools import lru_cache
+from app.core.concurrency.executors import Executors
+from app.core.settings import get_settings
+
+@lru_cache()
+def get_executors() -> Executors:
+    settings = get_settings()
+    return Executors(
+        io_workers=settings.EXECUTOR_IO_WORKERS,
+        cpu_workers=settings.EXECUTOR_CPU_WORKERS,
+        process_workers=settings.EXECUTOR_PROCESS_WORKERS or settings.PDF_PARSE_WORKERS
+    )
@@ -5,6 +5,41 @@ from llama_index.llms.openai import OpenAI
 from app.core.settings import get_settings
 from app.infra.clients.instances_qdrant import get_qdrant_client
 from llama_index.vector_stores.qdrant import QdrantVectorStore
+from app.core.embeddings.cache import EmbeddingCache
+from app.core.embeddings.cached_embedding import CachedEmbedding
+from app.core.caching.corpus_versions import CorpusVersions
+from app.core.caching.answer_cache import AnswerCache
+from app.core.caching.extraction_cache import ExtractionCache
+
+@lru_cache()
+def get_embedding_cache() -> EmbeddingCache:
+    settings = get_settings()
+    return EmbeddingCache(
+        path=settings.EMBEDDING_CACHE_PATH,
+        max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES
+    )
+
+@lru_cache()
+def get_corpus_versions() -> CorpusVersions:
+    return CorpusVersions()
+
+@lru_cache()
+def get_answer_cache() -> AnswerCache:
+    settings = get_settings()
+    return AnswerCache(
+        versions=get_corpus_versions(),
+        max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+        similarity_threshold=settings.ANSWER_CACHE_SIMILARITY_THRESHOLD
+    )
+
+@lru_cache()
+def get_extraction_cache() -> ExtractionCache:
+    settings = get_settings()
+    return ExtractionCache(
+        versions=get_corpus_versions(),
+        max_entries=settings.EXTRACTION_CACHE_MAX_ENTRIES
+    )
 
 @lru_cache()
 def get_llamaindex_contexts():
@@ -16,6 +51,12 @@ def get_llamaindex_contexts():
         api_key=settings.OPENAI_API_KEY,
         dimensions=settings.EMBEDDING_DIMENSION
     )
+    if settings.EMBEDDING_CACHE_ENABLED:
+        embed_model = CachedEmbedding(
+            embed_model=embed_model,
+            cache=get_embedding_cache(),
+            dimension=settings.EMBEDDING_DIMENSION
+        )
 
     vector_store = QdrantVectorStore(
         client=qdrant,
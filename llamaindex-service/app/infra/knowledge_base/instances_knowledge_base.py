@@ -3,8 +3,10 @@ from app.models.files import KBFile
 
 from llama_index.core.node_parser import SentenceWindowNodeParser
 from llama_index.core.postprocessor import MetadataReplacementPostProcessor
-from app.models.field_extraction import FieldExtraction
+from app.models.field_extraction import FieldExtraction, FieldExtractionTask
+from app.models.ingestion_job import IngestionProgressCallback
 
+from llama_index.core.schema import NodeWithScore
 from typing import Optional
 
 SENTENCE_WINDOW_PARSER = SentenceWindowNodeParser.from_defaults(window_size=3)
@@ -25,16 +27,20 @@ class KnowledgeBaseWrapper:
         - delete_document(company_id: str, project_id: str, document_category: str, document_type: str):
             Asynchronously deletes all nodes and associated data for a specific document identified by company, project, category, and type.
         - upsert_document(file: KBFile):
-            Asynchronously upserts a document in the knowledge base by deleting any existing matching document and adding the new one.
+            Asynchronously upserts a document in the knowledge base, writing only nodes that changed.
         - extract_field(company_id: str, project_id: str, field_prompt: str, field_type: str) -> FieldExtraction:
             Asynchronously extracts a specific field from the knowledge base using a prompt and field type.
+        - extract_fields(company_id: str, project_id: str, tasks: list[FieldExtractionTask]) -> dict[str, FieldExtraction]:
+            Asynchronously extracts a group of related fields with a single LLM call.
+        - retrieve_nodes_for_fields(company_id: str, project_id: str, instructions: list[str]) -> list[list[NodeWithScore]]:
+            Asynchronously retrieves context for all fields of a document in one embedding batch and one Qdrant batch search.
     """
     TOP_K = 6
     
     def __init__(self):
         self.knowledge_base_service = KnowledgeBaseService()
                     
-    async def upload_document(self, file: KBFile):
+    async def upload_document(self, file: KBFile, progress: Optional[IngestionProgressCallback] = None, resume: bool = False):
         """
         Asynchronously adds a document to the knowledge base.
         This method checks if the default collection exists and creates it if necessary.
@@ -42,6 +48,8 @@ class KnowledgeBaseWrapper:
         The document is loaded and parsed into nodes, which are then inserted into the index.
         Args:
             file (KBFile): The file object containing document data to be added.
+            progress (Optional[IngestionProgressCallback]): Awaited with the current stage and counters as ingestion advances.
+            resume (bool): Continue an interrupted upload, inserting only nodes that are not stored yet.
         Raises:
             Exception: If nodes already exist for the given file ID.
             ValueError: If no documents are extracted from the provided file.
@@ -50,7 +58,7 @@ class KnowledgeBaseWrapper:
         Note:
             Use `upsert_document` if you intend to update an existing document.
         """
-        await self.knowledge_base_service.upload_document(file=file)
+        await self.knowledge_base_service.upload_document(file=file, progress=progress, resume=resume)
         
     async def query(self, question: str, company_id: str, project_id: str, document_type: Optional[str] = None, document_category: Optional[str] = None, file_name: Optional[str] = None, k: int = 5) -> str:
         """
@@ -103,17 +111,18 @@ class KnowledgeBaseWrapper:
             document_type=document_type
         )
         
-    async def upsert_document(self, file: KBFile):
+    async def upsert_document(self, file: KBFile, progress: Optional[IngestionProgressCallback] = None):
         """
         Upserts a document in the knowledge base.
 
-        This method first deletes any existing document matching the provided file's
-        company ID, project ID, document category, and document type. It then adds
-        the new document to the knowledge base.
+        Only nodes that changed are written: new nodes are inserted and nodes that no longer
+        exist in the file are deleted, for the provided file's company ID, project ID,
+        document category, and document type.
 
         Args:
             file (KBFile): The document file to upsert, containing metadata such as
                 company_id, project_id, document_category, and document_type.
+            progress (Optional[IngestionProgressCallback]): Awaited with the current stage and counters as ingestion advances.
 
         Returns:
             None
@@ -121,14 +130,36 @@ class KnowledgeBaseWrapper:
         Note:
             This operation is asynchronous.
         """
-        await self.knowledge_base_service.upsert_document(file=file)
+        await self.knowledge_base_service.upsert_document(file=file, progress=progress)
             
-    async def extract_field(self, company_id: str, project_id: str, field_prompt: str, field_type: str) -> FieldExtraction:
+    async def extract_field(self, company_id: str, project_id: str, field_prompt: str, field_type: str, nodes: Optional[list[NodeWithScore]] = None) -> FieldExtraction:
         return await self.knowledge_base_service.extract_field(
             company_id=company_id,
             project_id=project_id,
             field_prompt=field_prompt,
-            field_type=field_type
+            field_type=field_type,
+            nodes=nodes
+        )
+        
+    async def extract_fields(self, company_id: str, project_id: str, tasks: list[FieldExtractionTask], nodes_per_field: Optional[list[list[NodeWithScore]]] = None) -> dict[str, FieldExtraction]:
+        """
+        Asynchronously extracts several related fields with a single LLM call, returning extractions keyed by field id.
+        """
+        return await self.knowledge_base_service.extract_fields(
+            company_id=company_id,
+            project_id=project_id,
+            tasks=tasks,
+            nodes_per_field=nodes_per_field
+        )
+        
+    async def retrieve_nodes_for_fields(self, company_id: str, project_id: str, instructions: list[str]) -> list[list[NodeWithScore]]:
+        """
+        Asynchronously retrieves context nodes for many field instructions with one embedding batch and one Qdrant batch search.
+        """
+        return await self.knowledge_base_service.retrieve_nodes_for_fields(
+            company_id=company_id,
+            project_id=project_id,
+            instructions=instructions
         )
         
             
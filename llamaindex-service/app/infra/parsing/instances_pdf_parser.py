@@ -0,0 +1,13 @@
+from functools import lru_cache
+from app.core.parsing.pdf_parser import PdfParsingEngine
+from app.core.settings import get_settings
+from app.infra.instances_executors import get_executors
+
+@lru_cache()
+def get_pdf_parsing_engine() -> PdfParsingEngine:
+    settings = get_settings()
+    return PdfParsingEngine(
+        executors=get_executors(),
+        max_workers=settings.PDF_PARSE_WORKERS,
+        pages_per_chunk=settings.PDF_PARSE_PAGES_PER_CHUNK
+    )
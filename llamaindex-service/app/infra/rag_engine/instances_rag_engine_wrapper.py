@@ -1,9 +1,12 @@
 from functools import lru_cache
 
 from app.models.files import FSFile, LocalFile, KBFile
-from typing import Optional, Tuple
+from app.models.ingestion_job import IngestionProgressCallback
+from typing import Literal, Optional
 
 from app.api.services.rag_engine_service import RagEngineService
+from app.core.storage.object_stream import ObjectStream
+from app.models.schema.diff import SchemaDiff
 
 class RagEngineWrapper:
     def __init__(self):
@@ -15,8 +18,14 @@ class RagEngineWrapper:
     async def upsert_document(self, file: LocalFile):
         await self.rag_engine_service.upsert_document(file=file)
         
-    def read_document(self, file: FSFile) -> Tuple[FSFile, str]:
-        return self.rag_engine_service.read_document(file=file)
+    async def store_document(self, file: LocalFile, operation: Literal["upload", "upsert"]):
+        await self.rag_engine_service.store_document(file=file, operation=operation)
+        
+    async def index_document(self, file: LocalFile, operation: Literal["upload", "upsert"], progress: Optional[IngestionProgressCallback] = None, resume: bool = False):
+        await self.rag_engine_service.index_document(file=file, operation=operation, progress=progress, resume=resume)
+        
+    async def open_document(self, file: FSFile, range_header: Optional[str] = None, if_none_match: Optional[str] = None) -> ObjectStream:
+        return await self.rag_engine_service.open_document(file=file, range_header=range_header, if_none_match=if_none_match)
     
     async def query(self, question: str, company_id: str, project_id: str, document_type: Optional[str] = None, document_category: Optional[str] = None, file_name: Optional[str] = None, k: int = 5) -> str:
         return await self.rag_engine_service.query(
@@ -32,18 +41,38 @@ class RagEngineWrapper:
     async def delete_document(self, file: FSFile):
         await self.rag_engine_service.delete_document(file=file)
                 
-    async def generate_document(self, document_type: str, author: str, company_id: str, project_id: str) -> LocalFile:
+    async def generate_document(self, document_type: str, author: str, company_id: str, project_id: str, force_refresh: bool = False, reuse_previous: bool = False) -> LocalFile:
         return await self.rag_engine_service.generate_document(
             document_type=document_type,
             author=author,
             company_id=company_id,
+            project_id=project_id,
+            force_refresh=force_refresh,
+            reuse_previous=reuse_previous
+        )
+        
+    async def diff_document_schema(self, document_type: str, company_id: str, project_id: str) -> SchemaDiff:
+        return await self.rag_engine_service.diff_document_schema(
+            document_type=document_type,
+            company_id=company_id,
             project_id=project_id
         )
         
-    async def generate_docx(self, bucket: str, file_url: str) -> str:
+    async def regenerate_document(self, document_type: str, company_id: str, project_id: str, changed_file_ids: Optional[list[str]] = None) -> LocalFile:
+        return await self.rag_engine_service.regenerate_document(
+            document_type=document_type,
+            company_id=company_id,
+            project_id=project_id,
+            changed_file_ids=changed_file_ids
+        )
+        
+    async def generate_docx(self, bucket: str, file_url: str, force_refresh: bool = False, reuse_previous: bool = False) -> str:
         return await self.rag_engine_service.generate_docx(
-            bucket=bucket, file_url=file_url
+            bucket=bucket, file_url=file_url, force_refresh=force_refresh, reuse_previous=reuse_previous
         )
+        
+    async def diff_docx_schema(self, bucket: str, file_url: str) -> SchemaDiff:
+        return await self.rag_engine_service.diff_docx_schema(bucket=bucket, file_url=file_url)
     
         
 @lru_cache()
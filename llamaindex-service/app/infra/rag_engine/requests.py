@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, Literal
+from typing import List, Optional, Literal
 from fastapi import FastAPI, UploadFile, File
 
 class RagEngineRequest:
@@ -50,13 +50,34 @@ class RagEngineRequest:
         author: str
         document_category: str
         
+    class RegenerateDocument(BaseModel):
+        company_id: str
+        project_id: str
+        document_category: str
+        
+        # Knowledge base file ids known to have changed; fields are also refreshed when their context changed
+        changed_file_ids: Optional[List[str]] = None
+        
     class GenerateDocx(BaseModel):
         bucket: str
         file_url: str
+        # Re-extract every field instead of reusing cached extractions
+        force_refresh: bool = False
+        # Copy extractions of fields unchanged since the last docx generated from this schema file
+        reuse_previous: bool = False
         # company_id: str
         # project_id: str
         # document_category: str
         
+    class DiffDocxSchema(BaseModel):
+        bucket: str
+        file_url: str
+        
+    class DiffDocumentSchema(BaseModel):
+        company_id: str
+        project_id: str
+        document_category: str
+        
     class GenerateDocumentFromSchema(BaseModel):
         company_id: str
         project_id: str
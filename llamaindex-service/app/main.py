@@ -1,20 +1,46 @@
 from fastapi import FastAPI
 from app.api.routes import (
     routes_health,
+    routes_file_storage_wrapper,
     routes_rag_engine_wrapper
 )
+from app.api.services.ingestion_job_service import get_ingestion_job_service
+from app.infra.instances_executors import get_executors
+from app.infra.file_storage.instances_file_storage_wrapper import get_file_storage_wrapper
+from app.infra.clients.instances_qdrant import get_collection_layout
+from app.infra.instances_llamaindex import get_embedding_cache
+from app.core.concurrency.stall_monitor import EventLoopStallMonitor
+from app.core.logger import get_logger
+from app.core.settings import get_settings
 from contextlib import asynccontextmanager
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: code before yield
     # await startup_load_all_projects()
+    settings = get_settings()
+    stall_monitor = None
+    if settings.LOOP_STALL_DEBUG:
+        stall_monitor = EventLoopStallMonitor(threshold_ms=settings.LOOP_STALL_THRESHOLD_MS)
+        stall_monitor.start()
+    try:
+        await get_collection_layout().ensure_collection()
+    except Exception as e:
+        # Not fatal: the first request retries
+        get_logger("Startup").warning(f"Could not verify the Qdrant collection at startup: {e}")
+    job_service = get_ingestion_job_service()
+    await job_service.start()
     
     yield
     
     # Shutdown: code after yield (if you need cleanup)
-    # Add any cleanup code here if needed
-    pass
+    await job_service.stop()
+    await get_file_storage_wrapper().aclose()
+    get_executors().shutdown()
+    if settings.EMBEDDING_CACHE_ENABLED:
+        get_embedding_cache().flush()
+    if stall_monitor:
+        stall_monitor.stop()
 
 def create_app() -> FastAPI:
     app = FastAPI(
@@ -26,6 +52,7 @@ def create_app() -> FastAPI:
 
     # Register routes
     app.include_router(routes_health.router, prefix="/health", tags=["Health Check"])
+    app.include_router(routes_file_storage_wrapper.read_router, prefix="/file_storage", tags=["File Storage Wrapper"])
     app.include_router(routes_rag_engine_wrapper.router, prefix="/rag_engine", tags=["Rag Engine Wrapper"])
     return app
 
@@ -0,0 +1,136 @@
+"""
+Migrates an existing knowledge base collection to the current layout.
+
+Usage:
+    python -m app.migrations.migrate_collection
+        Adds the missing keyword payload indexes (and tenant flags) to QDRANT_COLLECTION in place.
+
+    python -m app.migrations.migrate_collection --storage
+        Also applies QDRANT_QUANTIZATION and QDRANT_VECTORS_ON_DISK to QDRANT_COLLECTION.
+
+    python -m app.migrations.migrate_collection --copy-to documents_v2 [--sharded] [--hybrid]
+        Copies every point of QDRANT_COLLECTION into a new collection created with the current
+        layout settings: quantization, on-disk vectors, EMBEDDING_PREFILTER_DIMENSION prefix
+        vectors, with --sharded one shard key per company and, with --hybrid, BM25 sparse vectors
+        computed from the stored node texts. Needed for changes Qdrant cannot apply in place
+        (sharding, adding the prefix or the sparse vector). The source collection is left
+        untouched; point QDRANT_COLLECTION at the new collection (and set
+        QDRANT_SHARD_BY_COMPANY=true when sharded, QDRANT_HYBRID_SEARCH=true when hybrid) once
+        the copy has finished.
+"""
+import argparse
+import asyncio
+from collections import defaultdict
+
+from llama_index.core.schema import MetadataMode
+from llama_index.core.vector_stores.utils import metadata_dict_to_node
+from qdrant_client import models as qmodels
+
+from app.core.logger import get_logger
+from app.core.qdrant.collection_layout import DENSE_VECTOR_NAME, CollectionLayout
+from app.core.settings import get_settings
+from app.infra.clients.instances_qdrant import get_qdrant_aclient
+
+logger = get_logger("MigrateCollection")
+
+
+async def add_payload_indexes(layout: CollectionLayout) -> None:
+    created = await layout.ensure_payload_indexes()
+    if not created:
+        logger.info(f"Collection `{layout.collection_name}` already has all payload indexes.")
+
+
+async def copy_collection(source: CollectionLayout, target: CollectionLayout, batch_size: int) -> None:
+    client = source.client
+    target_name = target.collection_name
+    if await client.collection_exists(collection_name=target_name):
+        raise ValueError(f"Target collection `{target_name}` already exists.")
+    await target.create()
+
+    copied = 0
+    offset = None
+    while True:
+        points, offset = await client.scroll(
+            collection_name=source.collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True
+        )
+        by_company = defaultdict(list)
+        for point in points:
+            by_company[(point.payload or {}).get("company_id")].append(point)
+
+        for company_id, company_points in by_company.items():
+            if company_id is None and target.shard_by_company:
+                logger.warning(f"Skipping {len(company_points)} points without `company_id`: they have no shard key.")
+                continue
+            if company_id is not None:
+                await target.ensure_tenant(company_id=company_id)
+            await client.upsert(
+                collection_name=target_name,
+                points=[
+                    qmodels.PointStruct(id=point.id, vector=target.point_vectors(full_vector(point), text=node_text(point) if target.hybrid else None), payload=point.payload)
+                    for point in company_points
+                ],
+                shard_key_selector=target.shard_key_selector(company_id) if company_id is not None else None,
+                wait=True
+            )
+            copied += len(company_points)
+        logger.info(f"Copied {copied} points to `{target_name}`.")
+        if offset is None:
+            break
+
+
+def full_vector(point: qmodels.Record) -> list[float]:
+    # Unnamed single vector, or the full vector of a collection that also has the prefix vector
+    if isinstance(point.vector, dict):
+        return point.vector.get(DENSE_VECTOR_NAME) or point.vector[""]
+    return point.vector
+
+
+def node_text(point: qmodels.Record) -> str:
+    # The text the node was embedded from, as the vector store builds it on ingestion
+    return metadata_dict_to_node(point.payload).get_content(metadata_mode=MetadataMode.EMBED)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Migrate the knowledge base collection to the current layout.")
+    parser.add_argument("--storage", action="store_true", help="apply the quantization and on-disk vector settings")
+    parser.add_argument("--copy-to", metavar="COLLECTION", help="copy all points into a new collection with the current layout")
+    parser.add_argument("--sharded", action="store_true", help="shard the new collection by company")
+    parser.add_argument("--hybrid", action="store_true", help="add BM25 sparse vectors to the new collection")
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    settings = get_settings()
+    layout = CollectionLayout(
+        client=get_qdrant_aclient(),
+        collection_name=settings.QDRANT_COLLECTION,
+        vector_size=settings.EMBEDDING_DIMENSION,
+        shards_per_company=settings.QDRANT_SHARDS_PER_COMPANY,
+        quantization=settings.QDRANT_QUANTIZATION,
+        quantization_always_ram=settings.QDRANT_QUANTIZATION_ALWAYS_RAM,
+        vectors_on_disk=settings.QDRANT_VECTORS_ON_DISK
+    )
+    await add_payload_indexes(layout)
+    if args.storage:
+        await layout.apply_storage_config()
+    if args.copy_to:
+        target = CollectionLayout(
+            client=layout.client,
+            collection_name=args.copy_to,
+            vector_size=settings.EMBEDDING_DIMENSION,
+            shard_by_company=args.sharded,
+            shards_per_company=settings.QDRANT_SHARDS_PER_COMPANY,
+            quantization=settings.QDRANT_QUANTIZATION,
+            quantization_always_ram=settings.QDRANT_QUANTIZATION_ALWAYS_RAM,
+            vectors_on_disk=settings.QDRANT_VECTORS_ON_DISK,
+            prefilter_dimension=settings.EMBEDDING_PREFILTER_DIMENSION,
+            hybrid=args.hybrid
+        )
+        await copy_collection(source=layout, target=target, batch_size=args.batch_size)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
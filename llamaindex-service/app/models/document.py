@@ -1,13 +1,17 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import Optional
+from typing import Iterable, Optional
 from app.core.logger import get_logger
 from app.infra.knowledge_base.instances_knowledge_base import get_knowledge_base_wrapper
 from app.infra.file_storage.instances_file_storage_wrapper import get_file_storage_wrapper
+from app.infra.instances_executors import get_executors
 from app.models.files import LocalFile
 from app.models.document_state import DocumentType
 from app.core.document_mapper import DocumentMapper
-from app.models.field_extraction import FieldExtraction
+from app.models.field_extraction import FieldExtraction, FieldExtractionTask, FieldExtractionResult
+from app.core.extraction.engine import ExtractionEngine
+from app.core.schema.diff import SchemaDiffer
+from app.models.schema.diff import SchemaDiff
 
 class SchemaDocument:
     class Meta:
@@ -47,6 +51,7 @@ class SchemaDocument:
         # Wrappers
         self.knowledge_base = get_knowledge_base_wrapper()
         self.file_storage = get_file_storage_wrapper()
+        self.extraction_engine = ExtractionEngine()
         self.logger = get_logger(self.__class__.__name__)
                 
     @property
@@ -61,30 +66,116 @@ class SchemaDocument:
         with open(self.schema_path, "r", encoding="utf-8") as f:
             self.data = json.load(f)
             
-    async def fill(self) -> None:
+    async def fill(self, force_refresh: bool = False, previous: Optional["SchemaDocument"] = None) -> None:
+        """
+        Extracts the document's fields from the knowledge base.
+
+        Args:
+            force_refresh (bool): Extract every field again, ignoring cached and previous extractions.
+            previous (Optional[SchemaDocument]): A filled document of an earlier schema version. Fields whose
+                prompt, type and example are unchanged copy its extraction; only added and changed fields are extracted.
+        """
         try:
             if not self.is_loaded:
                 raise Exception("Document is not loaded. Use `document.load()` first.")
-            system_prompt = self.meta.system_instruction
-            for path, prompt_text, field_obj in self.__extract_prompts(self.data):
-                user_prompt = f"""
-                Zadanie: {prompt_text}
-                Przykładowe odpowiedzi: {field_obj["example"]}
-                """
-                field_extraction: FieldExtraction = await self.knowledge_base.extract_field(
-                    company_id=self.meta.company_id,
-                    project_id=self.meta.project_id,
-                    field_prompt=user_prompt,
-                    field_type=field_obj["type"]
+            field_objs, tasks = self.__build_tasks()
+            if previous is not None and not force_refresh:
+                diff = self.diff(previous)
+                previous_objs, _ = previous.__build_tasks()
+                for path in diff.unchanged:
+                    for key in ("value", "confidence", "reasoning", "provenance"):
+                        if key in previous_objs[path]:
+                            field_objs[path][key] = previous_objs[path][key]
+                tasks = [task for task in tasks if task.field_id in diff.to_extract or task.force_refresh]
+                self.logger.info(
+                    f"Schema diff: {len(diff.added)} added, {len(diff.changed)} changed, "
+                    f"{len(diff.removed)} removed, {len(diff.unchanged)} reused."
                 )
-                field_obj['value'] = field_extraction.value
-                field_obj['confidence'] = field_extraction.confidence
-                field_obj['reasoning'] = field_extraction.reasoning
-            self.data["meta"] = self.__dump_meta()
-            self.is_filled = True
+            results = await self.extraction_engine.extract(
+                company_id=self.meta.company_id,
+                project_id=self.meta.project_id,
+                tasks=tasks,
+                force_refresh=force_refresh
+            )
+            self.__apply_results(field_objs=field_objs, results=results)
+        except Exception as e:
+            self.logger.error(str(e))
+            raise e
+
+    async def regenerate(self, changed_file_ids: Iterable[str] = ()) -> None:
+        """
+        Refreshes a filled document after the knowledge base changed.
+
+        Only fields whose recorded provenance touches `changed_file_ids`, or whose retrieval now
+        returns different nodes, are extracted again; the others keep their current values.
+        Fields filled before provenance was recorded are always extracted again.
+        """
+        try:
+            if not self.is_filled:
+                raise Exception("Document is not filled. Use `document.fill()` first.")
+            field_objs, tasks = self.__build_tasks()
+            previous = {
+                path: FieldExtraction(
+                    value=field_obj.get("value"),
+                    confidence=field_obj.get("confidence"),
+                    reasoning=field_obj.get("reasoning"),
+                    provenance=field_obj.get("provenance")
+                )
+                for path, field_obj in field_objs.items()
+            }
+            results = await self.extraction_engine.regenerate(
+                company_id=self.meta.company_id,
+                project_id=self.meta.project_id,
+                tasks=tasks,
+                previous=previous,
+                changed_file_ids=changed_file_ids
+            )
+            self.__apply_results(field_objs=field_objs, results=results)
         except Exception as e:
             self.logger.error(str(e))
             raise e
+
+    def field_fingerprints(self) -> dict[str, str]:
+        return {
+            path: SchemaDiffer.fingerprint(prompt=prompt_text, data_type=field_obj.get("type"), example=field_obj.get("example"))
+            for path, prompt_text, field_obj in self.__extract_prompts(self.data)
+        }
+
+    def diff(self, previous: "SchemaDocument") -> SchemaDiff:
+        """Fields of this document that are added or changed compared to `previous`."""
+        return SchemaDiffer.diff(previous=previous.field_fingerprints(), current=self.field_fingerprints())
+
+    def __build_tasks(self) -> tuple[dict[str, dict], list[FieldExtractionTask]]:
+        field_objs = {}
+        tasks = []
+        for path, prompt_text, field_obj in self.__extract_prompts(self.data):
+            user_prompt = f"""
+                Zadanie: {prompt_text}
+                Przykładowe odpowiedzi: {field_obj["example"]}
+                """
+            field_objs[path] = field_obj
+            tasks.append(FieldExtractionTask(
+                field_id=path,
+                prompt=user_prompt,
+                field_type=field_obj["type"],
+                group=path.rsplit(".", 1)[0] if "." in path else None,
+                force_refresh=bool(field_obj.get("force_refresh", False))
+            ))
+        return field_objs, tasks
+
+    def __apply_results(self, field_objs: dict[str, dict], results: list[FieldExtractionResult]) -> None:
+        for result in results:
+            field_obj = field_objs[result.field_id]
+            field_extraction: FieldExtraction = result.extraction
+            field_obj['value'] = field_extraction.value
+            field_obj['confidence'] = field_extraction.confidence
+            field_obj['reasoning'] = field_extraction.reasoning
+            if field_extraction.provenance is not None:
+                field_obj['provenance'] = field_extraction.provenance.model_dump()
+            else:
+                field_obj.pop('provenance', None)
+        self.data["meta"] = self.__dump_meta()
+        self.is_filled = True
         
     @property
     def is_saved(self) -> bool:
@@ -94,11 +185,14 @@ class SchemaDocument:
         if not self.is_filled:
             raise Exception("Document is not filled. Use `document.fill()` first.")
         
+        self.saved_path = await get_executors().run_io(self.__write_temp_file)
+    
+    def __write_temp_file(self) -> str:
         import tempfile
         import json
         with tempfile.NamedTemporaryFile(delete=False, mode='w', encoding='utf-8') as tmp_file:
             json.dump(self.data, tmp_file, ensure_ascii=False)
-            self.saved_path = tmp_file.name
+            return tmp_file.name
             
     def get_local_file(self) -> LocalFile:
         if not self.is_saved:
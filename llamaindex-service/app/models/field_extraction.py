@@ -1,6 +1,18 @@
 from pydantic import BaseModel, Field
+from pydantic.json_schema import SkipJsonSchema
 from typing import Optional, Union, List
 
+class FieldProvenance(BaseModel):
+    node_ids: List[str] = Field(
+        default_factory=list,
+        description="Ids of the nodes retrieved as context for the field"
+    )
+    file_ids: List[str] = Field(
+        default_factory=list,
+        description="Ids of the files the context shown to the LLM came from"
+    )
+
+
 class FieldExtraction(BaseModel):
     value: Optional[Union[str, List[str]]] = Field(
         default=None,
@@ -18,3 +30,59 @@ class FieldExtraction(BaseModel):
         default=None,
         description="Brief explanation of the extraction"
     )
+
+    # Filled in by the knowledge base, not by the LLM - hidden from the output schema sent in the prompt
+    provenance: SkipJsonSchema[Optional[FieldProvenance]] = Field(
+        default=None,
+        description="Knowledge base nodes and files that contributed context to the extraction"
+    )
+
+
+class KeyedFieldExtraction(FieldExtraction):
+    field_id: str = Field(description="Identifier of the field this extraction belongs to")
+
+
+class FieldExtractionBatch(BaseModel):
+    extractions: List[KeyedFieldExtraction] = Field(
+        default_factory=list,
+        description="One extraction per requested field, keyed by field_id"
+    )
+
+
+class FieldExtractionTask(BaseModel):
+    field_id: str = Field(description="Identifier of the schema field (path or field key)")
+    prompt: str = Field(description="Instruction sent to the knowledge base for this field")
+    field_type: str = Field(description="Declared data type of the field")
+    group: Optional[str] = Field(
+        default=None,
+        description="Grouping key (e.g. schema section) used to batch related fields into one LLM call"
+    )
+    force_refresh: bool = Field(
+        default=False,
+        description="Extract again even if a cached result exists for this field"
+    )
+
+
+class FieldExtractionResult(BaseModel):
+    field_id: str
+    extraction: FieldExtraction
+    duration_ms: float = Field(
+        default=0.0,
+        description="Time spent extracting this field, excluding the wait for a free slot"
+    )
+    error: Optional[str] = Field(
+        default=None,
+        description="Error message if the extraction failed"
+    )
+    cached: bool = Field(
+        default=False,
+        description="Whether the result came from the extraction cache"
+    )
+    reused: bool = Field(
+        default=False,
+        description="Whether a previous extraction was kept during regeneration"
+    )
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None
@@ -0,0 +1,34 @@
+from datetime import datetime
+from typing import Awaitable, Callable, ClassVar, Literal, Optional
+from pydantic import BaseModel, Field
+
+# Called by ingestion code as `await progress(stage, counters)`
+IngestionProgressCallback = Callable[[str, dict], Awaitable[None]]
+
+class IngestionJobPayload(BaseModel):
+    local_file_path: str
+    company_id: str
+    project_id: str
+    document_category: str
+
+class IngestionJobProgress(BaseModel):
+    pages_parsed: int = 0
+    nodes_total: int = 0
+    nodes_embedded: int = 0
+    nodes_written: int = 0
+
+class IngestionJob(BaseModel):
+    # Stages a job runs, in order; completed ones are persisted and skipped when a job is retried
+    STAGES: ClassVar[tuple[str, ...]] = ("file_storage", "knowledge_base")
+
+    job_id: str
+    operation: Literal["upload", "upsert"]
+    payload: IngestionJobPayload
+    status: Literal["queued", "running", "succeeded", "failed"] = "queued"
+    stage: str = Field(default="queued", description="Current step: file_storage, parsing, embedding, writing or done")
+    completed_stages: list[str] = Field(default_factory=list)
+    progress: IngestionJobProgress = Field(default_factory=IngestionJobProgress)
+    attempts: int = 0
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
@@ -19,6 +19,8 @@ class SchemaField(SchemaBaseNode):
     source: Literal["ai", "user"]
     prompt: Optional[str] = None
     required: Optional[bool] = False
+    # Re-extract even if a cached result exists
+    force_refresh: Optional[bool] = False
     data_type: Literal["text", "number", "boolean", "date", "list[text]"]
     
     # Content to be filled by either `user` or `ai`
@@ -0,0 +1,18 @@
+from pydantic import BaseModel, Field, computed_field
+from typing import List
+
+
+class SchemaDiff(BaseModel):
+    added: List[str] = Field(default_factory=list, description="Fields only in the new schema")
+    changed: List[str] = Field(default_factory=list, description="Fields whose prompt, type or example changed")
+    removed: List[str] = Field(default_factory=list, description="Fields only in the previous schema")
+    unchanged: List[str] = Field(default_factory=list, description="Fields whose previous extraction can be reused")
+
+    @property
+    def to_extract(self) -> List[str]:
+        return self.added + self.changed
+
+    @computed_field
+    @property
+    def fields_to_extract(self) -> int:
+        return len(self.added) + len(self.changed)
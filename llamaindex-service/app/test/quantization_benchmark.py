@@ -0,0 +1,137 @@
+"""
+Compares quantized search against the unquantized baseline on a real collection.
+
+Ground truth is an exact (brute-force) search over the original float32 vectors. Every
+configuration is scored with recall@k against it, and its latency is measured per query.
+If the collection has the Matryoshka prefix vector, two-stage search (prefix prefetch,
+full-vector rescoring) is measured as well.
+
+Usage:
+    python -m app.test.quantization_benchmark --company-id acme --project-id p1
+    python -m app.test.quantization_benchmark --company-id acme --project-id p1 --queries questions.txt -k 10
+
+Without `--queries`, stored vectors of randomly sampled nodes of the project are used as queries.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from typing import Optional
+
+from qdrant_client import models as qmodels
+
+from app.core.qdrant.collection_layout import DENSE_VECTOR_NAME, PREFILTER_VECTOR_NAME
+from app.core.qdrant.prefilter_vector_store import truncate_embedding
+from app.core.settings import get_settings
+from app.infra.clients.instances_qdrant import get_qdrant_aclient, get_collection_layout
+from app.infra.instances_llamaindex import get_llamaindex_contexts
+from app.migrations.migrate_collection import full_vector
+
+
+CONFIGURATIONS = {
+    "baseline (hnsw, float32)": qmodels.SearchParams(quantization=qmodels.QuantizationSearchParams(ignore=True)),
+    "quantized, no rescore": qmodels.SearchParams(quantization=qmodels.QuantizationSearchParams(rescore=False)),
+    "quantized, rescore": qmodels.SearchParams(quantization=qmodels.QuantizationSearchParams(rescore=True, oversampling=1.0)),
+    "quantized, rescore, oversampling 2": qmodels.SearchParams(quantization=qmodels.QuantizationSearchParams(rescore=True, oversampling=2.0)),
+    "quantized, rescore, oversampling 4": qmodels.SearchParams(quantization=qmodels.QuantizationSearchParams(rescore=True, oversampling=4.0)),
+}
+EXACT = qmodels.SearchParams(exact=True, quantization=qmodels.QuantizationSearchParams(ignore=True))
+
+
+async def load_queries(company_id: str, project_id: str, samples: int, queries_path: Optional[str]) -> list[list[float]]:
+    if queries_path:
+        with open(queries_path, encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+        embed_model = get_llamaindex_contexts()["embed_model"]
+        return await embed_model.aget_text_embedding_batch(questions)
+
+    settings = get_settings()
+    points, _ = await get_qdrant_aclient().scroll(
+        collection_name=settings.QDRANT_COLLECTION,
+        scroll_filter=project_filter(company_id=company_id, project_id=project_id),
+        limit=max(samples * 10, 100),
+        with_payload=False,
+        with_vectors=True
+    )
+    points = random.sample(points, min(samples, len(points)))
+    return [full_vector(point) for point in points]
+
+
+def project_filter(company_id: str, project_id: str) -> qmodels.Filter:
+    return qmodels.Filter(must=[
+        qmodels.FieldCondition(key="company_id", match=qmodels.MatchValue(value=company_id)),
+        qmodels.FieldCondition(key="project_id", match=qmodels.MatchValue(value=project_id)),
+    ])
+
+
+async def search(query: list[float], company_id: str, project_id: str, k: int, params: qmodels.SearchParams, using: Optional[str], prefilter_limit: Optional[int] = None) -> tuple[list[str], float]:
+    settings = get_settings()
+    layout = get_collection_layout()
+    query_filter = project_filter(company_id=company_id, project_id=project_id)
+    prefetch = None
+    if prefilter_limit:
+        prefetch = qmodels.Prefetch(
+            query=truncate_embedding(query, layout.prefilter_dimension),
+            using=PREFILTER_VECTOR_NAME,
+            filter=query_filter,
+            params=params,
+            limit=prefilter_limit
+        )
+    started = time.perf_counter()
+    response = await get_qdrant_aclient().query_points(
+        collection_name=settings.QDRANT_COLLECTION,
+        prefetch=prefetch,
+        query=query,
+        using=using,
+        query_filter=query_filter,
+        limit=k,
+        search_params=params,
+        shard_key_selector=layout.shard_key_selector(company_id),
+        with_payload=False
+    )
+    return [str(point.id) for point in response.points], (time.perf_counter() - started) * 1000
+
+
+async def run_benchmark(company_id: str, project_id: str, k: int, samples: int, queries_path: Optional[str]) -> None:
+    settings = get_settings()
+    info = await get_qdrant_aclient().get_collection(collection_name=settings.QDRANT_COLLECTION)
+    print(f"Collection `{settings.QDRANT_COLLECTION}`: {info.points_count} points, quantization: {info.config.quantization_config}")
+    vectors = info.config.params.vectors
+    using = DENSE_VECTOR_NAME if isinstance(vectors, dict) and DENSE_VECTOR_NAME in vectors else None
+    configurations = [(name, params, None) for name, params in CONFIGURATIONS.items()]
+    if isinstance(vectors, dict) and PREFILTER_VECTOR_NAME in vectors and get_collection_layout().prefilter_dimension:
+        configurations += [
+            (f"prefix prefetch {limit}, full rescore", CONFIGURATIONS["quantized, rescore"], limit)
+            for limit in (50, 100, 200)
+        ]
+
+    queries = await load_queries(company_id=company_id, project_id=project_id, samples=samples, queries_path=queries_path)
+    if not queries:
+        print("No queries - is the project empty?")
+        return
+
+    truth = [set((await search(query, company_id, project_id, k, EXACT, using))[0]) for query in queries]
+    print(f"{len(queries)} queries, k={k}\n")
+    print(f"{'configuration':<38} {'recall@k':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, params, prefilter_limit in configurations:
+        recalls = []
+        latencies = []
+        for query, expected in zip(queries, truth):
+            ids, latency = await search(query, company_id, project_id, k, params, using, prefilter_limit)
+            recalls.append(len(expected & set(ids)) / max(1, len(expected)))
+            latencies.append(latency)
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"{name:<38} {statistics.mean(recalls):>9.3f} {statistics.median(latencies):>8.1f} {p95:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall@k and latency of quantized search against the float32 baseline.")
+    parser.add_argument("--company-id", required=True)
+    parser.add_argument("--project-id", required=True)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--samples", type=int, default=100, help="number of stored vectors used as queries")
+    parser.add_argument("--queries", help="file with one question per line, embedded with the configured model")
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(company_id=args.company_id, project_id=args.project_id, k=args.k, samples=args.samples, queries_path=args.queries))
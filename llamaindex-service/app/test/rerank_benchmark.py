@@ -0,0 +1,145 @@
+"""
+Compares the ONNX reranker backends against the torch cross-encoder on a real project.
+
+Every query is scored against `--candidates` passages (the reranker's usual input size) by each
+backend. Reported per backend:
+    - latency: p50 / p95 of scoring one query's candidates (one forward pass, like a request),
+    - throughput: pairs per second when all pairs are scored in batches of RERANK_BATCH_SIZE,
+    - ranking agreement with torch: top-1 agreement, overlap of the top RERANK_TOP_N and
+      Spearman correlation of the full candidate ranking.
+
+Usage:
+    python -m app.test.rerank_benchmark --company-id acme --project-id p1
+    python -m app.test.rerank_benchmark --company-id acme --project-id p1 --queries questions.txt --threads 4
+
+Without `--queries`, the opening words of randomly sampled nodes are used as queries, and the
+node they came from is one of their candidates. The ONNX models are exported (and quantized) into
+RERANK_ONNX_DIR on first use.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from typing import Optional
+
+from llama_index.core.schema import MetadataMode
+from llama_index.core.vector_stores.utils import metadata_dict_to_node
+from qdrant_client import models as qmodels
+from scipy.stats import spearmanr
+
+from app.core.rerank.cross_encoders import CrossEncoderBackend, OnnxCrossEncoder, TorchCrossEncoder
+from app.core.settings import get_settings
+from app.infra.clients.instances_qdrant import get_qdrant_aclient
+
+
+async def load_passages(company_id: str, project_id: str, limit: int) -> list[str]:
+    settings = get_settings()
+    points, _ = await get_qdrant_aclient().scroll(
+        collection_name=settings.QDRANT_COLLECTION,
+        scroll_filter=qmodels.Filter(must=[
+            qmodels.FieldCondition(key="company_id", match=qmodels.MatchValue(value=company_id)),
+            qmodels.FieldCondition(key="project_id", match=qmodels.MatchValue(value=project_id)),
+        ]),
+        limit=limit,
+        with_payload=True,
+        with_vectors=False
+    )
+    # The text the reranker sees, as `BatchRerankPostprocessor` builds it
+    return [metadata_dict_to_node(point.payload).get_content(metadata_mode=MetadataMode.EMBED) for point in points]
+
+
+def build_workload(passages: list[str], samples: int, candidates: int, queries_path: Optional[str]) -> list[tuple[str, list[str]]]:
+    if queries_path:
+        with open(queries_path, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()][:samples]
+        return [(query, random.sample(passages, min(candidates, len(passages)))) for query in queries]
+
+    workload = []
+    for source in random.sample(passages, min(samples, len(passages))):
+        # Skip the metadata header of the embedding text
+        query = " ".join(source.split("\n\n", 1)[-1].split()[:12])
+        others = random.sample([passage for passage in passages if passage is not source], min(candidates - 1, len(passages) - 1))
+        workload.append((query, random.sample([source] + others, len(others) + 1)))
+    return workload
+
+
+def measure(backend: CrossEncoderBackend, workload: list[tuple[str, list[str]]], batch_size: int) -> tuple[list[list[float]], list[float], float]:
+    # Warm-up: loads (or exports) the model outside of the measurements
+    backend.predict([(workload[0][0], workload[0][1][0])])
+
+    scores = []
+    latencies = []
+    for query, passages in workload:
+        started = time.perf_counter()
+        scores.append(backend.predict([(query, passage) for passage in passages]))
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    pairs = [(query, passage) for query, passages in workload for passage in passages]
+    started = time.perf_counter()
+    for start in range(0, len(pairs), batch_size):
+        backend.predict(pairs[start:start + batch_size])
+    throughput = len(pairs) / (time.perf_counter() - started)
+    return scores, latencies, throughput
+
+
+def ranking(scores: list[float]) -> list[int]:
+    return sorted(range(len(scores)), key=lambda i: -scores[i])
+
+
+def agreement(reference: list[list[float]], scores: list[list[float]], top_n: int) -> tuple[float, float, float]:
+    top1 = []
+    overlap = []
+    correlation = []
+    for expected, actual in zip(reference, scores):
+        expected_order, actual_order = ranking(expected), ranking(actual)
+        top1.append(float(expected_order[0] == actual_order[0]))
+        overlap.append(len(set(expected_order[:top_n]) & set(actual_order[:top_n])) / min(top_n, len(expected)))
+        if len(expected) > 1:
+            correlation.append(spearmanr(expected, actual).statistic)
+    return statistics.mean(top1), statistics.mean(overlap), statistics.mean(correlation) if correlation else 1.0
+
+
+async def run_benchmark(company_id: str, project_id: str, samples: int, candidates: int, threads: int, queries_path: Optional[str]) -> None:
+    settings = get_settings()
+    passages = await load_passages(company_id=company_id, project_id=project_id, limit=max(samples * candidates, 500))
+    if len(passages) < 2:
+        print("Not enough nodes - is the project empty?")
+        return
+    workload = build_workload(passages=passages, samples=samples, candidates=candidates, queries_path=queries_path)
+
+    common = {"model_name": settings.RERANK_MODEL, "max_length": settings.RERANK_MAX_LENGTH}
+    backends = {
+        "torch": TorchCrossEncoder(**common),
+        "onnx fp32": OnnxCrossEncoder(**common, export_dir=settings.RERANK_ONNX_DIR, quantize=False, intra_op_threads=threads),
+        "onnx int8": OnnxCrossEncoder(**common, export_dir=settings.RERANK_ONNX_DIR, quantize=True, intra_op_threads=threads),
+    }
+    print(f"{settings.RERANK_MODEL}: {len(workload)} queries x {candidates} candidates, onnx threads: {threads or 'all'}\n")
+    print(f"{'backend':<10} {'p50 ms':>8} {'p95 ms':>8} {'pairs/s':>9} {'top-1':>7} {f'top-{settings.RERANK_TOP_N}':>7} {'spearman':>9}")
+    reference = None
+    for name, backend in backends.items():
+        scores, latencies, throughput = measure(backend, workload, settings.RERANK_BATCH_SIZE)
+        reference = reference or scores
+        top1, overlap, correlation = agreement(reference, scores, settings.RERANK_TOP_N)
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"{name:<10} {statistics.median(latencies):>8.1f} {p95:>8.1f} {throughput:>9.0f} {top1:>7.3f} {overlap:>7.3f} {correlation:>9.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency, throughput and ranking agreement of the reranker backends.")
+    parser.add_argument("--company-id", required=True)
+    parser.add_argument("--project-id", required=True)
+    parser.add_argument("--samples", type=int, default=100, help="number of queries")
+    parser.add_argument("--candidates", type=int, default=10, help="passages scored per query")
+    parser.add_argument("--threads", type=int, default=get_settings().RERANK_ONNX_THREADS, help="onnxruntime intra-op threads (0: all cores)")
+    parser.add_argument("--queries", help="file with one question per line")
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(
+        company_id=args.company_id,
+        project_id=args.project_id,
+        samples=args.samples,
+        candidates=args.candidates,
+        threads=args.threads,
+        queries_path=args.queries
+    ))
@@ -0,0 +1,220 @@
+"""
+Checks AsyncS3Client end to end: PUT, HEAD, GET with Range, download, paginated listing and
+DeleteObjects, with keys containing spaces, reserved and non-ASCII characters.
+
+By default the client runs against an in-process S3 stand-in (httpx.MockTransport) that lists two
+keys per page, so continuation tokens are exercised too. With `--endpoint` the same checks run
+against a real server (MinIO, moto) in a fresh bucket.
+
+Usage:
+    python -m app.test.s3_client_check
+    python -m app.test.s3_client_check --endpoint http://localhost:5000 --access-key test --secret-key test
+
+Fails with an AssertionError on the first mismatch.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import os
+import tempfile
+import uuid
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Optional
+from urllib.parse import unquote
+from xml.sax.saxutils import escape
+
+import httpx
+
+from app.core.storage.s3_client import AsyncS3Client, S3Error
+
+
+CHUNK_SIZE = 1000
+PREFIX = "p1/plans"
+KEYS = [
+    f"{PREFIX}/raw/Plan łódź 1.pdf",
+    f"{PREFIX}/raw/a+b & c (final).txt",
+    f"{PREFIX}/raw/zażółć/ü ñ 東京.docx",
+    f"{PREFIX}/raw/100% done?.md",
+    f"{PREFIX}/raw/plain.txt",
+]
+OTHER_KEY = "p1/other/keep me.txt"
+
+
+class FakeS3:
+    """The subset of the S3 REST API AsyncS3Client uses, kept in memory, path-style."""
+    def __init__(self, page_size: int = 2):
+        self.page_size = page_size
+        self.buckets: dict[str, dict[str, tuple[bytes, str, datetime]]] = {}
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        assert request.headers["authorization"].startswith("AWS4-HMAC-SHA256 "), "request is not signed"
+        assert "x-amz-content-sha256" in request.headers, "payload hash header is missing"
+        # The path is percent-encoded exactly once: decoding it once gives the key back
+        bucket, _, key = unquote(request.url.raw_path.decode("ascii").split("?")[0]).lstrip("/").partition("/")
+        params = dict(request.url.params)
+
+        if not key:
+            if request.method == "HEAD":
+                return httpx.Response(200 if bucket in self.buckets else 404)
+            if request.method == "PUT":
+                self.buckets.setdefault(bucket, {})
+                return httpx.Response(200)
+            if request.method == "GET" and params.get("list-type") == "2":
+                return self.__list(bucket, params)
+            if request.method == "POST" and "delete" in params:
+                return self.__delete(bucket, request)
+            return self.__error(400, "InvalidRequest")
+
+        objects = self.buckets.get(bucket)
+        if objects is None:
+            return self.__error(404, "NoSuchBucket")
+        if request.method == "PUT":
+            body = request.content
+            assert int(request.headers["content-length"]) == len(body), "Content-Length does not match the body"
+            etag = f'"{hashlib.md5(body).hexdigest()}"'
+            objects[key] = (body, etag, datetime.now(timezone.utc).replace(microsecond=0))
+            return httpx.Response(200, headers={"ETag": etag})
+        if request.method == "DELETE":
+            objects.pop(key, None)
+            return httpx.Response(204)
+        if key not in objects:
+            return httpx.Response(404) if request.method == "HEAD" else self.__error(404, "NoSuchKey")
+        body, etag, last_modified = objects[key]
+        headers = {"ETag": etag, "Last-Modified": format_datetime(last_modified, usegmt=True), "Accept-Ranges": "bytes"}
+        if request.method == "HEAD":
+            return httpx.Response(200, headers={**headers, "Content-Length": str(len(body))})
+        if request.method == "GET":
+            byte_range = request.headers.get("range")
+            if byte_range:
+                first, last = (int(part) for part in byte_range.removeprefix("bytes=").split("-"))
+                last = min(last, len(body) - 1)
+                headers["Content-Range"] = f"bytes {first}-{last}/{len(body)}"
+                return httpx.Response(206, headers=headers, content=body[first:last + 1])
+            return httpx.Response(200, headers=headers, content=body)
+        return self.__error(400, "InvalidRequest")
+
+    def __list(self, bucket: str, params: dict[str, str]) -> httpx.Response:
+        if bucket not in self.buckets:
+            return self.__error(404, "NoSuchBucket")
+        keys = sorted(key for key in self.buckets[bucket] if key.startswith(params.get("prefix", "")))
+        start = int(params.get("continuation-token", "0"))
+        page = keys[start:start + self.page_size]
+        truncated = start + self.page_size < len(keys)
+        contents = "".join(
+            f"<Contents><Key>{escape(key)}</Key><Size>{len(self.buckets[bucket][key][0])}</Size>"
+            f"<ETag>{escape(self.buckets[bucket][key][1])}</ETag>"
+            f"<LastModified>{self.buckets[bucket][key][2].strftime('%Y-%m-%dT%H:%M:%S.000Z')}</LastModified></Contents>"
+            for key in page
+        )
+        token = f"<NextContinuationToken>{start + self.page_size}</NextContinuationToken>" if truncated else ""
+        body = (
+            '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+            f"<IsTruncated>{'true' if truncated else 'false'}</IsTruncated>{contents}{token}</ListBucketResult>"
+        )
+        return httpx.Response(200, content=body.encode("utf-8"))
+
+    def __delete(self, bucket: str, request: httpx.Request) -> httpx.Response:
+        body = request.content
+        assert request.headers["content-md5"] == base64.b64encode(hashlib.md5(body).digest()).decode(), "Content-MD5 does not match"
+        for key in ET.fromstring(body).iterfind("Object/Key"):
+            self.buckets[bucket].pop(key.text, None)
+        return httpx.Response(200, content=b'<DeleteResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/"/>')
+
+    @staticmethod
+    def __error(status_code: int, code: str) -> httpx.Response:
+        return httpx.Response(status_code, content=f"<Error><Code>{code}</Code><Message>{code}</Message></Error>".encode())
+
+
+def check(name: str, condition: bool, detail: str = "") -> None:
+    assert condition, f"{name} failed {detail}".strip()
+    print(f"ok  {name}")
+
+
+async def run_checks(endpoint: str, access_key: str, secret_key: str, transport: Optional[httpx.AsyncBaseTransport]) -> None:
+    client = AsyncS3Client(
+        endpoint_url=endpoint,
+        access_key=access_key,
+        secret_key=secret_key,
+        chunk_size=CHUNK_SIZE,
+        transport=transport
+    )
+    bucket = f"s3-client-check-{uuid.uuid4().hex[:8]}"
+    payloads = {key: os.urandom(CHUNK_SIZE * 2 + index * 37 + 1) for index, key in enumerate(KEYS + [OTHER_KEY])}
+    workdir = tempfile.mkdtemp()
+    try:
+        check("bucket is missing before creation", not await client.bucket_exists(bucket))
+        await client.make_bucket(bucket)
+        await client.make_bucket(bucket)
+        check("make_bucket is idempotent", await client.bucket_exists(bucket))
+
+        etags = {}
+        for index, (key, payload) in enumerate(payloads.items()):
+            path = os.path.join(workdir, f"upload-{index}")
+            with open(path, "wb") as f:
+                f.write(payload)
+            etags[key] = await client.put_file(bucket=bucket, key=key, path=path)
+        check("PUT returns ETags", all(etags.values()))
+
+        for key, payload in payloads.items():
+            metadata = await client.head_object(bucket=bucket, key=key)
+            check(f"HEAD {key!r}", metadata is not None and metadata.size == len(payload) and metadata.etag == etags[key], str(metadata))
+        check("HEAD of a missing key is None", await client.head_object(bucket=bucket, key=f"{PREFIX}/raw/missing file.pdf") is None)
+        check("last_modified is parsed", (await client.head_object(bucket=bucket, key=KEYS[0])).last_modified is not None)
+
+        key, payload = KEYS[2], payloads[KEYS[2]]
+        async with client.get_object(bucket=bucket, key=key, headers={"Range": "bytes=10-1509"}) as response:
+            body = await response.aread()
+            check("GET with Range is partial", response.status_code == 206, str(response.status_code))
+            check("GET with Range returns the range", body == payload[10:1510])
+            check("Content-Range", response.headers.get("content-range") == f"bytes 10-1509/{len(payload)}", response.headers.get("content-range", ""))
+        async with client.get_object(bucket=bucket, key=key, headers={"Range": f"bytes={len(payload) - 5}-{len(payload) + 100}"}) as response:
+            check("GET with Range is clamped to the object", await response.aread() == payload[-5:])
+
+        download_path = os.path.join(workdir, "download")
+        await client.download_file(bucket=bucket, key=KEYS[0], path=download_path)
+        with open(download_path, "rb") as f:
+            check("download_file writes the whole object", f.read() == payloads[KEYS[0]])
+
+        listed = await client.list_objects(bucket=bucket, prefix=PREFIX)
+        check("list returns every key under the prefix", sorted(obj.key for obj in listed) == sorted(KEYS), str([obj.key for obj in listed]))
+        check("list returns sizes and ETags", all(obj.size == len(payloads[obj.key]) and obj.etag == etags[obj.key] for obj in listed))
+        check("list of an empty prefix is empty", await client.list_objects(bucket=bucket, prefix="p1/nothing") == [])
+
+        await client.delete_objects(bucket=bucket, keys=[obj.key for obj in listed])
+        check("DeleteObjects removes every key", await client.list_objects(bucket=bucket, prefix=PREFIX) == [])
+        check("DeleteObjects keeps other keys", await client.head_object(bucket=bucket, key=OTHER_KEY) is not None)
+        await client.delete_objects(bucket=bucket, keys=[])
+
+        try:
+            async with client.get_object(bucket=bucket, key=KEYS[0]):
+                pass
+            check("GET of a deleted key raises", False)
+        except S3Error as e:
+            check("GET of a deleted key raises NoSuchKey", e.code == "NoSuchKey" and e.status_code == 404, str(e))
+
+        await client.delete_object(bucket=bucket, key=OTHER_KEY)
+        check("DELETE removes the key", await client.head_object(bucket=bucket, key=OTHER_KEY) is None)
+    finally:
+        await client.aclose()
+        for name in os.listdir(workdir):
+            os.remove(os.path.join(workdir, name))
+        os.rmdir(workdir)
+    print(f"All checks passed against {endpoint}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end checks of AsyncS3Client.")
+    parser.add_argument("--endpoint", help="S3 endpoint URL; the in-process stand-in is used without it")
+    parser.add_argument("--access-key", default="test")
+    parser.add_argument("--secret-key", default="test")
+    args = parser.parse_args()
+
+    asyncio.run(run_checks(
+        endpoint=args.endpoint or "http://s3.test",
+        access_key=args.access_key,
+        secret_key=args.secret_key,
+        transport=None if args.endpoint else httpx.MockTransport(FakeS3().handle)
+    ))